@@ -1,7 +1,7 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
-from app.auth.utils import SECRET_KEY, ALGORITHM
+from app.auth.utils import SECRET_KEY, ALGORITHM, ADMIN_USER_IDS
 from app.models import User
 from app.database import init_db
 
@@ -27,4 +27,11 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
     user = await User.get(user_id)
     if user is None:
         raise credentials_exception
-    return user
\ No newline at end of file
+    return user
+
+
+async def get_current_admin(user: User = Depends(get_current_user)):
+    """Like get_current_user, but only for accounts listed in ADMIN_USER_IDS"""
+    if str(user.id) not in ADMIN_USER_IDS:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+    return user
@@ -15,6 +15,8 @@ GOOGLE_CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID")
 GOOGLE_CLIENT_SECRET = os.getenv("GOOGLE_CLIENT_SECRET")
 SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = "HS256"
+# Comma-separated user ids allowed to read/operate the /system endpoints
+ADMIN_USER_IDS = {i.strip() for i in os.getenv("ADMIN_USER_IDS", "").split(",") if i.strip()}
 
 # --- HEADERS TO MIMIC A BROWSER ---
 HEADERS = {
@@ -2,7 +2,7 @@ import os
 import certifi
 from motor.motor_asyncio import AsyncIOMotorClient
 from beanie import init_beanie
-from app.models import User, Team, Swipe, Match, Notification, Message, ChatGroup, Question, Block, UnreadCount, ChatMessage
+from app.models import User, Team, Swipe, Match, Notification, Message, ChatGroup, Question, Block, UnreadCount, ChatMessage, SwipeDeck, NeighborList
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -21,5 +21,5 @@ async def init_db():
     
     # Initialize Beanie with our models
     # database_name is 'collabquest_db'
-    await init_beanie(database=client.collabquest_db, document_models=[User, Team, Swipe, Match, Notification, Message, ChatGroup, Question, Block, UnreadCount, ChatMessage])
+    await init_beanie(database=client.collabquest_db, document_models=[User, Team, Swipe, Match, Notification, Message, ChatGroup, Question, Block, UnreadCount, ChatMessage, SwipeDeck, NeighborList])
     print("✅ Connected to MongoDB Atlas")
\ No newline at end of file
@@ -1,8 +1,9 @@
 from typing import List, Optional, Dict
-from beanie import Document
-from pydantic import BaseModel, Field
+from beanie import Document, PydanticObjectId, before_event, Insert, Replace, Save, SaveChanges
+from pydantic import BaseModel, ConfigDict, Field
 from datetime import datetime
 import uuid 
+from app.services.availability import compile_availability
 
 # ... [Keep all Helper Models: TimeRange, DayAvailability, Skill, Link, Achievement, ConnectedAccounts, Rating] ...
 class TimeRange(BaseModel):
@@ -128,6 +129,7 @@ class User(Document):
     interests: List[str] = [] 
     about: Optional[str] = "I love building cool things!"
     availability: List[DayAvailability] = [] 
+    availability_bits: Optional[str] = None # 7x96 fifteen-minute bitset (hex), compiled on save
     is_looking_for_team: bool = Field(default=True)
     
     age: Optional[str] = None
@@ -149,7 +151,11 @@ class User(Document):
 
     accepted_chat_requests: List[str] = []
     favorites: List[str] = [] 
-    embedding: List[float] = []
+    embedding_hash: Optional[str] = None # sha256 of the canonical text the embedding was built from (its version in embedding_store)
+    embedding_model: Optional[str] = None
+    cf_vector: List[float] = [] # implicit-feedback latent factors, see collaborative
+    embedding_int8: Optional[str] = None # base64 packed int8 code of the embedding, see reduced_embeddings
+    reduced_version: Optional[str] = None
     is_onboarded: bool = Field(default=False)
     
     # --- NEW FIELDS FOR CONNECTIONS ---
@@ -158,8 +164,23 @@ class User(Document):
     connection_requests_sent: List[str] = [] # List of User IDs
 
     project_highlights: List[str] = []
+
+    # Lowercased copies of skills/interests for indexed matching filters (see services/tags.py)
+    skill_tags: List[str] = []
+    interest_tags: List[str] = []
+
+    @before_event(Insert, Replace, Save, SaveChanges)
+    def compile_availability_bits(self):
+        self.availability_bits = compile_availability(self.availability)
+
+    @before_event(Insert, Replace, Save, SaveChanges)
+    def compile_tags(self):
+        self.skill_tags = sorted({s.name.lower() for s in self.skills})
+        self.interest_tags = sorted({i.lower() for i in self.interests})
     
-    class Settings: name = "users"
+    class Settings:
+        name = "users"
+        indexes = ["skill_tags", "interest_tags", "is_looking_for_team"]
 
 # ... [Keep UnreadCount, Task, Team, Block, Swipe, Match, Notification, Attachment, Message, ChatGroup, Question] ...
 class UnreadCount(Document):
@@ -220,9 +241,22 @@ class Team(Document):
     announcements: List[Announcement] = []
     
     tasks: List[Task] = []
-    embedding: List[float] = [] 
+    embedding_hash: Optional[str] = None # version of the vector in embedding_store
+    embedding_model: Optional[str] = None
+    cf_vector: List[float] = [] # implicit-feedback latent factors, see collaborative
+    embedding_int8: Optional[str] = None # base64 packed int8 code of the embedding, see reduced_embeddings
+    reduced_version: Optional[str] = None
+    availability_profile: Optional[str] = None # per-slot count of free members (hex), see team_availability
+    availability_members: Optional[int] = None # members who saved a schedule at all (even every day off)
+    skill_tags: List[str] = [] # lowercased needed + active skills, for indexed filters
+
+    @before_event(Insert, Replace, Save, SaveChanges)
+    def compile_tags(self):
+        self.skill_tags = sorted({s.lower() for s in self.needed_skills + self.active_needed_skills})
     
-    class Settings: name = "teams"
+    class Settings:
+        name = "teams"
+        indexes = ["skill_tags", "members", "is_looking_for_members"]
 
 class Block(Document):
     blocker_id: str
@@ -237,7 +271,29 @@ class Swipe(Document):
     type: str 
     related_id: Optional[str] = None
     timestamp: datetime = Field(default_factory=datetime.now)
-    class Settings: name = "swipes"
+    class Settings:
+        name = "swipes"
+        indexes = ["swiper_id"]
+
+class DeckEntry(BaseModel):
+    id: str
+    score: float
+
+class SwipeDeck(Document):
+    """Precomputed, ranked swipe queue: teams for a user ("projects") or users for a user/project ("users")"""
+    owner_id: str
+    kind: str
+    project_id: Optional[str] = None
+    entries: List[DeckEntry] = []
+    stale: bool = False
+    built_at: datetime = Field(default_factory=datetime.now)
+    class Settings:
+        name = "swipe_decks"
+        indexes = [
+            [("owner_id", 1), ("kind", 1), ("project_id", 1)],
+            "project_id",
+            "entries.id", # decks holding a changed user/team get that entry rescored
+        ]
 
 class Match(Document):
     user_id: str
@@ -303,4 +359,73 @@ class ChatMessage(Document):
         indexes = [
             "user_id",
             "timestamp"
-        ]
\ No newline at end of file
+        ]
+
+class Neighbor(BaseModel):
+    id: str
+    score: float
+
+class NeighborList(Document):
+    """Precomputed nearest neighbours of one User/Team by embedding (see knn_graph)"""
+    kind: str # "team" | "user"
+    doc_id: str
+    neighbors: List[Neighbor] = []
+    embedding_hash: Optional[str] = None # hash of the embedding the row was computed from
+    updated_at: datetime = Field(default_factory=datetime.now)
+    class Settings:
+        name = "neighbor_lists"
+        indexes = [[("kind", 1), ("doc_id", 1)]]
+
+# --- PROJECTIONS (lean list views) ---
+# Used with .project(...) so Mongo only sends, and Pydantic only validates, what a
+# list page renders. Embeddings, ratings, tasks and announcements never leave the DB.
+class TeamCard(BaseModel):
+    model_config = ConfigDict(populate_by_name=True)
+    id: PydanticObjectId = Field(alias="_id")
+    name: str
+    description: str
+    members: List[str]
+    needed_skills: List[str] = []
+    leader_id: Optional[str] = None
+    active_needed_skills: List[str] = []
+    is_looking_for_members: bool = True
+    created_at: Optional[datetime] = None
+    target_members: int = 4
+    target_completion_date: Optional[datetime] = None
+    status: str = "planning"
+
+class UserCard(BaseModel):
+    model_config = ConfigDict(populate_by_name=True)
+    id: PydanticObjectId = Field(alias="_id")
+    username: str
+    full_name: Optional[str] = None
+    avatar_url: Optional[str] = None
+    trust_score: float = 5.0
+    is_verified_student: bool = False
+    skills: List[Skill] = []
+    interests: List[str] = []
+    about: Optional[str] = None
+    is_looking_for_team: bool = True
+    school: Optional[str] = None
+
+# Card fields plus what the matching engine scores on. Vectors are read from
+# embedding_store; the int8 code is only set in reduced-embedding mode.
+class TeamMatchView(TeamCard):
+    embedding_hash: Optional[str] = None
+    embedding_model: Optional[str] = None
+    embedding_int8: Optional[str] = None
+    reduced_version: Optional[str] = None
+    cf_vector: List[float] = []
+    availability_profile: Optional[str] = None
+    availability_members: Optional[int] = None
+
+class UserMatchView(UserCard):
+    education: List[Education] = []
+    achievements: List[Achievement] = []
+    availability: List[DayAvailability] = []
+    availability_bits: Optional[str] = None
+    embedding_hash: Optional[str] = None
+    embedding_model: Optional[str] = None
+    embedding_int8: Optional[str] = None
+    reduced_version: Optional[str] = None
+    cf_vector: List[float] = []
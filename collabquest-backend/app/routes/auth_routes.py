@@ -9,6 +9,7 @@ from app.auth.utils import (
 from app.models import User, TrustBreakdown, ConnectedAccounts
 from app.database import init_db
 from app.auth.dependencies import get_current_user
+from app.services import index_hooks
 from typing import Optional
 import os
 import traceback
@@ -117,6 +118,7 @@ async def github_callback(code: str, state: Optional[str] = None):
     
     # Check if user exists in DB
     user = await User.find_one(User.github_id == github_id_str)
+    before = index_hooks.user_snapshot(user) if user else None
     
     if not user:
         # 1. NEW USER PATH
@@ -152,6 +154,9 @@ async def github_callback(code: str, state: Optional[str] = None):
         await user.save() # Update existing
     else:
         await user.insert() # Insert new
+    # Logins mostly re-save unchanged data; only refresh the indexes when something they read moved
+    if before is None or index_hooks.user_snapshot(user) != before:
+        index_hooks.user_changed(user)
     
     # Generate JWT for the Frontend
     jwt_token = create_access_token({"sub": str(user.id)})
@@ -209,6 +214,7 @@ async def register_email(request: EmailRegisterRequest):
         is_verified_student=False
     )
     await user.insert()
+    index_hooks.user_changed(user)
     
     # Generate JWT
     jwt_token = create_access_token({"sub": str(user.id)})
@@ -280,6 +286,7 @@ async def google_callback(code: str):
             is_verified_student=False
         )
         await user.insert()
+        index_hooks.user_changed(user)
     
     # Generate JWT
     jwt_token = create_access_token({"sub": str(user.id)})
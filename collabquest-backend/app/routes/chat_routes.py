@@ -3,6 +3,8 @@ from typing import List, Optional, Dict
 from pydantic import BaseModel
 from app.models import Message, User, ChatGroup, Team, Match, Block, UnreadCount, Attachment
 from app.auth.dependencies import get_current_user
+from app.services.loaders import RequestLoaders, get_loaders
+from app.services.deck_service import block_changed
 from beanie.operators import Or, In, And
 from datetime import datetime
 import traceback
@@ -97,11 +99,13 @@ async def block_user(user_id: str, current_user: User = Depends(get_current_user
     existing = await Block.find_one(Block.blocker_id == str(current_user.id), Block.blocked_id == user_id)
     if not existing:
         await Block(blocker_id=str(current_user.id), blocked_id=user_id).insert()
+        await block_changed(str(current_user.id), user_id)
     return {"status": "blocked"}
 
 @router.post("/unblock/{user_id}")
 async def unblock_user(user_id: str, current_user: User = Depends(get_current_user)):
     await Block.find_one(Block.blocker_id == str(current_user.id), Block.blocked_id == user_id).delete()
+    await block_changed(str(current_user.id), user_id)
     return {"status": "unblocked"}
 
 @router.post("/request/{user_id}/accept")
@@ -131,7 +135,7 @@ async def mark_messages_read(target_id: str, current_user: User = Depends(get_cu
     return {"status": "read"}
 
 @router.get("/conversations")
-async def get_conversations(current_user: User = Depends(get_current_user)):
+async def get_conversations(current_user: User = Depends(get_current_user), loaders: RequestLoaders = Depends(get_loaders)):
     try:
         uid = str(current_user.id)
         results = []
@@ -159,6 +163,7 @@ async def get_conversations(current_user: User = Depends(get_current_user)):
             if m.recipient_id == uid and m.is_read is not True: 
                 partners_map[partner_id]["unread"] += 1
 
+        await loaders.users.load_many([pid for pid in partners_map if pid not in blocked_me_ids])
         for pid, data in partners_map.items():
             try:
                 if pid in blocked_me_ids:
@@ -174,7 +179,7 @@ async def get_conversations(current_user: User = Depends(get_current_user)):
                         "is_blocked_by_them": True
                     })
                 else:
-                    user = await User.get(pid)
+                    user = await loaders.users.load(pid)
                     if user: 
                         results.append({
                             "id": str(user.id), 
@@ -224,7 +229,7 @@ async def get_conversations(current_user: User = Depends(get_current_user)):
         return []
 
 @router.get("/history/{target_id}")
-async def get_chat_history(target_id: str, current_user: User = Depends(get_current_user)):
+async def get_chat_history(target_id: str, current_user: User = Depends(get_current_user), loaders: RequestLoaders = Depends(get_loaders)):
     uid = str(current_user.id)
     group = await ChatGroup.get(target_id)
     messages = []
@@ -261,13 +266,15 @@ async def get_chat_history(target_id: str, current_user: User = Depends(get_curr
         
         messages = await Message.find({"$or": [{"sender_id": uid, "recipient_id": target_id}, {"sender_id": target_id, "recipient_id": uid}]}).sort("timestamp").to_list(None)
 
+    # Fetch sender info (one query for every distinct sender)
+    loaders.users.prime(current_user)
+    senders = await loaders.users.load_many([m.sender_id for m in messages])
+
     enriched_messages = []
-    for m in messages:
+    for m, sender in zip(messages, senders):
         m_dict = m.dict()
         m_dict['id'] = str(m.id)
         m_dict['timestamp'] = str(m.timestamp)
-        # Fetch sender info
-        sender = await User.get(m.sender_id)
         m_dict['sender_name'] = sender.username if sender else "Unknown"
         enriched_messages.append(m_dict)
         
@@ -287,13 +294,12 @@ async def get_total_unread(current_user: User = Depends(get_current_user)):
 # ... Group CRUD ...
 
 @router.get("/groups/{group_id}")
-async def get_group_details(group_id: str, current_user: User = Depends(get_current_user)):
+async def get_group_details(group_id: str, current_user: User = Depends(get_current_user), loaders: RequestLoaders = Depends(get_loaders)):
     group = await ChatGroup.get(group_id)
     if not group: raise HTTPException(404, "Group not found")
     
     members_data = []
-    for uid in group.members:
-        u = await User.get(uid)
+    for u in await loaders.users.load_many(group.members):
         if u:
             members_data.append({
                 "id": str(u.id),
@@ -409,7 +415,7 @@ async def block_group(group_id: str, current_user: User = Depends(get_current_us
     return {"status": "blocked"}
 
 @router.get("/contacts")
-async def get_contacts(current_user: User = Depends(get_current_user)):
+async def get_contacts(current_user: User = Depends(get_current_user), loaders: RequestLoaders = Depends(get_loaders)):
     uid = str(current_user.id)
     known_ids = set()
     matches = await Match.find(Or(Match.user_id == uid, Match.leader_id == uid)).to_list()
@@ -419,8 +425,7 @@ async def get_contacts(current_user: User = Depends(get_current_user)):
         for m_id in t.members:
             if m_id != uid: known_ids.add(m_id)
     contacts = []
-    for pid in known_ids:
-        user = await User.get(pid)
+    for user in await loaders.users.load_many(known_ids):
         if user: contacts.append({"id": str(user.id), "username": user.username, "avatar_url": user.avatar_url or "https://github.com/shadcn.png"})
     return contacts
 
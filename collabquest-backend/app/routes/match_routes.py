@@ -1,14 +1,26 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from typing import List, Optional
 from datetime import datetime, timedelta
 from pydantic import BaseModel
-from app.models import User, Team, Swipe, Match, Notification, Block
+from app.models import User, Team, Swipe, Match, Notification, Block, TeamCard, UserCard, TeamMatchView, UserMatchView
 from app.auth.dependencies import get_current_user
 from app.routes.chat_routes import manager
-from app.services.matching_service import calculate_project_match, calculate_user_compatibility, calculate_match_score
+from app.services.matching_service import calculate_match_scores, calculate_candidate_scores, calculate_user_compatibilities
+from app.services.ann_index import user_index, team_index, shortlist, ANN_CANDIDATES
+from app.services.text_index import team_text_index
+from app.services.hybrid_search import search_teams
+from app.services.loaders import RequestLoaders, get_loaders
+from app.services.projections import card_dict
+from app.services.deck_service import get_deck_page, record_swipe, hidden_team_ids, SERVE_FILTERS
+from app.services.embedding_store import user_vectors, team_vectors
+from app.services.warmup import require_match_data
+from app.services.pagination import top_k_page, score_shortlist, DEFAULT_LIMIT, MAX_LIMIT
 from beanie.operators import Or
+from bson import ObjectId
 import traceback
+import asyncio
 import random
+import re
 
 router = APIRouter()
 
@@ -91,63 +103,78 @@ async def create_match(user_id: str, project_id: str, leader_id: str):
         pass
     return True
 
-@router.get("/projects")
+@router.get("/projects", dependencies=[Depends(require_match_data)])
 async def match_projects_for_user(
     current_user: User = Depends(get_current_user),
     search: Optional[str] = None,
     skills: Optional[List[str]] = Query(None),
     min_members: Optional[int] = None,
     max_members: Optional[int] = None,
-    recruiting_only: bool = True
+    recruiting_only: bool = True,
+    fields: Optional[str] = None,
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    cursor: Optional[str] = None,
+    response: Response = None
 ):
     my_id = str(current_user.id)
     # Fetch Blocked List
     blocks = await Block.find({"$or": [{"blocker_id": my_id}, {"blocked_id": my_id}]}).to_list()
     blocked_ids = set([b.blocked_id if b.blocker_id == my_id else b.blocker_id for b in blocks])
 
-    all_teams = await Team.find_all().to_list()
-    candidates = []
-    search_lower = search.lower() if search else None
-    
-    for t in all_teams:
-        if str(current_user.id) in t.members: continue
-        # Filter blocked leaders
-        if t.leader_id in blocked_ids: continue
-        
-        if recruiting_only and not t.is_looking_for_members: continue
-        if search_lower and search_lower not in t.name.lower(): continue
-        if min_members is not None and len(t.members) < min_members: continue
-        if max_members is not None and len(t.members) > max_members: continue
-        if skills:
-            team_skills = set(s.lower() for s in (t.needed_skills + t.active_needed_skills))
-            req_skills = set(s.lower() for s in skills)
-            if not team_skills.intersection(req_skills): continue
-        candidates.append(t)
-    
+    # Every eligibility rule is a Mongo predicate, so only candidates leave the database
+    query = {"members": {"$ne": my_id}}
+    if blocked_ids: query["leader_id"] = {"$nin": list(blocked_ids)}
+    if recruiting_only: query["is_looking_for_members"] = {"$ne": False}
+    size_rules = []
+    if min_members is not None: size_rules.append({"$gte": [{"$size": {"$ifNull": ["$members", []]}}, min_members]})
+    if max_members is not None: size_rules.append({"$lte": [{"$size": {"$ifNull": ["$members", []]}}, max_members]})
+    if size_rules: query["$expr"] = {"$and": size_rules}
+    if skills: query["skill_tags"] = {"$in": [s.lower() for s in skills]}
+
+    # Stage 1: a search runs hybrid keyword + semantic retrieval; otherwise a semantic
+    # shortlist of eligible teams comes from the ANN index (filters included)
+    search_scores = {}
+    use_hybrid = bool(search) and team_text_index.ready
+    if use_hybrid:
+        search_scores = dict(await search_teams(search, ANN_CANDIDATES))
+        candidate_ids = list(search_scores)
+    else:
+        if search: query["name"] = {"$regex": re.escape(search), "$options": "i"}
+        # Own and blocked leaders' teams are skipped in the index; closed or full ones by the filter
+        hidden = await hidden_team_ids(my_id, blocked_ids)
+        candidate_ids = await shortlist(team_index, user_vectors.get(current_user.id), Team.get_pymongo_collection(), query, hidden)
+
+    # Stage 2: re-rank the shortlist with the full 70/30 formula
+    # (scores repeat across pages through score_cache)
+    by_id, scored = await score_shortlist(Team, query, candidate_ids, TeamMatchView, lambda batch: calculate_match_scores(current_user, batch))
+    match_scores = dict(scored)
+    # A search is ordered by its fused relevance; browsing by match score
+    ranking = [(tid, search_scores[tid]) for tid in by_id] if use_hybrid else scored
+    page, next_cursor = top_k_page(ranking, limit, cursor)
+    if next_cursor: response.headers["X-Next-Cursor"] = next_cursor
+
     scored_projects = []
-    for team in candidates:
-        member_objects = []
-        for m_id in team.members:
-            user = await User.get(m_id)
-            if user: member_objects.append(user)
-        
-        score = await calculate_match_score(current_user, team, member_objects)
-        team_dict = team.dict()
+    for team_id, _ in page:
+        team = by_id[team_id]
+        team_dict = card_dict(team, TeamCard, fields)
         team_dict["id"] = str(team.id)
         team_dict["_id"] = str(team.id)
-        team_dict["match_score"] = score
+        team_dict["match_score"] = match_scores[team_id]
+        if use_hybrid: team_dict["search_score"] = round(search_scores.get(str(team.id), 0.0), 4)
         scored_projects.append(team_dict)
-            
-    scored_projects.sort(key=lambda x: x["match_score"], reverse=True)
     return scored_projects
 
-@router.get("/users")
+@router.get("/users", dependencies=[Depends(require_match_data)])
 async def match_teammates_for_user(
     project_id: Optional[str] = None, 
     search: Optional[str] = None,
     skills: Optional[List[str]] = Query(None),
     interests: Optional[List[str]] = Query(None),
     randomize: bool = False,
+    fields: Optional[str] = None,
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    cursor: Optional[str] = None,
+    response: Response = None,
     current_user: User = Depends(get_current_user)
 ):
     my_id = str(current_user.id)
@@ -155,64 +182,99 @@ async def match_teammates_for_user(
     blocks = await Block.find({"$or": [{"blocker_id": my_id}, {"blocked_id": my_id}]}).to_list()
     blocked_ids = set([b.blocked_id if b.blocker_id == my_id else b.blocker_id for b in blocks])
 
-    all_users = await User.find_all().to_list()
     exclude_ids = {my_id}
     
     target_project = None
-    existing_members_objects = []
 
     if project_id:
         target_project = await Team.get(project_id)
         if target_project:
             for member_id in target_project.members:
                 exclude_ids.add(member_id)
-                m_user = await User.get(member_id)
-                if m_user: existing_members_objects.append(m_user)
     else:
         my_teams = await Team.find(Team.members == my_id).to_list()
         for team in my_teams:
             for member_id in team.members:
                 exclude_ids.add(member_id)
 
-    candidates = []
-    search_lower = search.lower() if search else None
-    
-    for u in all_users:
-        if str(u.id) in exclude_ids: continue
-        if str(u.id) in blocked_ids: continue # Exclude blocked users
-        if not u.is_looking_for_team: continue
-        if search_lower and search_lower not in u.username.lower(): continue
-        if skills:
-            user_skills = set(s.name.lower() for s in u.skills)
-            req_skills = set(s.lower() for s in skills)
-            if not user_skills.intersection(req_skills): continue
-        if interests:
-            user_interests = set(i.lower() for i in u.interests)
-            req_interests = set(i.lower() for i in interests)
-            if not user_interests.intersection(req_interests): continue
-        candidates.append(u)
+    excluded = [ObjectId(uid) for uid in exclude_ids | blocked_ids if ObjectId.is_valid(uid)]
+    query = {"_id": {"$nin": excluded}, "is_looking_for_team": {"$ne": False}}
+    if search: query["username"] = {"$regex": re.escape(search), "$options": "i"}
+    if skills: query["skill_tags"] = {"$in": [s.lower() for s in skills]}
+    if interests: query["interest_tags"] = {"$in": [i.lower() for i in interests]}
 
-    scored_users = []
-    for candidate in candidates:
-        if target_project:
-            score = await calculate_match_score(candidate, target_project, existing_members_objects)
-        else:
-            score = await calculate_user_compatibility(current_user, candidate)
+    # Stage 1: semantic shortlist of eligible users around the project (or the current user)
+    query_vec = team_vectors.get(target_project.id) if target_project else user_vectors.get(current_user.id)
+    candidate_ids = await shortlist(user_index, query_vec, User.get_pymongo_collection(), query, exclude_ids | blocked_ids)
 
-        user_dict = candidate.dict()
+    # Stage 2: re-rank the shortlist with the full 70/30 formula
+    if target_project: score = lambda batch: calculate_candidate_scores(batch, target_project)
+    else: score = lambda batch: calculate_user_compatibilities(current_user, batch)
+    by_id, scored = await score_shortlist(User, query, candidate_ids, UserMatchView, score)
+    page, next_cursor = top_k_page(scored, limit, cursor)
+    if next_cursor: response.headers["X-Next-Cursor"] = next_cursor
+
+    scored_users = []
+    for candidate_id, score in page:
+        candidate = by_id[candidate_id]
+        user_dict = card_dict(candidate, UserCard, fields)
         user_dict["id"] = str(candidate.id)
         user_dict["_id"] = str(candidate.id)
         user_dict["match_score"] = score
         scored_users.append(user_dict)
             
     if randomize:
+        # Shuffles within the page; pages still follow the ranking
         random.shuffle(scored_users)
-    else:
-        scored_users.sort(key=lambda x: x["match_score"], reverse=True)
         
     return scored_users
 
 
+async def _deck_response(page: dict, model, card_model, fields: Optional[str], kind: str) -> dict:
+    # Cards come from one $in query and keep the deck's order; cards that stopped being eligible are skipped
+    ids = [e.id for e in page["entries"]]
+    query = {"_id": {"$in": [ObjectId(i) for i in ids if ObjectId.is_valid(i)]}, **SERVE_FILTERS[kind]}
+    docs = await model.find(query).project(card_model).to_list()
+    by_id = {str(d.id): d for d in docs}
+    items = []
+    for entry in page["entries"]:
+        doc = by_id.get(entry.id)
+        if not doc: continue
+        item = card_dict(doc, card_model, fields)
+        item["id"] = entry.id
+        item["_id"] = entry.id
+        item["match_score"] = entry.score
+        items.append(item)
+    return {"items": items, "next_cursor": page["next_cursor"], "remaining": page["remaining"], "built_at": page["built_at"]}
+
+@router.get("/deck/projects", dependencies=[Depends(require_match_data)])
+async def get_project_deck(
+    cursor: Optional[str] = None,
+    limit: int = Query(10, ge=1, le=50),
+    fields: Optional[str] = None,
+    current_user: User = Depends(get_current_user)
+):
+    """Swipe queue of projects for the current user, precomputed and cursor-paged"""
+    page = await get_deck_page(current_user, "projects", cursor=cursor, limit=limit)
+    return await _deck_response(page, Team, TeamCard, fields, "projects")
+
+@router.get("/deck/users", dependencies=[Depends(require_match_data)])
+async def get_user_deck(
+    project_id: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(10, ge=1, le=50),
+    fields: Optional[str] = None,
+    current_user: User = Depends(get_current_user)
+):
+    """Swipe queue of candidates for a project (leader only), or of teammates for the current user"""
+    project = None
+    if project_id:
+        project = await Team.get(project_id)
+        if not project: raise HTTPException(404, "Team not found")
+        if not project.members or str(current_user.id) != project.members[0]: raise HTTPException(403, "Only the Team Leader can view candidates")
+    page = await get_deck_page(current_user, "users", project, cursor=cursor, limit=limit)
+    return await _deck_response(page, User, UserCard, fields, "users")
+
 @router.post("/swipe")
 async def handle_swipe(data: SwipeRequest, current_user: User = Depends(get_current_user)):
     try:
@@ -258,6 +320,7 @@ async def handle_swipe(data: SwipeRequest, current_user: User = Depends(get_curr
                 type=data.type, 
                 related_id=data.related_id
             ).insert()
+        await record_swipe(str(current_user.id), data.target_id, data.type, data.related_id)
         
         if data.direction == "left":
             return {"status": "passed", "is_match": False}
@@ -383,36 +446,42 @@ async def handle_swipe(data: SwipeRequest, current_user: User = Depends(get_curr
         raise HTTPException(status_code=500, detail="Server Error")
     
 @router.get("/mine", response_model=List[MatchResponse])
-async def get_my_matches(current_user: User = Depends(get_current_user)):
+async def get_my_matches(current_user: User = Depends(get_current_user), loaders: RequestLoaders = Depends(get_loaders)):
     uid = str(current_user.id)
     matches_as_candidate = await Match.find(Match.user_id == uid).to_list()
     matches_as_leader = await Match.find(Match.leader_id == uid).to_list()
+    all_matches = matches_as_candidate + matches_as_leader
+    # One round trip per collection for every leader, candidate and project
+    await asyncio.gather(
+        loaders.users.load_many([m.leader_id for m in matches_as_candidate] + [m.user_id for m in matches_as_leader]),
+        loaders.teams.load_many([m.project_id for m in all_matches])
+    )
     results = []
     for m in matches_as_candidate:
         try:
-            leader = await User.get(m.leader_id)
-            project = await Team.get(m.project_id)
+            leader = await loaders.users.load(m.leader_id)
+            project = await loaders.teams.load(m.project_id)
             if leader and project:
                 results.append({"id": str(leader.id), "name": leader.username, "avatar": leader.avatar_url or "https://github.com/shadcn.png", "contact": leader.email, "role": "Team Leader", "project_id": str(project.id), "project_name": project.name, "status": m.status, "rejected_by": m.rejected_by})
         except: continue
     for m in matches_as_leader:
         try:
-            candidate = await User.get(m.user_id)
-            project = await Team.get(m.project_id)
+            candidate = await loaders.users.load(m.user_id)
+            project = await loaders.teams.load(m.project_id)
             if candidate and project:
                 results.append({"id": str(candidate.id), "name": candidate.username, "avatar": candidate.avatar_url or "https://github.com/shadcn.png", "contact": candidate.email, "role": "Teammate", "project_id": str(project.id), "project_name": project.name, "status": m.status, "rejected_by": m.rejected_by})
         except: continue
     return results
 
 @router.get("/team/{team_id}", response_model=List[MatchResponse])
-async def get_team_matches(team_id: str, current_user: User = Depends(get_current_user)):
+async def get_team_matches(team_id: str, current_user: User = Depends(get_current_user), loaders: RequestLoaders = Depends(get_loaders)):
     team = await Team.get(team_id)
     if not team: raise HTTPException(404, "Team not found")
     if str(current_user.id) != team.members[0]: raise HTTPException(403, "Only the Team Leader can view candidates")
     matches = await Match.find(Match.project_id == team_id, Match.leader_id == str(current_user.id)).to_list()
+    candidates = await loaders.users.load_many([m.user_id for m in matches])
     results = []
-    for m in matches:
-        candidate = await User.get(m.user_id)
+    for m, candidate in zip(matches, candidates):
         if candidate:
             results.append({"id": str(candidate.id), "name": candidate.username, "avatar": candidate.avatar_url or "https://github.com/shadcn.png", "contact": candidate.email, "role": "Teammate", "project_id": str(team.id), "project_name": team.name, "status": m.status, "rejected_by": m.rejected_by})
     return results
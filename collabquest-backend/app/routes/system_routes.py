@@ -0,0 +1,40 @@
+from fastapi import APIRouter, Depends
+from app.models import User
+from app.auth.dependencies import get_current_admin
+from app.services.embedding_service import get_embedding_metrics
+from app.services.vector_store import embedding_cache
+from app.services.model_registry import get_model_metrics
+from app.services.recommendation_service import chroma_status, writer_stats
+from app.services.score_cache import score_cache
+from app.services.deck_service import deck_stats
+from app.services.embedding_store import stores
+from app.services.embedding_backfill import backfill_status, wake_embedding_backfill
+from app.services.warmup import warmup_status
+
+router = APIRouter()
+
+@router.get("/metrics")
+async def get_system_metrics(admin: User = Depends(get_current_admin)):
+    """Operational counters for the in-process AI services"""
+    return {
+        "startup": warmup_status,
+        "embeddings": get_embedding_metrics(),
+        "embedding_cache": embedding_cache.get_metrics(),
+        "vector_store": {kind: store.get_metrics() for kind, store in stores.items()},
+        "models": get_model_metrics(),
+        "chroma": {**chroma_status, "write_through": writer_stats},
+        "embedding_backfill": backfill_status,
+        "match_score_cache": score_cache.get_metrics(),
+        "swipe_decks": deck_stats,
+    }
+
+@router.get("/ready")
+async def get_readiness():
+    """Whether the background startup work (indexes, models) has finished, and whether /matches is serving"""
+    return {"ready": warmup_status["ready"], "match_data_ready": warmup_status["match_data_ready"], "current": warmup_status["current"]}
+
+@router.post("/embeddings/backfill")
+async def trigger_embedding_backfill(admin: User = Depends(get_current_admin)):
+    """Starts the next backfill pass now (e.g. right after a bulk import)"""
+    wake_embedding_backfill()
+    return {"status": "scheduled", **backfill_status}
@@ -1,11 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, Header
+from fastapi import APIRouter, Depends, HTTPException, Header, Query
 from typing import List, Optional
 from datetime import datetime, timedelta
-from app.models import Team, User, Notification, Match, ChatGroup, DeletionRequest, CompletionRequest, Swipe, Task, MemberRequest, Rating, RatingBreakdown, ExtensionRequest, Announcement
+from app.models import Team, User, Notification, Match, ChatGroup, DeletionRequest, CompletionRequest, Swipe, Task, MemberRequest, Rating, RatingBreakdown, ExtensionRequest, Announcement, TeamCard
 from app.auth.dependencies import get_current_user
 from app.services.ai_roadmap import generate_roadmap, suggest_tech_stack
 from app.routes.chat_routes import manager 
-from app.services.vector_store import generate_embedding
+from app.services.profile_text import refresh_team_embedding
+from app.services import index_hooks
+from app.services.loaders import RequestLoaders, get_loaders
+from app.services.team_availability import member_joined, member_left, has_schedule
+from app.services.availability import get_bits, profile_from_bits
+from app.services.projections import sparse_model
+from app.services.knn_graph import similar_cards, K as SIMILAR_MAX
+from app.services.deck_service import SERVE_FILTERS, blocked_ids
 from pydantic import BaseModel
 import math
 from app.auth.utils import verify_token 
@@ -168,7 +175,7 @@ async def clear_swipes(user_id: str, team_id: str, leader_id: str):
     await Swipe.find(Swipe.swiper_id == leader_id, Swipe.target_id == user_id).delete()
 
 @router.get("/top")
-async def get_top_projects():
+async def get_top_projects(loaders: RequestLoaders = Depends(get_loaders)):
     """Returns top 10 projects based on Favorites count (Aggregation)"""
     pipeline = [
         {"$unwind": "$favorites"},
@@ -180,6 +187,7 @@ async def get_top_projects():
     cursor = User.get_pymongo_collection().aggregate(pipeline)
     agg_results = await cursor.to_list(length=10)
     
+    await loaders.teams.load_many([item["_id"] for item in agg_results])
     results = []
     for item in agg_results:
         team_id = item["_id"]
@@ -188,7 +196,7 @@ async def get_top_projects():
         # Validate ID format
         if not ObjectId.is_valid(team_id): continue
         
-        team = await Team.get(team_id)
+        team = await loaders.teams.load(team_id)
         if team:
             # Handle leader fallback logic same as other endpoints
             actual_leader_id = team.leader_id or (team.members[0] if team.members else None)
@@ -206,10 +214,6 @@ async def get_top_projects():
 
 @router.post("/", response_model=Team)
 async def create_team(team_data: TeamCreate, current_user: User = Depends(get_current_user)):
-    skills_to_embed = team_data.active_needed_skills if team_data.active_needed_skills else team_data.needed_skills
-    team_text = f"{team_data.name} {team_data.description} {' '.join(skills_to_embed)}"
-    embedding_vec = generate_embedding(team_text)
-
     new_team = Team(
         name=team_data.name, 
         description=team_data.description,
@@ -218,18 +222,22 @@ async def create_team(team_data: TeamCreate, current_user: User = Depends(get_cu
         needed_skills=team_data.needed_skills,
         active_needed_skills=team_data.active_needed_skills, 
         project_roadmap={},
-        embedding=embedding_vec
+        availability_profile=profile_from_bits([get_bits(current_user)]),
+        availability_members=has_schedule(current_user)
     )
+    await refresh_team_embedding(new_team)
     await new_team.insert()
+    index_hooks.team_changed(new_team)
     return new_team
 
-@router.get("/", response_model=List[Team])
-async def get_all_teams():
-    teams = await Team.find_all().to_list()
+@router.get("/")
+async def get_all_teams(fields: Optional[str] = None):
+    """Marketplace list: TeamCard projection, optionally narrowed with ?fields=a,b"""
+    teams = await Team.find_all().project(sparse_model(TeamCard, fields)).to_list()
     return teams
 
 @router.get("/{team_id}", response_model=TeamDetailResponse)
-async def get_team_details(team_id: str, current_user: Optional[User] = Depends(get_optional_user)):
+async def get_team_details(team_id: str, current_user: Optional[User] = Depends(get_optional_user), loaders: RequestLoaders = Depends(get_loaders)):
     team = await Team.get(team_id)
     if not team: raise HTTPException(404, detail="Team not found")
     if check_vote_expiration(team):
@@ -237,8 +245,7 @@ async def get_team_details(team_id: str, current_user: Optional[User] = Depends(
     actual_leader_id = team.leader_id or (team.members[0] if team.members else None)
     member_objects = []
     rated_ids = []
-    for uid in team.members:
-        user = await User.get(uid)
+    for user in await loaders.users.load_many(team.members):
         if user:
             member_objects.append({
                 "id": str(user.id), "username": user.username,
@@ -300,13 +307,12 @@ async def update_team_details(team_id: str, data: TeamUpdate, current_user: User
             team.target_completion_date = datetime.fromisoformat(data.target_completion_date.replace('Z', '+00:00'))
         except: team.target_completion_date = None
     
-    skills_text = ' '.join(team.active_needed_skills) if team.active_needed_skills else ' '.join(team.needed_skills)
-    team_text = f"{team.name} {team.description} {skills_text}"
-    team.embedding = generate_embedding(team_text)
+    await refresh_team_embedding(team)
     if not team.leader_id:
         team.leader_id = team.members[0]
 
     await team.save()
+    index_hooks.team_changed(team)
     return team
 
 # --- MEMBER ACTIONS (Invite/Add/Reject) ---
@@ -359,7 +365,9 @@ async def add_member(team_id: str, req: InviteRequest, current_user: User = Depe
     leader_id = team.leader_id or team.members[0]
     
     if candidate_id not in team.members:
+        candidate_user = await User.get(candidate_id)
         team.members.append(candidate_id)
+        if candidate_user: await member_joined(team, candidate_user)
         if len(team.members) >= team.target_members:
             team.is_looking_for_members = False
         await team.save()
@@ -372,7 +380,6 @@ async def add_member(team_id: str, req: InviteRequest, current_user: User = Depe
             # Candidate accepting invite
             await Notification.find(Notification.recipient_id == candidate_id, Notification.type == "team_invite", Notification.related_id == team_id).update({"$set": {"action_status": "accepted", "is_read": True}})
         
-        candidate_user = await User.get(candidate_id)
         c_name = candidate_user.username if candidate_user else "A new member"
         
         # Welcome notifications
@@ -432,6 +439,7 @@ async def remove_member(team_id: str, user_id: str, current_user: User = Depends
     
     if user_id in team.members:
         team.members.remove(user_id)
+        await member_left(team, await User.get(user_id))
         # Clear active votes for this user
         if team.deletion_request and user_id in team.deletion_request.votes:
             del team.deletion_request.votes[user_id]
@@ -604,17 +612,33 @@ async def vote_task_extension(team_id: str, task_id: str, vote: VoteRequest, cur
     await team.save()
     return {"status": status_msg}
 
+@router.get("/{team_id}/similar")
+async def get_similar_teams(
+    team_id: str,
+    limit: int = Query(10, ge=1, le=SIMILAR_MAX),
+    fields: Optional[str] = None,
+    current_user: User = Depends(get_current_user)
+):
+    """Related projects from the precomputed kNN graph (see build_knn.py), limited to ones the deck would serve"""
+    my_id = str(current_user.id)
+    query = {"members": {"$ne": my_id}, **SERVE_FILTERS["projects"]}
+    blocked = await blocked_ids(my_id)
+    if blocked: query["leader_id"] = {"$nin": list(blocked)}
+    similar = await similar_cards("team", team_id, SIMILAR_MAX, fields, query)
+    return similar[:limit]
+
 @router.get("/{team_id}/tasks", response_model=List[TaskDetailResponse])
-async def get_team_tasks(team_id: str):
+async def get_team_tasks(team_id: str, loaders: RequestLoaders = Depends(get_loaders)):
     team = await Team.get(team_id)
     if not team: raise HTTPException(404)
     results = []
     now = datetime.now()
     has_changes = False 
     leader_id = team.leader_id or team.members[0]
+    await loaders.users.load_many([t.assignee_id for t in team.tasks])
     
     for t in team.tasks:
-        assignee = await User.get(t.assignee_id)
+        assignee = await loaders.users.load(t.assignee_id)
         is_overdue = False
         if t.status == "completed" and t.completed_at:
             if t.completed_at > t.deadline: is_overdue = True
@@ -681,9 +705,9 @@ async def update_team_skills(team_id: str, data: SkillsUpdate, current_user: Use
     if not team: raise HTTPException(404)
     if team.status == "completed": raise HTTPException(400, "Project is locked")
     team.needed_skills = data.needed_skills
-    team_text = f"{team.name} {team.description} {' '.join(team.needed_skills)}"
-    team.embedding = generate_embedding(team_text)
+    await refresh_team_embedding(team)
     await team.save()
+    index_hooks.team_changed(team)
     return team
 
 @router.post("/suggest-stack")
@@ -738,6 +762,7 @@ async def leave_project(team_id: str, req: ActionWithExplanation, current_user:
     
     if team.status == "planning":
         team.members.remove(uid)
+        await member_left(team, current_user)
         await team.save()
         await Notification(recipient_id=leader_id, sender_id=uid, message=f"{current_user.username} left the team. Reason: {req.explanation}", type="info").insert()
         await manager.send_personal_message({"event": "dashboardUpdate"}, leader_id)
@@ -781,6 +806,7 @@ async def remove_member_request(team_id: str, user_id: str, req: ActionWithExpla
     target_name = target_user.username if target_user else "Member"
     if team.status == "planning":
         team.members.remove(user_id)
+        await member_left(team, target_user)
         await team.save()
         await Notification(recipient_id=user_id, sender_id=str(current_user.id), message=f"You were removed from {team.name}. Reason: {req.explanation}", type="info").insert()
         await manager.send_personal_message({"event": "dashboardUpdate"}, user_id)
@@ -832,6 +858,7 @@ async def vote_member_request(team_id: str, request_id: str, vote: VoteRequest,
         target_id = req.target_user_id
         if target_id in team.members:
             team.members.remove(target_id)
+            await member_left(team, await User.get(target_id))
             await Match.find(Match.project_id == team_id, Match.user_id == target_id).delete()
             await clear_swipes(target_id, team_id, leader_id)
             action_text = "left" if req.type == "leave" else "removed from"
@@ -869,6 +896,7 @@ async def initiate_deletion(team_id: str, current_user: User = Depends(get_curre
     if team.status == "completed": raise HTTPException(400, "Project is locked")
     if len(team.members) == 1:
         await team.delete()
+        index_hooks.team_removed(team_id)
         return {"status": "deleted"}
     uid = str(current_user.id)
     req = DeletionRequest(is_active=True, initiator_id=uid, votes={})
@@ -912,6 +940,7 @@ async def vote_deletion(team_id: str, vote: VoteRequest, current_user: User = De
     # 1. Consensus Reached (Deleted)
     if approvals >= math.ceil(total * 0.7):
         await team.delete()
+        index_hooks.team_removed(team_id)
         await ChatGroup.find(ChatGroup.team_id == team_id).delete()
         await Match.find(Match.project_id == team_id).delete()
         for m_id in team.members:
@@ -4,15 +4,24 @@ from pydantic import BaseModel
 from app.models import (
     User, Skill, DayAvailability, TimeRange, Block, Link, Achievement, 
     ConnectedAccounts, Education, Team, VisibilitySettings, Notification,
-    ChatGroup, Message, UnreadCount, Match, Swipe
+    ChatGroup, Message, UnreadCount, Match, Swipe, TeamCard, UserCard
 )
 from app.auth.dependencies import get_current_user
-from app.services.vector_store import generate_embedding
+from app.services.profile_text import refresh_user_embedding
 from app.auth.utils import fetch_codeforces_stats, fetch_leetcode_stats, update_trust_score
 from app.services.matching_service import calculate_user_compatibility
+from app.services import index_hooks
+from app.services.loaders import RequestLoaders, get_loaders
+from app.services.team_availability import member_schedule_changed, member_left, has_schedule
+from app.services.availability import get_bits
+from app.services.projections import sparse_model
+from app.services.directory_index import user_directory
+from app.services.deck_service import block_changed, blocked_ids
+from app.services.knn_graph import similar_cards, K as SIMILAR_MAX
 from beanie.operators import Or
 from bson import ObjectId
 from datetime import datetime
+import re
 
 router = APIRouter()
 
@@ -101,6 +110,8 @@ async def block_user(user_id: str, current_user: User = Depends(get_current_user
     await Notification.find(Notification.sender_id == str(current_user.id), Notification.recipient_id == user_id).delete()
     await Notification.find(Notification.sender_id == user_id, Notification.recipient_id == str(current_user.id)).delete()
     
+    await block_changed(str(current_user.id), user_id)
+
     # 5. Remove from Teams where blocker is leader? (Optional based on 'wont appear for project matches', but usually blocking implies removing from potential future interactions. Removing from existing active teams is drastic but requested 'remove trace'.)
     # For now, we stick to removing matches/connections. Removing from active team is complex logic (votes etc).
     
@@ -109,12 +120,13 @@ async def block_user(user_id: str, current_user: User = Depends(get_current_user
 @router.post("/{user_id}/unblock")
 async def unblock_user(user_id: str, current_user: User = Depends(get_current_user)):
     await Block.find(Block.blocker_id == str(current_user.id), Block.blocked_id == user_id).delete()
+    await block_changed(str(current_user.id), user_id)
     return {"status": "unblocked"}
 
 # --- NETWORK & CONNECTIONS (UPDATED) ---
 
-@router.get("/network", response_model=List[User])
-async def get_my_network(current_user: User = Depends(get_current_user)):
+@router.get("/network")
+async def get_my_network(fields: Optional[str] = None, current_user: User = Depends(get_current_user)):
     my_id = str(current_user.id)
     
     # Fetch Blocked List
@@ -135,11 +147,29 @@ async def get_my_network(current_user: User = Depends(get_current_user)):
     
     if not final_ids: return []
     valid_ids = [ObjectId(uid) for uid in final_ids if ObjectId.is_valid(uid)]
-    users = await User.find({"_id": {"$in": valid_ids}}).to_list()
+    users = await User.find({"_id": {"$in": valid_ids}}).project(sparse_model(UserCard, fields)).to_list()
     return users
 
+async def _search_directory_in_mongo(query, skill, exclude: set, offset: int, limit: int) -> list:
+    """Same matching as the directory index, answered by Mongo while the index is still building"""
+    conditions = [{"_id": {"$nin": [ObjectId(i) for i in exclude if ObjectId.is_valid(i)]}}]
+    if query:
+        pattern = {"$regex": re.escape(query.strip()), "$options": "i"}
+        conditions.append({"$or": [{"username": pattern}, {"full_name": pattern}]})
+    if skill:
+        conditions.append({"skills.name": {"$regex": re.escape(skill.strip()), "$options": "i"}})
+    docs = await User.get_pymongo_collection().find({"$and": conditions}, {"_id": 1}) \
+        .sort([("username", 1), ("_id", 1)]).skip(offset).limit(limit).to_list(None)
+    return [str(d["_id"]) for d in docs]
+
 @router.get("/search", response_model=List[dict])
-async def search_users_directory(query: Optional[str] = None, skill: Optional[str] = None, current_user: User = Depends(get_current_user)):
+async def search_users_directory(
+    query: Optional[str] = None,
+    skill: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+    current_user: User = Depends(get_current_user)
+):
     my_id = str(current_user.id)
     
     # Fetch Blocked List
@@ -151,37 +181,38 @@ async def search_users_directory(query: Optional[str] = None, skill: Optional[st
     for t in teams:
         for m in t.members: connected_ids.add(m)
 
-    all_users = await User.find_all().to_list()
+    # Directory index -> one page of ids (ordered by username) -> only that page is loaded
+    if user_directory.ready:
+        matched_ids = user_directory.search(query, skill, exclude=blocked_ids | {my_id})
+        page_ids = matched_ids[offset:offset + limit]
+    else:
+        page_ids = await _search_directory_in_mongo(query, skill, blocked_ids | {my_id}, offset, limit)
+    if not page_ids: return []
+    users = await User.find({"_id": {"$in": [ObjectId(uid) for uid in page_ids]}}).project(UserCard).to_list()
+    users_by_id = {str(u.id): u for u in users}
+
+    # Pending connection requests for the whole page in one query
+    pending = await Notification.find(
+        {"recipient_id": {"$in": page_ids}},
+        Notification.sender_id == my_id,
+        Notification.type == "connection_request",
+        Notification.action_status == "pending"
+    ).to_list()
+    requested_ids = {n.recipient_id for n in pending}
+
     results = []
-    q_lower = query.lower() if query else ""
-    s_lower = skill.lower() if skill else ""
-    
-    for u in all_users:
-        if str(u.id) == my_id: continue
-        if str(u.id) in blocked_ids: continue # Skip blocked users
-        
-        match_q = True
-        if q_lower: match_q = q_lower in u.username.lower() or (u.full_name and q_lower in u.full_name.lower())
-        match_s = True
-        if s_lower: match_s = any(s_lower in s.name.lower() for s in u.skills)
-            
-        if match_q and match_s:
-            is_conn = str(u.id) in connected_ids
-            pending = await Notification.find_one(
-                Notification.recipient_id == str(u.id), 
-                Notification.sender_id == my_id,
-                Notification.type == "connection_request",
-                Notification.action_status == "pending"
-            )
-            results.append({
-                "id": str(u.id),
-                "username": u.username,
-                "full_name": u.full_name,
-                "avatar_url": u.avatar_url,
-                "skills": u.skills,
-                "is_connected": is_conn,
-                "request_sent": bool(pending)
-            })
+    for uid in page_ids:
+        u = users_by_id.get(uid)
+        if not u: continue
+        results.append({
+            "id": uid,
+            "username": u.username,
+            "full_name": u.full_name,
+            "avatar_url": u.avatar_url,
+            "skills": u.skills,
+            "is_connected": uid in connected_ids,
+            "request_sent": uid in requested_ids
+        })
     return results
 
 @router.post("/connection-request/{target_id}")
@@ -218,15 +249,15 @@ async def send_connection_request(target_id: str, current_user: User = Depends(g
 # --- REQUEST MANAGEMENT ---
 
 @router.get("/requests/received", response_model=List[dict])
-async def get_received_requests(current_user: User = Depends(get_current_user)):
+async def get_received_requests(current_user: User = Depends(get_current_user), loaders: RequestLoaders = Depends(get_loaders)):
     notifs = await Notification.find(Notification.recipient_id == str(current_user.id), Notification.type == "connection_request", Notification.action_status == "pending").to_list()
+    # Filter blocked senders: one Block query for the whole list, then only the rest are loaded
+    blocked = await blocked_ids(str(current_user.id))
+    notifs = [n for n in notifs if n.sender_id not in blocked]
+    senders = await loaders.users.load_many([n.sender_id for n in notifs])
     results = []
-    for n in notifs:
-        sender = await User.get(n.sender_id)
+    for n, sender in zip(notifs, senders):
         if sender:
-            # Filter blocked senders
-            is_blocked = await Block.find_one({"$or": [{"blocker_id": str(current_user.id), "blocked_id": str(sender.id)}, {"blocker_id": str(sender.id), "blocked_id": str(current_user.id)}]})
-            if is_blocked: continue
 
             sender_dict = sender.dict()
             sender_dict["id"] = str(sender.id)
@@ -235,16 +266,16 @@ async def get_received_requests(current_user: User = Depends(get_current_user)):
     return results
 
 @router.get("/requests/sent", response_model=List[dict])
-async def get_sent_requests(current_user: User = Depends(get_current_user)):
+async def get_sent_requests(current_user: User = Depends(get_current_user), loaders: RequestLoaders = Depends(get_loaders)):
     notifs = await Notification.find(
         Notification.sender_id == str(current_user.id),
         Notification.type == "connection_request",
         Notification.action_status == "pending"
     ).to_list()
     
+    recipients = await loaders.users.load_many([n.recipient_id for n in notifs])
     results = []
-    for n in notifs:
-        recipient = await User.get(n.recipient_id)
+    for n, recipient in zip(notifs, recipients):
         if recipient:
             # FIX: Manually Convert to Dict and ensure ID is string
             recipient_dict = recipient.dict()
@@ -317,6 +348,18 @@ async def get_user_compatibility_score(user_id: str, current_user: User = Depend
     score = await calculate_user_compatibility(current_user, target_user)
     return {"score": score}
 
+@router.get("/{user_id}/similar")
+async def get_similar_users(
+    user_id: str,
+    limit: int = Query(10, ge=1, le=SIMILAR_MAX),
+    fields: Optional[str] = None,
+    current_user: User = Depends(get_current_user)
+):
+    """Related developers from the precomputed kNN graph (see build_knn.py)"""
+    hidden = await blocked_ids(str(current_user.id)) | {str(current_user.id)}
+    similar = await similar_cards("user", user_id, SIMILAR_MAX, fields)
+    return [u for u in similar if u["id"] not in hidden][:limit]
+
 @router.delete("/me", response_model=dict)
 async def delete_my_account(current_user: User = Depends(get_current_user)):
     """
@@ -343,6 +386,7 @@ async def delete_my_account(current_user: User = Depends(get_current_user)):
     for team in all_teams:
         if user_id in team.members:
             team.members.remove(user_id)
+            await member_left(team, current_user)
             # If user was leader, leader_id remains pointing to deleted user or handle specifically.
             # Since the project is completed, it's acceptable for historical data to be static 
             # or we can set it to a placeholder.
@@ -390,6 +434,7 @@ async def delete_my_account(current_user: User = Depends(get_current_user)):
 
     # 6. Final Execution: Delete User
     await current_user.delete()
+    index_hooks.user_removed(user_id)
 
     return {"status": "deleted", "message": "Account and all associated data permanently deleted."}
 
@@ -409,8 +454,8 @@ async def toggle_favorite(team_id: str, current_user: User = Depends(get_current
     await current_user.save()
     return {"status": status, "favorites": current_user.favorites}
 
-@router.get("/me/favorites_details", response_model=List[Team])
-async def get_my_favorites(current_user: User = Depends(get_current_user)):
+@router.get("/me/favorites_details")
+async def get_my_favorites(fields: Optional[str] = None, current_user: User = Depends(get_current_user)):
     """Fetches full team details for favorited projects"""
     if not current_user.favorites:
         return []
@@ -420,7 +465,7 @@ async def get_my_favorites(current_user: User = Depends(get_current_user)):
     if not valid_ids:
         return []
         
-    teams = await Team.find({"_id": {"$in": valid_ids}}).to_list()
+    teams = await Team.find({"_id": {"$in": valid_ids}}).project(sparse_model(TeamCard, fields)).to_list()
     return teams
 
 # --- DASHBOARD ENDPOINTS ---
@@ -459,6 +504,7 @@ async def get_my_projects(current_user: User = Depends(get_current_user)):
 
 @router.put("/profile", response_model=User)
 async def update_profile(data: ProfileUpdate, current_user: User = Depends(get_current_user)):
+    old_bits, had_schedule = get_bits(current_user), has_schedule(current_user)
     new_skills = [Skill(name=s, level="Intermediate") for s in data.skills]
     current_user.skills = new_skills
     current_user.interests = data.interests
@@ -485,16 +531,15 @@ async def update_profile(data: ProfileUpdate, current_user: User = Depends(get_c
                 valid_ids.append(pid)
         current_user.project_highlights = valid_ids[:4]
     
-    # Embedding generation
-    achievements_text = " ".join([a.title for a in data.achievements])
-    edu_text = " ".join([f"{e.course} at {e.institute}" for e in data.education if e.is_visible])
-    profile_text = f"{' '.join(data.skills)} {' '.join(data.interests)} {data.about} {edu_text} {achievements_text}"
-    current_user.embedding = generate_embedding(profile_text)
+    # Embedding generation (skipped when the profile text did not change)
+    await refresh_user_embedding(current_user)
     
     # Recalculate trust score to ensure consistency (e.g. if linkedIn score was wrong)
     await update_trust_score(current_user)
     
     await current_user.save()
+    index_hooks.user_changed(current_user)
+    await member_schedule_changed(current_user, old_bits, had_schedule)
     return current_user
 
 @router.get("/{user_id}/highlights", response_model=List[Team])
@@ -583,10 +628,10 @@ async def update_skills_legacy(data: SkillsUpdate, current_user: User = Depends(
     new_skills = [Skill(name=s, level="Intermediate") for s in data.skills]
     current_user.skills = new_skills
     
-    profile_text = f"{' '.join(data.skills)} {' '.join(current_user.interests)} {current_user.about or ''}"
-    current_user.embedding = generate_embedding(profile_text)
+    await refresh_user_embedding(current_user)
     
     await current_user.save()
+    index_hooks.user_changed(current_user)
     return current_user
 
 @router.get("/{user_id}", response_model=User)
@@ -0,0 +1,253 @@
+import time
+import asyncio
+import numpy as np
+from bson import ObjectId
+from app.services import reduced_embeddings
+from app.services.embedding_store import EmbeddingStore, user_vectors, team_vectors
+
+# --- CONFIGURATION ---
+# Below this size an exact scan is both faster and perfectly accurate.
+BRUTE_FORCE_LIMIT = 2000
+# Coarse clusters probed per query (IVF recall/speed knob)
+NPROBE = 8
+KMEANS_ITERATIONS = 12
+KMEANS_SAMPLE = 20000
+# How many semantic candidates the matching endpoints re-rank
+ANN_CANDIDATES = 300
+# When a Mongo filter rejects too many neighbours, the next round asks for this many times more
+OVERFETCH_FACTOR = 4
+
+class IVFIndex:
+    """
+    In-process approximate nearest neighbour index over an EmbeddingStore.
+    IVF layout: store rows are bucketed under their closest k-means centroid and a
+    query only scans the NPROBE closest buckets. Small indexes are scanned exactly.
+    Vectors are read from the memory-mapped store; the index only holds row lists.
+    """
+
+    def __init__(self, name: str, store: EmbeddingStore):
+        self.name = name
+        self.store = store
+        self.codes = None            # store row -> int8 code when reduced embeddings are on
+        self.rows: dict = {}         # doc id -> store row
+        self.ids: dict = {}          # store row -> doc id
+        self.centroids = None
+        self.lists: list = []        # centroid -> list of rows
+        self.row_list: dict = {}     # row -> centroid
+        self.trained_size = 0
+        self.ready = False
+        self._retrain_task = None
+        self._touched = None         # rows changed while a background retrain runs
+
+    def __len__(self):
+        return len(self.rows)
+
+    # --- STORAGE ---
+    def _normalize(self, vector) -> np.ndarray | None:
+        if vector is None or len(vector) == 0: return None
+        v = np.asarray(vector, dtype=np.float32)
+        if v.shape[0] != self.store.dim: return None
+        norm = np.linalg.norm(v)
+        if norm == 0: return None
+        return v / norm
+
+    def _encode(self, row: int):
+        reducer = reduced_embeddings.reducer
+        if reducer is None or self.store.dim != reducer.components.shape[0]: return
+        if self.codes is None or row >= len(self.codes):
+            codes = np.zeros((self.store.matrix.shape[0], reducer.dim), dtype=np.int8)
+            if self.codes is not None: codes[:len(self.codes)] = self.codes
+            self.codes = codes
+        self.codes[row] = reducer.encode(self.store.matrix[row][None, :])[0]
+
+    def build(self):
+        """Indexes every vector in the store and trains the quantizer"""
+        self.rows = self.store.row_index()
+        self.ids = {row: doc_id for doc_id, row in self.rows.items()}
+        reducer = reduced_embeddings.reducer
+        self.codes = None
+        if reducer and self.rows and self.store.dim == reducer.components.shape[0]:
+            self.codes = reducer.encode(self.store.matrix)
+        self._train()
+        self.ready = True
+
+    def upsert(self, doc_id: str):
+        """Re-indexes a document after its vector was written to the store"""
+        doc_id = str(doc_id)
+        row = self.store.row(doc_id)
+        if row is None:
+            self.remove(doc_id)
+            return
+        previous = self.rows.get(doc_id)
+        if previous is not None:
+            self._unassign(previous)
+            self.ids.pop(previous, None)
+        self.rows[doc_id] = row
+        self.ids[row] = doc_id
+        self._encode(row)
+        self._assign(row)
+        if self._touched is not None: self._touched.add(row)
+        # Retrain once the corpus has doubled since the last k-means pass
+        if len(self.rows) > max(BRUTE_FORCE_LIMIT, 2 * self.trained_size):
+            self._schedule_retrain()
+
+    def remove(self, doc_id: str):
+        row = self.rows.pop(str(doc_id), None)
+        if row is None: return
+        self._unassign(row)
+        if self._touched is not None: self._touched.add(row)
+        self.ids.pop(row, None)
+        if self.codes is not None and row < len(self.codes): self.codes[row] = 0
+
+    # --- QUANTIZER ---
+    def _live_rows(self) -> np.ndarray:
+        return np.fromiter(self.rows.values(), dtype=np.int64, count=len(self.rows))
+
+    def _fit(self, rows: np.ndarray) -> tuple:
+        """k-means over the given rows: (centroids, lists, row_list), without touching the live index"""
+        if len(rows) <= BRUTE_FORCE_LIMIT: return None, [], {}
+        matrix = self.store.matrix
+        data = matrix[rows]
+        nlist = int(np.sqrt(len(rows)))
+        rng = np.random.default_rng(0)
+        sample = data[rng.choice(len(data), min(len(data), KMEANS_SAMPLE), replace=False)]
+        centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+        for _ in range(KMEANS_ITERATIONS):
+            assign = np.argmax(sample @ centroids.T, axis=1)
+            for c in range(nlist):
+                members = sample[assign == c]
+                if len(members): centroids[c] = members.mean(axis=0)
+            norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+            np.divide(centroids, norms, out=centroids, where=norms > 0)
+        lists = [[] for _ in range(nlist)]
+        row_list = {}
+        for start in range(0, len(rows), 8192):
+            chunk = rows[start:start + 8192]
+            for row, c in zip(chunk.tolist(), np.argmax(matrix[chunk] @ centroids.T, axis=1).tolist()):
+                lists[c].append(row)
+                row_list[row] = c
+        print(f"🗂️ ANN[{self.name}]: trained {nlist} clusters over {len(rows)} vectors")
+        return centroids, lists, row_list
+
+    def _train(self):
+        self.trained_size = len(self.rows)
+        self.centroids, self.lists, self.row_list = self._fit(self._live_rows())
+
+    def _schedule_retrain(self):
+        """Retrains in a worker thread when called on the event loop (request paths); inline otherwise"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._train()
+            return
+        if self._retrain_task is None or self._retrain_task.done():
+            self._retrain_task = loop.create_task(self._retrain())
+
+    async def _retrain(self):
+        # Queries keep using the old quantizer until the new one is swapped in below
+        self.trained_size = len(self.rows)
+        self._touched = set()
+        try:
+            fitted = await asyncio.to_thread(self._fit, self._live_rows())
+            self.centroids, self.lists, self.row_list = fitted
+            # Rows written or removed while k-means ran are re-bucketed under the new centroids
+            live = set(self.rows.values())
+            for row in self._touched:
+                self._unassign(row)
+                if row in live: self._assign(row)
+        except Exception as e:
+            print(f"❌ ANN[{self.name}]: retrain failed: {e}")
+        finally:
+            self._touched = None
+
+    def _assign(self, row: int):
+        if self.centroids is None: return
+        c = int(np.argmax(self.centroids @ self.store.matrix[row]))
+        self.lists[c].append(row)
+        self.row_list[row] = c
+
+    def _unassign(self, row: int):
+        c = self.row_list.pop(row, None)
+        if c is not None: self.lists[c].remove(row)
+
+    # --- QUERY ---
+    @property
+    def probes(self) -> bool:
+        """Whether queries scan only the NPROBE closest clusters (and so may miss neighbours)"""
+        return self.centroids is not None
+
+    def search(self, query, k: int, exclude: set = None, exact: bool = False) -> list:
+        """Returns up to k (doc_id, cosine) pairs, best first; `exact` scores every full vector"""
+        q = self._normalize(query)
+        if q is None or not self.rows: return []
+        exclude = exclude or set()
+        if self.centroids is None or exact:
+            rows = self._live_rows()
+        else:
+            probe = np.argsort(-(self.centroids @ q))[:NPROBE]
+            rows = np.fromiter((r for c in probe for r in self.lists[c]), dtype=np.int64)
+        if len(rows) == 0: return []
+        shortlist = (k + len(exclude)) * reduced_embeddings.RERANK_FACTOR
+        if self.codes is not None and len(rows) > shortlist and not exact:
+            # Compact scan over int8 codes; only the shortlist is scored on full vectors
+            approx = reduced_embeddings.reducer.scores(q, self.codes[rows])
+            rows = rows[np.argpartition(-approx, shortlist - 1)[:shortlist]]
+        scores = self.store.matrix[rows] @ q
+        want = min(len(rows), k + len(exclude))
+        top = np.argpartition(-scores, want - 1)[:want]
+        top = top[np.argsort(-scores[top])]
+        results = []
+        for i in top:
+            doc_id = self.ids[rows[i]]
+            if doc_id in exclude: continue
+            results.append((doc_id, float(scores[i])))
+            if len(results) == k: break
+        return results
+
+async def filtered_search(index: IVFIndex, query, k: int, collection, mongo_filter: dict, exclude: set = None) -> list:
+    """
+    Up to k ids of documents matching `mongo_filter`, nearest first. Neighbours are
+    checked with one id-only query per round, and the index is asked for
+    OVERFETCH_FACTOR times more until k pass or it runs out, so rules the index
+    cannot see (closed or full teams, tags) never shrink the shortlist. When the
+    probed clusters run dry first, the search continues as an exact scan, so eligible
+    documents bucketed far from the query are still found.
+    """
+    fetch, passed, checked, exact = k, set(), set(), False
+    while True:
+        hits = index.search(query, fetch, exclude, exact)
+        fresh = [ObjectId(doc_id) for doc_id, _ in hits if doc_id not in checked and ObjectId.is_valid(doc_id)]
+        checked.update(doc_id for doc_id, _ in hits)
+        if fresh:
+            docs = await collection.find({"$and": [mongo_filter, {"_id": {"$in": fresh}}]}, {"_id": 1}).to_list(None)
+            passed.update(str(d["_id"]) for d in docs)
+        kept = [doc_id for doc_id, _ in hits if doc_id in passed]
+        if len(kept) >= k: return kept[:k]
+        if len(hits) < fetch:
+            if exact or not index.probes: return kept
+            exact = True
+        else:
+            fetch *= OVERFETCH_FACTOR
+
+async def shortlist(index: IVFIndex, query_vec, collection, mongo_filter: dict, exclude: set = None) -> list:
+    """
+    Ids of the at most ANN_CANDIDATES eligible documents a ranking is built from,
+    nearest to the query vector first. Until the index is built, or while the subject
+    has no vector yet, the newest eligible documents stand in, so no caller ever
+    scores a whole collection.
+    """
+    if index.ready and query_vec is not None:
+        ids = await filtered_search(index, query_vec, ANN_CANDIDATES, collection, mongo_filter, exclude)
+        if ids: return ids
+    docs = await collection.find(mongo_filter, {"_id": 1}).sort("_id", -1).limit(ANN_CANDIDATES).to_list(None)
+    return [str(d["_id"]) for d in docs]
+
+user_index = IVFIndex("users", user_vectors)
+team_index = IVFIndex("teams", team_vectors)
+
+async def build_ann_indexes():
+    """Indexes every User/Team vector in the embedding store"""
+    start = time.perf_counter()
+    user_index.build()
+    team_index.build()
+    print(f"✅ ANN indexes ready ({len(user_index)} users, {len(team_index)} teams) in {time.perf_counter() - start:.2f}s")
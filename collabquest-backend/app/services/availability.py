@@ -0,0 +1,101 @@
+import numpy as np
+
+# --- CONFIGURATION ---
+# A week is compiled into 7 x 96 fifteen-minute slots, one bit per slot.
+# The bitset is stored as hex so it survives JSON responses of the User model.
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+DAY_INDEX = {day: i for i, day in enumerate(DAYS)}
+SLOT_MINUTES = 15
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+TOTAL_SLOTS = len(DAYS) * SLOTS_PER_DAY
+BITSET_BYTES = TOTAL_SLOTS // 8
+EMPTY_BITS = "00" * BITSET_BYTES
+
+# popcount of every possible byte, used by the NumPy path
+POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint16)
+
+# --- HELPERS ---
+def to_mins(t_str) -> int:
+    if not t_str: return 0
+    try:
+        h, m = map(int, t_str.split(':'))
+        return h * 60 + m
+    except: return 0
+
+def compile_availability(availability: list) -> str:
+    """Parses DayAvailability slots once into the 672-bit weekly bitset (hex)"""
+    slots = np.zeros(TOTAL_SLOTS, dtype=np.uint8)
+    for entry in availability or []:
+        if not entry.enabled or entry.day not in DAY_INDEX: continue
+        offset = DAY_INDEX[entry.day] * SLOTS_PER_DAY
+        for slot in entry.slots:
+            start = min(max(to_mins(slot.start), 0), 24 * 60) // SLOT_MINUTES
+            end = -(-min(max(to_mins(slot.end), 0), 24 * 60) // SLOT_MINUTES)
+            if start < end:
+                slots[offset + start:offset + end] = 1
+    return np.packbits(slots).tobytes().hex()
+
+def get_bits(user) -> str:
+    """The stored bitset, compiled on the fly for documents saved before it existed"""
+    return user.availability_bits or compile_availability(user.availability)
+
+def unpack(bits: str) -> np.ndarray:
+    """Hex bitset -> (672,) array of 0/1"""
+    return np.unpackbits(np.frombuffer(bytes.fromhex(bits or EMPTY_BITS), dtype=np.uint8))
+
+def bitset_matrix(bits_list: list) -> np.ndarray:
+    """N hex bitsets -> (N, 84) uint8 matrix"""
+    raw = b"".join(bytes.fromhex(b or EMPTY_BITS) for b in bits_list)
+    return np.frombuffer(raw, dtype=np.uint8).reshape(len(bits_list), BITSET_BYTES)
+
+def minutes_to_score(minutes):
+    """10 shared hours a week is a perfect score"""
+    return np.minimum(100.0, minutes / 6)
+
+# --- OVERLAP ---
+def overlap_minutes(bits_a: str, bits_b: str) -> int:
+    """AND + popcount of two weekly bitsets"""
+    a = int(bits_a or EMPTY_BITS, 16)
+    b = int(bits_b or EMPTY_BITS, 16)
+    return (a & b).bit_count() * SLOT_MINUTES
+
+def batch_overlap_scores(bits: str, candidate_bits: list) -> np.ndarray:
+    """Scores one bitset against N bitsets in a single vectorized AND + popcount"""
+    if not candidate_bits: return np.zeros(0)
+    user_row = bitset_matrix([bits])[0]
+    shared = POPCOUNT[bitset_matrix(candidate_bits) & user_row].sum(axis=1)
+    return minutes_to_score(shared.astype(np.float64) * SLOT_MINUTES)
+
+def weighted_overlap_scores(bits: str, slot_counts: np.ndarray) -> np.ndarray:
+    """Scores one bitset against N per-slot member counts (N, 672), e.g. whole teams.
+    Each shared slot counts once per team member free in it."""
+    if len(slot_counts) == 0: return np.zeros(0)
+    shared = slot_counts.astype(np.float64) @ unpack(bits)
+    return minutes_to_score(shared * SLOT_MINUTES)
+
+# --- TEAM AGGREGATE ---
+# A team profile stores, per slot, how many members are free (uint8 counts, hex).
+EMPTY_PROFILE = "00" * TOTAL_SLOTS
+
+def unpack_profile(profile: str) -> np.ndarray:
+    return np.frombuffer(bytes.fromhex(profile or EMPTY_PROFILE), dtype=np.uint8)
+
+def pack_profile(counts: np.ndarray) -> str:
+    return np.clip(counts, 0, 255).astype(np.uint8).tobytes().hex()
+
+def profile_from_bits(bits_list: list) -> str:
+    counts = np.zeros(TOTAL_SLOTS, dtype=np.int32)
+    for bits in bits_list:
+        counts += unpack(bits)
+    return pack_profile(counts)
+
+def profile_add(profile: str, bits: str) -> str:
+    return pack_profile(unpack_profile(profile).astype(np.int32) + unpack(bits))
+
+def profile_remove(profile: str, bits: str) -> str:
+    return pack_profile(unpack_profile(profile).astype(np.int32) - unpack(bits))
+
+def profile_matrix(profiles: list) -> np.ndarray:
+    """N team profiles -> (N, 672) uint8 matrix"""
+    raw = b"".join(bytes.fromhex(p or EMPTY_PROFILE) for p in profiles)
+    return np.frombuffer(raw, dtype=np.uint8).reshape(len(profiles), TOTAL_SLOTS)
@@ -10,10 +10,18 @@ from openai import AsyncOpenAI
 from dotenv import load_dotenv
 from langchain_core.prompts import ChatPromptTemplate
 from langgraph.graph import StateGraph, END
-
-from app.models import ChatMessage, Team, DeletionRequest, Notification, Task, User, CompletionRequest, MemberRequest, Match, ExtensionRequest
-from app.services.recommendation_service import search_vectors, sync_data_to_chroma
-from app.services.vector_store import generate_embedding, calculate_similarity
+from bson import ObjectId
+
+from app.models import ChatMessage, Team, DeletionRequest, Notification, Task, User, CompletionRequest, MemberRequest, Match, ExtensionRequest, TeamCard
+from app.services.recommendation_service import search_vectors
+from app.services.hybrid_search import search_teams
+from app.services.profile_text import team_embedding_text, refresh_team_embedding
+from app.services.vector_store import calculate_similarity
+from app.services.embedding_service import embed_texts
+from app.services.intent_router import IntentRouter
+from app.services import index_hooks
+from app.services.loaders import RequestLoaders
+from app.services.team_availability import rebuild_team_availability, member_left
 
 INTENT_EXAMPLES = {
     "CREATE_PROJECT": [
@@ -97,6 +105,37 @@ INTENT_EXAMPLES = {
     ]
 }
 
+# Per-intent confidence needed to skip the LLM router (default 0.70).
+# Destructive intents ask for more certainty before bypassing the LLM.
+INTENT_THRESHOLDS = {
+    "DELETE_PROJECT": 0.75,
+    "REMOVE_MEMBER": 0.75,
+    "LEAVE_TEAM": 0.75,
+}
+INTENT_TOP_K = 3
+
+# Project search (search_node): how many projects the LLM ranks, and the minimum relevance
+SEARCH_RESULTS = 10
+SEARCH_MIN_SCORE = 0.2
+
+# "Show me my projects" style questions, detected in chat_node
+PROJECT_LIST_ANCHORS = [
+    "what are my ongoing projects",
+    "show me my project list",
+    "what am I working on right now",
+    "list my active teams",
+    "tell me about my projects"
+]
+
+intent_router = IntentRouter(INTENT_EXAMPLES, default_threshold=0.70, thresholds=INTENT_THRESHOLDS, top_k=INTENT_TOP_K)
+project_list_router = IntentRouter({"PROJECT_LIST": PROJECT_LIST_ANCHORS}, default_threshold=0.60)
+
+async def compile_intent_routers():
+    """Embeds every example sentence once (called at startup)"""
+    await intent_router.compile()
+    await project_list_router.compile()
+    print("✅ Intent Router Compiled")
+
 load_dotenv()
 
 # --- CONFIGURATION ---
@@ -141,12 +180,11 @@ async def find_relevant_project(user_input: str, projects: list[Team]):
 
     # --- LAYER 2: 🔍 Vector Search (Semantic/Typos) ---
     # Only runs if exact text match failed.
-    target_vec = generate_embedding(user_input)
+    target_vec, *project_vecs = await embed_texts([user_input] + [p.name for p in projects])
     best_score = 0.0
     best_match = None
     
-    for p in projects:
-        p_vec = generate_embedding(p.name)
+    for p, p_vec in zip(projects, project_vecs):
         score = calculate_similarity(target_vec, p_vec)
         
         if score > best_score:
@@ -170,27 +208,11 @@ def get_skill_name(skill_item):
 async def get_semantic_intent(user_input: str) -> str | None:
     """
     Hybrid Router Layer 1: Vector Similarity Check.
-    Returns the intent if confidence > 0.7, else None.
+    Returns the intent if it clears its threshold (0.70 unless overridden), else None.
     """
-    user_vec = generate_embedding(user_input)
-    best_score = 0.0
-    best_intent = None
-
-    for intent, examples in INTENT_EXAMPLES.items():
-        for example in examples:
-            example_vec = generate_embedding(example)
-            score = calculate_similarity(user_vec, example_vec)
-            
-            if score > best_score:
-                best_score = score
-                best_intent = intent
-
-    # 🛡️ Threshold: 0.70 (70%)
-    # If we are 70% sure, we skip the LLM. If not, we let the LLM decide.
-    if best_score > 0.70:
-        return best_intent
-    
-    return None
+    # 🛡️ If we are confident enough, we skip the LLM. If not, we let the LLM decide.
+    intent, _ = await intent_router.route(user_input)
+    return intent
 
 # --- 2. DEFINE THE NODES (The Agents) ---
 
@@ -411,7 +433,10 @@ async def planner_node(state: AgentState):
             members=[state["user_id"]],
             roadmap=roadmap
         )
+        await rebuild_team_availability(new_team)
+        await refresh_team_embedding(new_team)
         await new_team.insert()
+        index_hooks.team_changed(new_team)
         
         response = f"✅ Created **{name}**!\nStack: {', '.join(skills)}"
     
@@ -443,6 +468,7 @@ async def manager_node(state: AgentState):
     print("👔 Manager Node Active")
     user_id = state["user_id"]
     intent = state["intent"]
+    loaders = RequestLoaders()
     
     # 1. Fetch Projects
     relevant_teams = await Team.find(Team.members == user_id).to_list()
@@ -540,6 +566,7 @@ async def manager_node(state: AgentState):
             # -----------------------------
 
             await target_team.delete()
+            index_hooks.team_removed(str(target_team.id))
             return {"final_response": f"🗑️ **{target_team.name}** has been permanently deleted."}  
              
         # Case 2: Team Project (Start Vote)
@@ -615,6 +642,7 @@ async def manager_node(state: AgentState):
         # 3. Planning Phase (Instant Leave)
         if target_team.status == "planning":
             target_team.members.remove(user_id)
+            await member_left(target_team, await User.get(user_id))
             await target_team.save()
             
             # Cleanup Match
@@ -664,8 +692,7 @@ async def manager_node(state: AgentState):
 
         # 2. Extract Target Member
         members_map = []
-        for m_id in target_team.members:
-            u = await User.get(m_id)
+        for u in await loaders.users.load_many(target_team.members):
             if u: members_map.append(f"{u.username} (ID: {str(u.id)})")
         
         extraction_prompt = f"""
@@ -699,7 +726,7 @@ async def manager_node(state: AgentState):
         existing = next((r for r in target_team.member_requests if r.target_user_id == target_id and r.is_active), None)
         if existing:
             # --- FIX: Fetch Name for Display ---
-            target_user_obj = await User.get(target_id)
+            target_user_obj = await loaders.users.load(target_id)
             target_name = target_user_obj.username if target_user_obj else "Unknown Member"
             
             return {"final_response": f"⚠️ A vote to remove **{target_name}** is already active."}
@@ -731,7 +758,7 @@ async def manager_node(state: AgentState):
                 ).insert()
                 count += 1
 
-        target_user_obj = await User.get(target_id)
+        target_user_obj = await loaders.users.load(target_id)
         target_name = target_user_obj.username if target_user_obj else "Unknown Member"
         return {"final_response": f"🗳️ **Vote Initiated.** I've started a vote to remove **{target_name}**. {count} other members have been notified."}    
     
@@ -747,8 +774,7 @@ async def manager_node(state: AgentState):
             }
         # 1. Build Member List
         members_map = []
-        for m_id in target_team.members:
-            u = await User.get(m_id)
+        for u in await loaders.users.load_many(target_team.members):
             if u: members_map.append(f"{u.username} (ID: {str(u.id)})")
         
         # 2. Strict Prompt
@@ -815,7 +841,7 @@ async def manager_node(state: AgentState):
                     related_id=str(target_team.id)
                 ).insert()
 
-            assignee_obj = await User.get(assignee)
+            assignee_obj = await loaders.users.load(assignee)
             assignee_name = assignee_obj.username if assignee_obj else "Unknown Member"
 
             return {"final_response": f"✅ **Task Assigned!**\n\n📝 **{data['description']}**\n👤 Assignee: **{assignee_name}**\n📅 Deadline: {new_task.deadline.strftime('%Y-%m-%d')}"}
@@ -927,8 +953,7 @@ async def manager_node(state: AgentState):
         name_to_id = {}
         members_list_str = []
         
-        for m_id in target_team.members:
-            u = await User.get(m_id)
+        for u in await loaders.users.load_many(target_team.members):
             if u: 
                 id_to_name[str(u.id)] = u.username
                 name_to_id[u.username.lower()] = str(u.id)
@@ -1029,8 +1054,7 @@ async def manager_node(state: AgentState):
         member_skills_set = set()
         roster_display = []
         
-        for m_id in target_team.members:
-            u = await User.get(m_id)
+        for u in await loaders.users.load_many(target_team.members):
             if u:
                 # Safely process each skill for this user
                 u_skill_names = [get_skill_name(s) for s in u.skills]
@@ -1111,12 +1135,12 @@ async def manager_node(state: AgentState):
         if should_open:
             target_team.is_looking_for_members = True
             await target_team.save()
-            await sync_data_to_chroma()
+            index_hooks.team_changed(target_team)
             msg = f"✅ **Recruitment Opened!**\n\n**{target_team.name}** is now visible in the Marketplace. Users can find and apply to your team."
         elif should_close:
             target_team.is_looking_for_members = False
             await target_team.save()
-            await sync_data_to_chroma()
+            index_hooks.team_changed(target_team)
             msg = f"🚫 **Recruitment Paused.**\n\n**{target_team.name}** is now hidden from the Marketplace. No new applications will be received."
         else:
             # Fallback if the user just asked "Is recruitment open?"
@@ -1171,12 +1195,19 @@ async def search_node(state: AgentState):
     # 3. Perform the Search
     # This finds projects matching the user's query (e.g., "React game", "Python AI")
     query = f"{state['question']} {', '.join(state['user_skills'])}"
-    matches = await asyncio.to_thread(search_vectors, query, filter_type)
+    # Semantic hits from Chroma are fused with exact keyword (BM25) hits, so
+    # "Solidity NFT" finds the Solidity projects even when the vectors are fuzzy.
+    vector_hits = await asyncio.to_thread(search_vectors, query, filter_type, SEARCH_RESULTS * 2, 0, SEARCH_MIN_SCORE)
+    ranked = await search_teams(query, SEARCH_RESULTS, vector_ranking=[m["id"] for m in vector_hits])
+    ranked_ids = [tid for tid, _ in ranked if ObjectId.is_valid(tid)]
+    teams = await Team.find({"_id": {"$in": [ObjectId(tid) for tid in ranked_ids]}}).project(TeamCard).to_list()
+    by_id = {str(t.id): t for t in teams}
+    matches = [team_embedding_text(by_id[tid]) for tid in ranked_ids if tid in by_id]
     
     if not matches:
         return {"final_response": "I couldn't find any matching projects right now."}
         
-    # 4. Generate Recommendation
+    # 4. Generate Recommendation (best matches first)
     context = "\n\n".join(matches)
     prompt = f"""
     Recommend the best fit from these PROJECT matches for the request: "{state['question']}"
@@ -1202,10 +1233,11 @@ async def data_analyst_node(state: AgentState):
     """Handles complex queries about project status."""
     print("🧠 Data Analyst Node Active")
     user_id = state["user_id"]
+    loaders = RequestLoaders()
     
     # 1. Fetch User Identity
     try:
-        current_user = await User.get(user_id)
+        current_user = await loaders.users.load(user_id)
         current_username = current_user.username if current_user else "the current user"
     except:
         current_username = "the current user"
@@ -1213,11 +1245,13 @@ async def data_analyst_node(state: AgentState):
     user_teams = await Team.find(Team.members == user_id).to_list()
     if not user_teams: return {"final_response": "You aren't part of any projects yet."}
 
+    # Every member of every project in one round trip
+    await loaders.users.load_many([m_id for team in user_teams for m_id in team.members])
+
     projects_data = []
     for team in user_teams:
         member_map = {}
-        for m_id in team.members:
-            u = await User.get(m_id)
+        for u in await loaders.users.load_many(team.members):
             if u: member_map[str(u.id)] = u.username
 
         tasks_list = []
@@ -1291,27 +1325,10 @@ async def chat_node(state: AgentState):
 
     # B. Check for General "My Projects" Query (SEMANTIC MATCH)
     # instead of keywords, we compare meanings.
-    # We define a few "anchor" sentences that represent this intent.
-    general_anchors = [
-        "what are my ongoing projects",
-        "show me my project list",
-        "what am I working on right now",
-        "list my active teams",
-        "tell me about my projects"
-    ]
-    
-    # Calculate similarity against these anchors
-    user_vec = generate_embedding(question)
-    max_score = 0.0
-    
-    for anchor in general_anchors:
-        anchor_vec = generate_embedding(anchor)
-        score = calculate_similarity(user_vec, anchor_vec)
-        if score > max_score:
-            max_score = score
-            
+    # The "anchor" sentences that represent this intent live in PROJECT_LIST_ANCHORS.
     # Threshold: 0.6 (60% similarity is usually a safe bet for "same meaning")
-    is_general_query = max_score > 0.60
+    general_intent, max_score = await project_list_router.route(question)
+    is_general_query = general_intent is not None
     
     # Debugging print to help you see the score
     if is_general_query:
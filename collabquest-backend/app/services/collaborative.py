@@ -0,0 +1,171 @@
+import time
+from datetime import datetime
+import numpy as np
+from scipy.sparse import csr_matrix
+from bson import ObjectId
+from pymongo import UpdateOne
+from app.models import User, Team, Swipe, Match
+
+# --- CONFIGURATION ---
+FACTORS = 32
+ITERATIONS = 10
+REGULARIZATION = 0.1
+ALPHA = 10.0          # confidence per unit of feedback: c = 1 + ALPHA * weight
+CG_STEPS = 3          # conjugate gradient iterations per half step
+BLOCK_NNZ = 262144    # interactions gathered at once (bounds scratch memory to ~64MB)
+WRITE_CHUNK = 1000
+
+# Implicit feedback weights on (user, team) pairs.
+# A right swipe in either direction is a positive, a left swipe an observed negative,
+# and a Match counts as a strong positive.
+RIGHT_WEIGHT = 1.0
+LEFT_WEIGHT = 1.0
+MATCH_WEIGHT = 3.0
+
+cf_status = {"last_trained_at": None, "users": 0, "teams": 0, "interactions": 0, "seconds": 0.0}
+
+# --- INTERACTIONS ---
+class _Interactions:
+    def __init__(self):
+        self.user_ids: dict = {}
+        self.team_ids: dict = {}
+        self.rows, self.cols, self.weights, self.positive = [], [], [], []
+
+    def add(self, user_id: str, team_id: str, weight: float, positive: bool):
+        if not user_id or not team_id: return
+        self.rows.append(self.user_ids.setdefault(user_id, len(self.user_ids)))
+        self.cols.append(self.team_ids.setdefault(team_id, len(self.team_ids)))
+        self.weights.append(weight)
+        self.positive.append(positive)
+
+async def load_interactions() -> _Interactions:
+    """Streams Swipe and Match into (user, team) feedback triples (projected fields only)"""
+    data = _Interactions()
+    swipes = Swipe.get_pymongo_collection().find(
+        {}, {"swiper_id": 1, "target_id": 1, "type": 1, "direction": 1, "related_id": 1, "_id": 0}, batch_size=10000
+    )
+    async for s in swipes:
+        right = s.get("direction") == "right"
+        weight = RIGHT_WEIGHT if right else LEFT_WEIGHT
+        if s.get("type") == "project":
+            data.add(s.get("swiper_id"), s.get("target_id"), weight, right)
+        elif s.get("type") == "user":
+            # Leader swiping a candidate for one of their projects
+            data.add(s.get("target_id"), s.get("related_id"), weight, right)
+    matches = Match.get_pymongo_collection().find({}, {"user_id": 1, "project_id": 1, "_id": 0}, batch_size=10000)
+    async for m in matches:
+        data.add(m.get("user_id"), m.get("project_id"), MATCH_WEIGHT, True)
+    return data
+
+def interaction_matrices(data: _Interactions) -> tuple:
+    """
+    Collapses duplicate pairs and returns CSR (confidence - 1, preference) for
+    users x teams and teams x users, sharing one sparsity pattern.
+    """
+    n, m = len(data.user_ids), len(data.team_ids)
+    keys = np.asarray(data.rows, dtype=np.int64) * m + np.asarray(data.cols, dtype=np.int64)
+    unique, inverse = np.unique(keys, return_inverse=True)
+    weight = np.bincount(inverse, weights=np.asarray(data.weights), minlength=len(unique))
+    positive = np.bincount(inverse, weights=np.asarray(data.positive, dtype=np.float64), minlength=len(unique)) > 0
+    conf = (ALPHA * weight).astype(np.float32)
+    pref = positive.astype(np.float32)
+
+    # Entry numbers (1-based, never an implicit zero) let the transpose carry both arrays along
+    entries = csr_matrix((np.arange(1, len(unique) + 1), (unique // m, unique % m)), shape=(n, m))
+    by_team = entries.T.tocsr()
+    user_order, team_order = entries.data - 1, by_team.data - 1
+    return (
+        (entries.indptr, entries.indices, conf[user_order], pref[user_order]),
+        (by_team.indptr, by_team.indices, conf[team_order], pref[team_order]),
+    )
+
+# --- ALS ---
+def _pair_dots(left: np.ndarray, right: np.ndarray, rows: np.ndarray, cols: np.ndarray) -> np.ndarray:
+    """left[rows[k]] . right[cols[k]] for every stored interaction, in bounded chunks"""
+    out = np.empty(len(rows), dtype=np.float32)
+    for i in range(0, len(rows), BLOCK_NNZ):
+        j = i + BLOCK_NNZ
+        out[i:j] = np.einsum("nf,nf->n", left[rows[i:j]], right[cols[i:j]])
+    return out
+
+def _solve_side(matrix: tuple, x: np.ndarray, other: np.ndarray, reg: float) -> np.ndarray:
+    """
+    One implicit-ALS half step (Hu, Koren & Volinsky) solved with a few conjugate
+    gradient iterations warm-started from the previous factors (Takacs et al.):
+    A_u = YtY + reg*I + Yt (Cu - I) Y,  b_u = Yt Cu p_u.
+    Every operation is a sparse x dense product over the stored interactions,
+    so a step costs O(nnz * F) instead of O(nnz * F^2).
+    """
+    indptr, indices, conf, pref = matrix
+    shape = (len(indptr) - 1, other.shape[0])
+    rows = np.repeat(np.arange(shape[0]), np.diff(indptr))
+    gram = other.T @ other + reg * np.eye(other.shape[1], dtype=np.float32)
+
+    def apply(v: np.ndarray) -> np.ndarray:
+        weights = conf * _pair_dots(v, other, rows, indices)
+        return v @ gram + csr_matrix((weights, indices, indptr), shape=shape) @ other
+
+    x = x.copy()
+    r = csr_matrix(((conf + 1) * pref, indices, indptr), shape=shape) @ other - apply(x)
+    p = r.copy()
+    rs = np.einsum("nf,nf->n", r, r)
+    for _ in range(CG_STEPS):
+        ap = apply(p)
+        step = rs / np.maximum(np.einsum("nf,nf->n", p, ap), 1e-10)
+        x += step[:, None] * p
+        r -= step[:, None] * ap
+        rs_next = np.einsum("nf,nf->n", r, r)
+        p = r + (rs_next / np.maximum(rs, 1e-10))[:, None] * p
+        rs = rs_next
+    return x.astype(np.float32)
+
+def factorize(by_user: tuple, by_team: tuple, n_users: int, n_teams: int,
+              factors: int = FACTORS, iterations: int = ITERATIONS, reg: float = REGULARIZATION) -> tuple:
+    """Alternating least squares on implicit feedback -> (user factors, team factors)"""
+    rng = np.random.default_rng(42)
+    users = (rng.standard_normal((n_users, factors)) * 0.01).astype(np.float32)
+    teams = (rng.standard_normal((n_teams, factors)) * 0.01).astype(np.float32)
+    for _ in range(iterations):
+        users = _solve_side(by_user, users, teams, reg)
+        teams = _solve_side(by_team, teams, users, reg)
+    return users, teams
+
+# --- STORAGE ---
+async def _store(model, ids: dict, vectors: np.ndarray) -> int:
+    collection = model.get_pymongo_collection()
+    valid = {doc_id: row for doc_id, row in ids.items() if ObjectId.is_valid(doc_id)}
+    ops = [UpdateOne({"_id": ObjectId(doc_id)}, {"$set": {"cf_vector": np.round(vectors[row], 5).tolist()}})
+           for doc_id, row in valid.items()]
+    for i in range(0, len(ops), WRITE_CHUNK):
+        await collection.bulk_write(ops[i:i + WRITE_CHUNK], ordered=False)
+
+    # Documents that no longer have any feedback go back to cold start
+    trained = {ObjectId(doc_id) for doc_id in valid}
+    previous = await collection.find({"cf_vector.0": {"$exists": True}}, {"_id": 1}).to_list(None)
+    stale = [UpdateOne({"_id": d["_id"]}, {"$set": {"cf_vector": []}}) for d in previous if d["_id"] not in trained]
+    for i in range(0, len(stale), WRITE_CHUNK):
+        await collection.bulk_write(stale[i:i + WRITE_CHUNK], ordered=False)
+    return len(ops)
+
+async def train_collaborative_model() -> dict:
+    """Offline job: Swipe + Match -> implicit ALS -> cf_vector on every User and Team with feedback"""
+    start = time.perf_counter()
+    data = await load_interactions()
+    if not data.rows:
+        print("🤝 No swipes or matches yet; skipping collaborative model")
+        return cf_status
+
+    by_user, by_team = interaction_matrices(data)
+    users, teams = factorize(by_user, by_team, len(data.user_ids), len(data.team_ids))
+    stored_users = await _store(User, data.user_ids, users)
+    stored_teams = await _store(Team, data.team_ids, teams)
+
+    cf_status.update({
+        "last_trained_at": datetime.now().isoformat(),
+        "users": stored_users,
+        "teams": stored_teams,
+        "interactions": len(by_user[1]),
+        "seconds": round(time.perf_counter() - start, 1),
+    })
+    print(f"🤝 Collaborative model: {cf_status['interactions']} interactions, {stored_users} users, {stored_teams} teams in {cf_status['seconds']}s")
+    return cf_status
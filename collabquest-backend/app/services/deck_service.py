@@ -0,0 +1,251 @@
+import asyncio
+from datetime import datetime, timedelta
+from bson import ObjectId
+from pymongo import UpdateOne
+from app.models import User, Team, Swipe, Block, SwipeDeck, TeamMatchView, UserMatchView
+from app.services.matching_service import calculate_match_scores, calculate_candidate_scores, calculate_user_compatibilities
+from app.services.embedding_store import user_vectors, team_vectors
+from app.services.ann_index import user_index, team_index, shortlist
+
+# --- CONFIGURATION ---
+DECK_SIZE = 200      # ranked cards kept per deck
+LOW_WATER = 20       # refill once fewer unseen cards remain
+DECK_TTL = timedelta(hours=6)
+REFILL_INTERVAL = timedelta(minutes=5) # small candidate pools stay short; don't rebuild them on every read
+POLL_SECONDS = 60
+
+# Decks are rebuilt off the request path. Swipes and blocks edit a deck in place
+# ($pull). A profile change marks the owner's own decks stale; in every other deck
+# holding the changed card only that entry is rescored and moved (or pulled once
+# the card is gone). The worker re-ranks stale, old or nearly empty decks.
+# Reading a page is one indexed find_one.
+deck_stats = {"built": 0, "served": 0, "built_inline": 0, "queued": 0, "rescored": 0, "last_build_ms": 0.0}
+_queue: asyncio.Queue = asyncio.Queue()
+_queued: set = set()
+_changed_cards: set = set()
+_worker_task: asyncio.Task | None = None
+
+def deck_key(owner_id: str, kind: str, project_id: str | None = None) -> dict:
+    return {"owner_id": owner_id, "kind": kind, "project_id": project_id}
+
+async def blocked_ids(user_id: str) -> set:
+    blocks = await Block.find({"$or": [{"blocker_id": user_id}, {"blocked_id": user_id}]}).to_list()
+    return {b.blocked_id if b.blocker_id == user_id else b.blocker_id for b in blocks}
+
+async def hidden_team_ids(user_id: str, blocked: set) -> set:
+    """Teams a user is never shown: their own, and those led by someone on either side of a block"""
+    query = {"members": user_id}
+    if blocked: query = {"$or": [query, {"leader_id": {"$in": list(blocked)}}]}
+    docs = await Team.get_pymongo_collection().find(query, {"_id": 1}).to_list(None)
+    return {str(d["_id"]) for d in docs}
+
+async def _swiped_ids(user_id: str, kind: str, project_id: str | None) -> set:
+    query = {"swiper_id": user_id, "type": "project" if kind == "projects" else "user"}
+    if project_id: query["related_id"] = project_id
+    swipes = await Swipe.get_pymongo_collection().find(query, {"target_id": 1}).to_list(None)
+    return {s["target_id"] for s in swipes}
+
+# Who may appear in a deck. Applied when ranking and again when serving, so a team
+# closed or filled after the deck was built is skipped before the rebuild lands.
+SERVE_FILTERS = {
+    "projects": {
+        "is_looking_for_members": {"$ne": False},
+        "status": {"$ne": "completed"},
+        "$expr": {"$lt": [{"$size": {"$ifNull": ["$members", []]}}, {"$ifNull": ["$target_members", 4]}]},
+    },
+    "users": {"is_looking_for_team": {"$ne": False}},
+}
+
+def _object_ids(ids) -> list:
+    return [ObjectId(i) for i in ids if ObjectId.is_valid(i)]
+
+# --- RANKING ---
+async def _rank_projects(user) -> list:
+    my_id = str(user.id)
+    blocked = await blocked_ids(my_id)
+    swiped = await _swiped_ids(my_id, "projects", None)
+    query = {"members": {"$ne": my_id}, "_id": {"$nin": _object_ids(swiped)}, **SERVE_FILTERS["projects"]}
+    if blocked: query["leader_id"] = {"$nin": list(blocked)}
+    # Swiped, own and blocked leaders' teams never take a shortlist slot, so the
+    # deck keeps filling from the next-nearest teams as the user swipes on
+    exclude = swiped | await hidden_team_ids(my_id, blocked)
+    ids = await shortlist(team_index, user_vectors.get(user.id), Team.get_pymongo_collection(), query, exclude)
+    query["_id"]["$in"] = _object_ids(ids)
+
+    candidates = await Team.find(query).project(TeamMatchView).to_list()
+    scores = await calculate_match_scores(user, candidates)
+    return list(zip([str(t.id) for t in candidates], scores))
+
+async def _rank_users(user, project) -> list:
+    my_id = str(user.id)
+    exclude = {my_id} | await blocked_ids(my_id)
+    exclude |= await _swiped_ids(my_id, "users", str(project.id) if project else None)
+    teams = [project] if project else await Team.find(Team.members == my_id).to_list()
+    for team in teams:
+        exclude.update(team.members)
+
+    query = {"_id": {"$nin": _object_ids(exclude)}, **SERVE_FILTERS["users"]}
+    query_vec = team_vectors.get(project.id) if project else user_vectors.get(user.id)
+    ids = await shortlist(user_index, query_vec, User.get_pymongo_collection(), query, exclude)
+    query["_id"]["$in"] = _object_ids(ids)
+
+    candidates = await User.find(query).project(UserMatchView).to_list()
+    if project: scores = await calculate_candidate_scores(candidates, project)
+    else: scores = await calculate_user_compatibilities(user, candidates)
+    return list(zip([str(c.id) for c in candidates], scores))
+
+async def build_deck(owner, kind: str, project=None) -> SwipeDeck:
+    """Ranks the owner's candidates and stores the top DECK_SIZE as their deck"""
+    start = datetime.now()
+    ranked = await _rank_projects(owner) if kind == "projects" else await _rank_users(owner, project)
+    ranked.sort(key=lambda x: x[1], reverse=True)
+    key = deck_key(str(owner.id), kind, str(project.id) if project else None)
+    deck = SwipeDeck(**key, entries=[{"id": i, "score": s} for i, s in ranked[:DECK_SIZE]], built_at=datetime.now())
+    await SwipeDeck.get_pymongo_collection().update_one(
+        key, {"$set": deck.model_dump(exclude={"id", "revision_id"})}, upsert=True
+    )
+    deck_stats["built"] += 1
+    deck_stats["last_build_ms"] = round((datetime.now() - start).total_seconds() * 1000, 1)
+    return deck
+
+# --- INCREMENTAL UPDATES ---
+async def remove_from_decks(owner_id: str, kind: str, target_ids: list, project_id: str | None = None, any_project: bool = False):
+    """Drops cards from an owner's deck(s) in place (after a swipe or block)"""
+    query = {"owner_id": owner_id, "kind": kind}
+    if not any_project: query["project_id"] = project_id
+    await SwipeDeck.get_pymongo_collection().update_many(query, {"$pull": {"entries": {"id": {"$in": target_ids}}}})
+
+async def record_swipe(swiper_id: str, target_id: str, swipe_type: str, related_id: str | None = None):
+    if swipe_type == "project":
+        await remove_from_decks(swiper_id, "projects", [target_id])
+    else:
+        await remove_from_decks(swiper_id, "users", [target_id], related_id)
+
+async def block_changed(user_a: str, user_b: str):
+    """Both sides lose each other's cards now; their project decks are re-ranked (leaders' teams change)"""
+    await remove_from_decks(user_a, "users", [user_b], any_project=True)
+    await remove_from_decks(user_b, "users", [user_a], any_project=True)
+    queue_refresh({"owner_id": {"$in": [user_a, user_b]}})
+
+def queue_refresh(query: dict):
+    """Marks every deck matching the query stale and schedules a rebuild (safe to call from sync code)"""
+    _queue.put_nowait(("refresh", query))
+    deck_stats["queued"] += 1
+
+def queue_card_update(kind: str, card_id: str):
+    """A user ("users") or team ("projects") card changed or was deleted: fix its entry in every deck holding it"""
+    _queue.put_nowait(("card", (kind, card_id)))
+    deck_stats["queued"] += 1
+
+async def _apply(item: tuple):
+    action, payload = item
+    if action == "refresh": await _rebuild_matching(payload)
+    else: _changed_cards.add(payload)
+
+async def _rebuild_matching(query: dict):
+    collection = SwipeDeck.get_pymongo_collection()
+    await collection.update_many(query, {"$set": {"stale": True}})
+    decks = await collection.find(query, {"owner_id": 1, "kind": 1, "project_id": 1}).to_list(None)
+    for d in decks:
+        _queued.add((d["owner_id"], d["kind"], d.get("project_id")))
+
+async def _score_card(kind: str, card, owner, project) -> float:
+    if kind == "projects": scores = await calculate_match_scores(owner, [card])
+    elif project: scores = await calculate_candidate_scores([card], project)
+    else: scores = await calculate_user_compatibilities(owner, [card])
+    return scores[0]
+
+async def _rescore_card(kind: str, card_id: str):
+    """Rescores one card in the decks holding it and moves it to its new rank; decks awaiting a rebuild are skipped"""
+    collection = SwipeDeck.get_pymongo_collection()
+    model, view = (Team, TeamMatchView) if kind == "projects" else (User, UserMatchView)
+    card = await model.find_one({"_id": ObjectId(card_id)}).project(view) if ObjectId.is_valid(card_id) else None
+    if not card:
+        await collection.update_many({"kind": kind, "entries.id": card_id}, {"$pull": {"entries": {"id": card_id}}})
+        return
+    decks = await collection.find(
+        {"kind": kind, "entries.id": card_id, "stale": {"$ne": True}}, {"owner_id": 1, "project_id": 1}
+    ).to_list(None)
+    if not decks: return
+    owners = await User.find({"_id": {"$in": _object_ids({d["owner_id"] for d in decks})}}).project(UserMatchView).to_list()
+    owners = {str(o.id): o for o in owners}
+    project_ids = {d["project_id"] for d in decks if d.get("project_id")}
+    projects = await Team.find({"_id": {"$in": _object_ids(project_ids)}}).project(TeamMatchView).to_list() if project_ids else []
+    projects = {str(p.id): p for p in projects}
+
+    ops = []
+    for d in decks:
+        owner, project = owners.get(d["owner_id"]), projects.get(d.get("project_id"))
+        if not owner or (d.get("project_id") and not project): continue
+        score = await _score_card(kind, card, owner, project)
+        # Entries are kept sorted by score, so a pull plus a sorted push moves the card to its new rank
+        ops.append(UpdateOne({"_id": d["_id"]}, {"$pull": {"entries": {"id": card_id}}}))
+        ops.append(UpdateOne({"_id": d["_id"]}, {"$push": {"entries": {"$each": [{"id": card_id, "score": score}], "$sort": {"score": -1}}}}))
+    if ops:
+        await collection.bulk_write(ops, ordered=True)
+        deck_stats["rescored"] += len(ops) // 2
+
+async def _rescore_queued():
+    while _changed_cards:
+        await _rescore_card(*_changed_cards.pop())
+
+async def _rebuild_queued():
+    while _queued:
+        owner_id, kind, project_id = _queued.pop()
+        owner = await User.get(owner_id)
+        project = await Team.get(project_id) if project_id else None
+        if not owner or (project_id and not project):
+            await SwipeDeck.get_pymongo_collection().delete_many(deck_key(owner_id, kind, project_id))
+            continue
+        await build_deck(owner, kind, project)
+
+async def _worker():
+    while True:
+        try:
+            try:
+                await _apply(await asyncio.wait_for(_queue.get(), POLL_SECONDS))
+                while not _queue.empty():
+                    await _apply(_queue.get_nowait())
+            except asyncio.TimeoutError:
+                await _rebuild_matching({"built_at": {"$lt": datetime.now() - DECK_TTL}})
+            await _rescore_queued()
+            await _rebuild_queued()
+        except Exception as e:
+            print(f"❌ Swipe deck refresh failed: {e}")
+
+def start_deck_worker():
+    """Startup hook: launches the deck refresher (one per process)"""
+    global _worker_task
+    if _worker_task is None or _worker_task.done():
+        _worker_task = asyncio.create_task(_worker())
+
+# --- READ PATH ---
+async def get_deck_page(owner, kind: str, project=None, cursor: str | None = None, limit: int = 10) -> dict:
+    """
+    Next `limit` deck entries after `cursor` (the last card id the client saw).
+    Swiped cards are already gone from the deck, so an unknown cursor restarts at the top.
+    """
+    key = deck_key(str(owner.id), kind, str(project.id) if project else None)
+    deck = await SwipeDeck.find_one(key)
+    if not deck:
+        deck = await build_deck(owner, kind, project)
+        deck_stats["built_inline"] += 1
+
+    start = 0
+    if cursor:
+        for i, entry in enumerate(deck.entries):
+            if entry.id == cursor:
+                start = i + 1
+                break
+    page = deck.entries[start:start + limit]
+    remaining = len(deck.entries) - start - len(page)
+
+    if remaining < LOW_WATER and not deck.stale and datetime.now() - deck.built_at > REFILL_INTERVAL:
+        queue_refresh(key)
+    deck_stats["served"] += 1
+    return {
+        "entries": page,
+        "next_cursor": page[-1].id if page and remaining > 0 else None,
+        "remaining": remaining,
+        "built_at": deck.built_at,
+    }
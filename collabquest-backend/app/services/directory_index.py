@@ -0,0 +1,140 @@
+import time
+from app.models import User, UserCard
+
+# --- CONFIGURATION ---
+# Every 1..NGRAM character gram of a name is posted. A query up to NGRAM long is
+# one posting lookup; a longer one intersects its trigram postings and verifies
+# the survivors with a substring check.
+NGRAM = 3
+
+def trigrams(text: str) -> set:
+    return {text[i:i + NGRAM] for i in range(len(text) - NGRAM + 1)}
+
+def ngrams(text: str) -> set:
+    return {text[i:i + n] for n in range(1, NGRAM + 1) for i in range(len(text) - n + 1)}
+
+class NgramIndex:
+    """
+    Substring search over a few short text fields per document (names).
+    Each field is indexed on its own, so a match never spans two fields.
+    Lookups only touch the postings of the query's grams, never every name.
+    """
+
+    def __init__(self):
+        self.fields: dict = {}       # doc id -> tuple of lowercased fields
+        self.grams: dict = {}        # gram -> set of doc ids
+
+    def __len__(self):
+        return len(self.fields)
+
+    def get(self, doc_id: str) -> tuple:
+        return self.fields.get(doc_id, ())
+
+    def upsert(self, doc_id: str, *fields: str):
+        self.remove(doc_id)
+        fields = tuple(f.lower().strip() for f in fields if f and f.strip())
+        self.fields[doc_id] = fields
+        for gram in set().union(*map(ngrams, fields)):
+            self.grams.setdefault(gram, set()).add(doc_id)
+
+    def remove(self, doc_id: str):
+        fields = self.fields.pop(doc_id, None)
+        if fields is None: return
+        for gram in set().union(*map(ngrams, fields)):
+            ids = self.grams.get(gram)
+            if ids is None: continue
+            ids.discard(doc_id)
+            if not ids: del self.grams[gram]
+
+    def clear(self):
+        self.fields, self.grams = {}, {}
+
+    def search(self, query: str) -> set:
+        """Ids with a field containing the (lowercased, stripped) query"""
+        q = (query or "").lower().strip()
+        if not q: return set()
+        if len(q) <= NGRAM: return set(self.grams.get(q, ()))
+        postings = [self.grams.get(g, set()) for g in trigrams(q)]
+        candidates = set.intersection(*sorted(postings, key=len))
+        return {doc_id for doc_id in candidates if any(q in f for f in self.fields[doc_id])}
+
+class DirectoryIndex:
+    """
+    In-process people directory over username, full_name and skill names.
+    Names are searched through an NgramIndex, skills through the (small) set of
+    distinct skill names, so a search never loads or scans every User document.
+    """
+
+    def __init__(self):
+        self.names = NgramIndex()    # user id -> (username, full_name)
+        self.sort_keys: dict = {}    # user id -> lowercased username
+        self.user_skills: dict = {}  # user id -> set of lowercased skill names
+        self.skills: dict = {}       # skill name -> set of user ids
+        self._ordered: list | None = None # all ids by username; the unfiltered listing
+        self.ready = False
+
+    def __len__(self):
+        return len(self.sort_keys)
+
+    def build(self, users: list):
+        self.__init__()
+        for u in users:
+            self.upsert(u)
+        self.ready = True
+
+    def upsert(self, user):
+        user_id = str(user.id)
+        self.remove(user_id)
+        self._ordered = None
+        self.names.upsert(user_id, user.username, user.full_name or "")
+        self.sort_keys[user_id] = user.username.lower()
+        skill_names = {s.name.lower() for s in user.skills}
+        self.user_skills[user_id] = skill_names
+        for skill in skill_names:
+            self.skills.setdefault(skill, set()).add(user_id)
+
+    def remove(self, user_id: str):
+        if self.sort_keys.pop(user_id, None) is None: return
+        self._ordered = None
+        self.names.remove(user_id)
+        for skill in self.user_skills.pop(user_id, set()):
+            ids = self.skills.get(skill)
+            if ids is None: continue
+            ids.discard(user_id)
+            if not ids: del self.skills[skill]
+
+    # --- QUERY ---
+    def _match_skill(self, s: str) -> set:
+        matched = set()
+        for skill, ids in self.skills.items():
+            if s in skill: matched |= ids
+        return matched
+
+    def _sort(self, ids) -> list:
+        return sorted(ids, key=lambda uid: (self.sort_keys.get(uid, ""), uid))
+
+    def search(self, query: str = None, skill: str = None, exclude: set = None) -> list:
+        """Matching user ids ordered by username (callers paginate the list)"""
+        q = (query or "").lower().strip()
+        s = (skill or "").lower().strip()
+        if not q and not s:
+            # Unfiltered listing: sorted once, reused until the directory changes
+            if self._ordered is None: self._ordered = self._sort(self.sort_keys)
+            return [uid for uid in self._ordered if uid not in exclude] if exclude else list(self._ordered)
+
+        result = None
+        if q: result = self.names.search(q)
+        if s:
+            by_skill = self._match_skill(s)
+            result = by_skill if result is None else result & by_skill
+        if exclude:
+            result = result - exclude
+        return self._sort(result)
+
+user_directory = DirectoryIndex()
+
+async def build_directory_index():
+    start = time.perf_counter()
+    users = await User.find_all().project(UserCard).to_list()
+    user_directory.build(users)
+    print(f"✅ User directory ready ({len(user_directory)} users) in {time.perf_counter() - start:.2f}s")
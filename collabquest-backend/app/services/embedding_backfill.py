@@ -0,0 +1,93 @@
+import asyncio
+import time
+from datetime import datetime
+from pymongo import UpdateOne
+from app.models import User, Team, UserMatchView, TeamMatchView
+from app.services import index_hooks
+from app.services.model_registry import MODEL_NAME
+from app.services.profile_text import refresh_embeddings, user_embedding_text, team_embedding_text, embedding_fields
+
+# --- CONFIGURATION ---
+BATCH_SIZE = 256
+POLL_SECONDS = 30
+
+# Read paths never embed; documents without a current embedding are picked up here.
+# The first pass after boot checks every document's text hash and vector store row
+# (catches template changes and a lost store); later passes only look at documents
+# the database can tell are stale.
+STALE_QUERY = {"$or": [
+    {"embedding_hash": None},
+    {"embedding_model": {"$ne": MODEL_NAME}},
+]}
+
+backfill_status = {
+    "running": False, "full_pass_done": False, "pending": 0, "processed": 0, "embedded": 0,
+    "batches": 0, "docs_per_second": 0.0, "last_pass_at": None,
+}
+_wake = asyncio.Event()
+_worker_task: asyncio.Task | None = None
+
+async def _backfill_collection(model, view, build, changed, query: dict) -> int:
+    embedded = 0
+    last_id = None
+    while True:
+        page = dict(query)
+        if last_id is not None: page = {"$and": [query, {"_id": {"$gt": last_id}}]}
+        docs = await model.find(page).sort("_id").limit(BATCH_SIZE).project(view).to_list()
+        if not docs: return embedded
+        last_id = docs[-1].id
+
+        start = time.perf_counter()
+        stale = await refresh_embeddings(docs, build)
+        if stale:
+            await model.get_pymongo_collection().bulk_write(
+                [UpdateOne({"_id": d.id}, {"$set": embedding_fields(d)}) for d in stale], ordered=False
+            )
+            for d in stale: changed(d)
+        elapsed = time.perf_counter() - start
+
+        embedded += len(stale)
+        backfill_status["processed"] += len(docs)
+        backfill_status["embedded"] += len(stale)
+        backfill_status["batches"] += 1
+        backfill_status["pending"] = max(0, backfill_status["pending"] - len(stale))
+        if stale and elapsed > 0:
+            backfill_status["docs_per_second"] = round(len(stale) / elapsed, 1)
+
+async def run_backfill_pass(full: bool = False) -> int:
+    query = {} if full else STALE_QUERY
+    backfill_status["running"] = True
+    try:
+        backfill_status["pending"] = await User.find(STALE_QUERY).count() + await Team.find(STALE_QUERY).count()
+        embedded = await _backfill_collection(User, UserMatchView, user_embedding_text, index_hooks.user_changed, query)
+        embedded += await _backfill_collection(Team, TeamMatchView, team_embedding_text, index_hooks.team_changed, query)
+        backfill_status["last_pass_at"] = datetime.now().isoformat()
+        if full: backfill_status["full_pass_done"] = True
+        if embedded: print(f"🧠 Embedding backfill: {embedded} documents re-embedded")
+        return embedded
+    finally:
+        backfill_status["running"] = False
+
+async def _worker():
+    full = True
+    while True:
+        try:
+            await run_backfill_pass(full=full)
+            full = False
+        except Exception as e:
+            print(f"❌ Embedding backfill failed: {e}")
+        _wake.clear()
+        try:
+            await asyncio.wait_for(_wake.wait(), POLL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+
+def start_embedding_backfill():
+    """Startup hook: launches the worker (one per process)"""
+    global _worker_task
+    if _worker_task is None or _worker_task.done():
+        _worker_task = asyncio.create_task(_worker())
+
+def wake_embedding_backfill():
+    """Runs the next pass now instead of at the next poll (e.g. after a bulk import)"""
+    _wake.set()
@@ -0,0 +1,109 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+import numpy as np
+
+# --- CONFIGURATION ---
+CACHE_PATH = os.path.join(os.getcwd(), "embedding_cache.sqlite3")
+MAX_MEMORY_ENTRIES = 10000
+
+def normalize_text(text: str) -> str:
+    """Whitespace-insensitive form of the text; the model ignores the difference"""
+    return " ".join((text or "").split())
+
+class EmbeddingCache:
+    """
+    Content-addressed embedding cache: key = sha256(model name + normalized text).
+    A bounded in-memory LRU sits in front of a SQLite table that survives restarts.
+    Safe to call from the event loop and from the embedder thread.
+    """
+
+    def __init__(self, model_name: str, path: str = CACHE_PATH, max_entries: int = MAX_MEMORY_ENTRIES):
+        self.model_name = model_name
+        self.path = path
+        self.max_entries = max_entries
+        self.memory: OrderedDict = OrderedDict()
+        self.lock = threading.Lock()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "writes": 0}
+        self.db = None
+        try:
+            self.db = sqlite3.connect(path, check_same_thread=False)
+            self.db.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+            self.db.commit()
+        except Exception as e:
+            print(f"⚠️ Embedding cache running memory-only: {e}")
+            self.db = None
+
+    def key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model_name}\x00{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+    def _remember(self, key: str, vector: list[float]):
+        self.memory[key] = vector
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_entries:
+            self.memory.popitem(last=False)
+
+    def get_many(self, texts: list[str]) -> list:
+        """Cached vectors in input order, None where the text has never been embedded"""
+        keys = [self.key(t) for t in texts]
+        results = [None] * len(texts)
+        with self.lock:
+            missing = {}
+            for i, k in enumerate(keys):
+                if k in self.memory:
+                    self.memory.move_to_end(k)
+                    results[i] = self.memory[k]
+                    self.stats["memory_hits"] += 1
+                else:
+                    missing.setdefault(k, []).append(i)
+
+            if missing and self.db is not None:
+                found = {}
+                ks = list(missing)
+                for start in range(0, len(ks), 500):
+                    chunk = ks[start:start + 500]
+                    rows = self.db.execute(
+                        f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                    ).fetchall()
+                    found.update(rows)
+                for k, blob in found.items():
+                    vector = np.frombuffer(blob, dtype=np.float32).tolist()
+                    self._remember(k, vector)
+                    for i in missing.pop(k):
+                        results[i] = vector
+                        self.stats["disk_hits"] += 1
+
+            self.stats["misses"] += sum(len(idx) for idx in missing.values())
+        return results
+
+    def get(self, text: str):
+        return self.get_many([text])[0]
+
+    def put_many(self, texts: list[str], vectors: list[list[float]]):
+        rows = []
+        with self.lock:
+            for text, vector in zip(texts, vectors):
+                k = self.key(text)
+                self._remember(k, vector)
+                rows.append((k, np.asarray(vector, dtype=np.float32).tobytes()))
+            if self.db is not None and rows:
+                try:
+                    self.db.executemany("INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)", rows)
+                    self.db.commit()
+                except Exception as e:
+                    print(f"⚠️ Embedding cache write failed: {e}")
+            self.stats["writes"] += len(rows)
+
+    def put(self, text: str, vector: list[float]):
+        self.put_many([text], [vector])
+
+    def get_metrics(self) -> dict:
+        hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+        lookups = hits + self.stats["misses"]
+        return {
+            **self.stats,
+            "memory_entries": len(self.memory),
+            "hit_rate": round(hits / lookups, 4) if lookups else 0,
+        }
@@ -0,0 +1,113 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from app.services.vector_store import encode_batch, embedding_cache, EMBEDDING_DIM
+
+# --- CONFIGURATION ---
+MAX_BATCH_SIZE = 64
+MAX_WAIT_SECONDS = 0.01 # how long the first request waits for company
+
+# A single dedicated thread owns the model, so inference never runs on the event loop
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embedder")
+_queue: asyncio.Queue | None = None
+_worker_task: asyncio.Task | None = None
+
+_metrics = {
+    "requests": 0,
+    "batches": 0,
+    "texts_encoded": 0,
+    "last_batch_size": 0,
+    "max_batch_size": 0,
+    "encode_seconds": 0.0,
+}
+
+def _ensure_worker() -> asyncio.Queue:
+    global _queue, _worker_task
+    if _worker_task is None or _worker_task.done():
+        _queue = asyncio.Queue()
+        _worker_task = asyncio.create_task(_worker(_queue))
+    return _queue
+
+def _encode_and_cache(texts: list[str]) -> list[list[float]]:
+    vectors = encode_batch(texts)
+    embedding_cache.put_many(texts, vectors)
+    return vectors
+
+async def _worker(queue: asyncio.Queue):
+    loop = asyncio.get_running_loop()
+    while True:
+        batch = [await queue.get()]
+        deadline = loop.time() + MAX_WAIT_SECONDS
+        while len(batch) < MAX_BATCH_SIZE:
+            if not queue.empty():
+                batch.append(queue.get_nowait())
+                continue
+            remaining = deadline - loop.time()
+            if remaining <= 0: break
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+
+        texts = [text for text, _ in batch]
+        start = time.perf_counter()
+        try:
+            vectors = await loop.run_in_executor(_executor, _encode_and_cache, texts)
+        except Exception as e:
+            print(f"❌ Embedding batch failed: {e}")
+            for _, future in batch:
+                if not future.done(): future.set_exception(e)
+            continue
+
+        _metrics["batches"] += 1
+        _metrics["texts_encoded"] += len(texts)
+        _metrics["last_batch_size"] = len(texts)
+        _metrics["max_batch_size"] = max(_metrics["max_batch_size"], len(texts))
+        _metrics["encode_seconds"] += time.perf_counter() - start
+        for (_, future), vector in zip(batch, vectors):
+            if not future.done(): future.set_result(vector)
+
+async def embed_texts(texts: list[str]) -> list[list[float]]:
+    """Async, batched equivalent of generate_embedding for many texts"""
+    loop = asyncio.get_running_loop()
+    _metrics["requests"] += len(texts)
+    results = [None] * len(texts)
+    # The cache may hit SQLite, so it is read off the loop (not on the embedder thread,
+    # where a hit would wait behind a running batch); misses are written there with their vectors
+    cached = await asyncio.to_thread(embedding_cache.get_many, [t for t in texts if t and t.strip()])
+    cached_iter = iter(cached)
+
+    # Only texts the cache has never seen are queued, each distinct one once
+    pending = {}
+    waiting = []
+    for i, text in enumerate(texts):
+        if not text or not text.strip():
+            results[i] = [0.0] * EMBEDDING_DIM
+            continue
+        vector = next(cached_iter)
+        if vector is not None:
+            results[i] = vector
+            continue
+        key = embedding_cache.key(text)
+        if key not in pending:
+            pending[key] = loop.create_future()
+            _ensure_worker().put_nowait((text, pending[key]))
+        waiting.append((i, key))
+
+    if pending:
+        fresh = dict(zip(pending, await asyncio.gather(*pending.values())))
+        for i, key in waiting:
+            results[i] = fresh[key]
+    return results
+
+async def embed_text(text: str) -> list[float]:
+    """Async, batched equivalent of generate_embedding"""
+    return (await embed_texts([text]))[0]
+
+def get_embedding_metrics() -> dict:
+    batches = _metrics["batches"]
+    return {
+        **_metrics,
+        "queue_depth": _queue.qsize() if _queue else 0,
+        "avg_batch_size": round(_metrics["texts_encoded"] / batches, 2) if batches else 0,
+    }
@@ -0,0 +1,266 @@
+import os
+import asyncio
+import hashlib
+import sqlite3
+import threading
+import numpy as np
+from dotenv import load_dotenv
+from pymongo import UpdateOne
+from app.models import User, Team, UserCard
+from app.services.model_registry import MODEL_NAME
+
+load_dotenv()
+
+# --- CONFIGURATION ---
+VECTOR_STORE_DIR = os.getenv("VECTOR_STORE_DIR", os.path.join(os.getcwd(), "vector_store"))
+INITIAL_ROWS = 1024
+IMPORT_BATCH = 1000
+# Inline vectors saved before embedding_model existed were all encoded with this model
+BASELINE_MODEL = "all-MiniLM-L6-v2"
+
+class EmbeddingStore:
+    """
+    The single home of User/Team embeddings: a memory-mapped float32 matrix of
+    unit-normalized rows plus a SQLite index of doc id -> (row, version).
+    A document keeps its row for life (updates overwrite it in place, new documents
+    are appended and the file doubles when full), so rows are stable pointers and
+    get()/matrix slices are zero-copy views. Mongo only keeps embedding_hash, which
+    is the row's version. Writes from other processes (reembed.py, offline jobs)
+    are picked up on the next read.
+    """
+
+    def __init__(self, name: str, model_name: str = MODEL_NAME, directory: str = VECTOR_STORE_DIR):
+        # One pair of files per model: switching models starts an empty store (everything is stale)
+        slug = hashlib.sha256(model_name.encode("utf-8")).hexdigest()[:10]
+        self.name = name
+        self.directory = directory
+        self.matrix_path = os.path.join(directory, f"{name}-{slug}.f32")
+        self.index_path = os.path.join(directory, f"{name}-{slug}.sqlite3")
+        self.lock = threading.RLock()
+        self.db = None
+        self.data_version = None
+        self.dim = 0
+        self.size = 0                # rows allocated so far (removed documents leave zero rows)
+        self.matrix = np.zeros((0, 0), dtype=np.float32)
+        self.row_of: dict = {}       # doc id -> row
+        self.versions: dict = {}     # doc id -> embedding_hash the row was built from
+        self.ids: list = []          # row -> doc id (None for removed rows)
+
+    def __len__(self):
+        with self.lock:
+            self._sync()
+            return len(self.row_of)
+
+    # --- FILES ---
+    def _open(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self.db = sqlite3.connect(self.index_path, check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("CREATE TABLE IF NOT EXISTS rows (doc_id TEXT PRIMARY KEY, row INTEGER NOT NULL, version TEXT)")
+        self.db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        self._reload()
+
+    def _reload(self):
+        meta = dict(self.db.execute("SELECT key, value FROM meta").fetchall())
+        self.dim, self.size = meta.get("dim", 0), meta.get("size", 0)
+        self.row_of, self.versions, self.ids = {}, {}, [None] * self.size
+        for doc_id, row, version in self.db.execute("SELECT doc_id, row, version FROM rows"):
+            self.row_of[doc_id] = row
+            self.versions[doc_id] = version
+            self.ids[row] = doc_id
+        self._map(self.size)
+        self.data_version = self.db.execute("PRAGMA data_version").fetchone()[0]
+
+    def _sync(self):
+        """Opens the store on first use; reloads the index after another process committed to it"""
+        if self.db is None:
+            self._open()
+        elif self.db.execute("PRAGMA data_version").fetchone()[0] != self.data_version:
+            self._reload()
+
+    def _map(self, rows: int):
+        """Maps the matrix file with room for at least `rows` rows, doubling it when full"""
+        if not self.dim: return
+        exists = os.path.exists(self.matrix_path)
+        capacity = os.path.getsize(self.matrix_path) // (4 * self.dim) if exists else 0
+        if rows > capacity: capacity = max(INITIAL_ROWS, 2 * capacity, rows)
+        if capacity == 0 or self.matrix.shape == (capacity, self.dim): return
+        # numpy extends the file in r+ mode when the requested shape is larger
+        self.matrix = np.memmap(self.matrix_path, dtype=np.float32, mode="r+" if exists else "w+", shape=(capacity, self.dim))
+
+    # --- WRITES ---
+    def put_many(self, items: list) -> list:
+        """Stores (doc_id, vector, version) triples; returns the ids written (empty or malformed vectors are skipped)"""
+        vectors = [(str(doc_id), _unit(vector), version) for doc_id, vector, version in items]
+        vectors = [v for v in vectors if v[1] is not None]
+        if not vectors: return []
+        with self.lock:
+            if self.db is None: self._open()
+            self.db.execute("BEGIN IMMEDIATE") # serializes appends across processes
+            try:
+                self._sync()
+                if not self.dim:
+                    self.dim = len(vectors[0][1])
+                    self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('dim', ?)", (self.dim,))
+                vectors = [v for v in vectors if len(v[1]) == self.dim]
+                rows = []
+                for doc_id, _, _ in vectors:
+                    row = self.row_of.get(doc_id)
+                    if row is None:
+                        row = self.size
+                        self.size += 1
+                        self.ids.append(doc_id)
+                        self.row_of[doc_id] = row
+                    rows.append(row)
+                self._map(self.size)
+                if rows:
+                    self.matrix[rows] = np.vstack([v for _, v, _ in vectors])
+                    self.matrix.flush() # rows hit the file before the index points at them
+                self.db.executemany(
+                    "INSERT OR REPLACE INTO rows (doc_id, row, version) VALUES (?, ?, ?)",
+                    [(doc_id, row, version) for (doc_id, _, version), row in zip(vectors, rows)]
+                )
+                self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('size', ?)", (self.size,))
+                self.db.execute("COMMIT")
+            except Exception:
+                self.db.execute("ROLLBACK")
+                self._reload()
+                raise
+            for doc_id, _, version in vectors:
+                self.versions[doc_id] = version
+            return [doc_id for doc_id, _, _ in vectors]
+
+    def put(self, doc_id: str, vector, version: str | None) -> bool:
+        return bool(self.put_many([(doc_id, vector, version)]))
+
+    def remove(self, doc_id: str):
+        doc_id = str(doc_id)
+        with self.lock:
+            if self.db is None: self._open()
+            self.db.execute("BEGIN IMMEDIATE")
+            try:
+                self._sync()
+                row = self.row_of.pop(doc_id, None)
+                if row is not None:
+                    self.db.execute("DELETE FROM rows WHERE doc_id = ?", (doc_id,))
+                    self.matrix[row] = 0
+                    self.ids[row] = None
+                    self.versions.pop(doc_id, None)
+                self.db.execute("COMMIT")
+            except Exception:
+                self.db.execute("ROLLBACK")
+                self._reload()
+                raise
+
+    # --- READS ---
+    def row(self, doc_id: str) -> int | None:
+        with self.lock:
+            self._sync()
+            return self.row_of.get(str(doc_id))
+
+    def version(self, doc_id) -> str | None:
+        """embedding_hash of the stored vector (None when the document has none)"""
+        if doc_id is None: return None
+        with self.lock:
+            self._sync()
+            return self.versions.get(str(doc_id))
+
+    def get(self, doc_id) -> np.ndarray | None:
+        """Zero-copy view of a document's unit vector (reflects later writes to the row)"""
+        with self.lock:
+            self._sync()
+            row = self.row_of.get(str(doc_id))
+            return None if row is None else self.matrix[row]
+
+    def take(self, doc_ids: list) -> np.ndarray:
+        """
+        (N, D) unit vectors for a batch of documents, zero rows where one has no vector.
+        A batch stored in consecutive rows, in the order asked for, is a zero-copy view
+        of the matrix (it reflects later writes); any other batch is gathered into a copy.
+        """
+        with self.lock:
+            self._sync()
+            rows = np.fromiter((self.row_of.get(str(i), -1) for i in doc_ids), dtype=np.int64, count=len(doc_ids))
+            if not self.dim: return np.zeros((len(rows), 0), dtype=np.float32)
+            if len(rows) and rows[0] >= 0 and np.all(np.diff(rows) == 1):
+                return self.matrix[rows[0]:rows[0] + len(rows)]
+            out = np.asarray(self.matrix[np.maximum(rows, 0)])
+            out[rows < 0] = 0
+            return out
+
+    def row_index(self) -> dict:
+        """Copy of doc id -> row for every stored document"""
+        with self.lock:
+            self._sync()
+            return dict(self.row_of)
+
+    def snapshot(self) -> tuple:
+        """(ids, versions, (N, D) matrix) of every stored document; a zero-copy slice when no row was removed"""
+        with self.lock:
+            self._sync()
+            if len(self.row_of) == self.size:
+                ids = list(self.ids)
+                matrix = self.matrix[:self.size] if self.dim else np.zeros((0, 0), dtype=np.float32)
+            else:
+                ids = [doc_id for doc_id in self.ids if doc_id is not None]
+                matrix = np.asarray(self.matrix[[self.row_of[doc_id] for doc_id in ids]])
+            return ids, [self.versions[doc_id] for doc_id in ids], matrix
+
+    def get_metrics(self) -> dict:
+        with self.lock:
+            self._sync()
+            return {
+                "documents": len(self.row_of), "rows": self.size, "dim": self.dim,
+                "file_mb": round(self.matrix.shape[0] * self.dim * 4 / 2**20, 1),
+            }
+
+def _unit(vector) -> np.ndarray | None:
+    if vector is None or len(vector) == 0: return None
+    v = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(v)
+    return v / norm if norm > 0 else None
+
+user_vectors = EmbeddingStore("users")
+team_vectors = EmbeddingStore("teams")
+stores = {"user": user_vectors, "team": team_vectors}
+
+def store_for(doc) -> EmbeddingStore:
+    """Store holding a User/Team document's (or projection's) embedding"""
+    return user_vectors if isinstance(doc, (User, UserCard)) else team_vectors
+
+# --- MIGRATION ---
+async def import_inline_embeddings():
+    """
+    Startup hook: moves embeddings still stored inline on Mongo documents into the store.
+    A document without embedding_model predates it and was encoded with BASELINE_MODEL.
+    The inline array is only dropped once it was imported or is known to be outdated
+    (another model, or empty); anything the store could not take stays in Mongo.
+    """
+    for model, store in ((User, user_vectors), (Team, team_vectors)):
+        collection = model.get_pymongo_collection()
+        cursor = collection.find({"embedding": {"$exists": True}}, {"embedding": 1, "embedding_hash": 1, "embedding_model": 1})
+        batch, totals = [], {"imported": 0, "outdated": 0, "kept": 0}
+        async for d in cursor:
+            batch.append(d)
+            if len(batch) == IMPORT_BATCH:
+                await _import_batch(collection, store, batch, totals)
+                batch = []
+        if batch:
+            await _import_batch(collection, store, batch, totals)
+        if any(totals.values()):
+            print(f"📦 Vector store ({store.name}): imported {totals['imported']} inline embeddings, "
+                  f"dropped {totals['outdated']} outdated ones, kept {totals['kept']} it could not read")
+
+async def _import_batch(collection, store: EmbeddingStore, batch: list, totals: dict):
+    current, outdated = [], []
+    for d in batch:
+        if not d.get("embedding") or (d.get("embedding_model") or BASELINE_MODEL) != MODEL_NAME: outdated.append(d["_id"])
+        else: current.append(d)
+    items = [(str(d["_id"]), d["embedding"], d.get("embedding_hash")) for d in current]
+    imported = set(await asyncio.to_thread(store.put_many, items))
+    done = outdated + [d["_id"] for d in current if str(d["_id"]) in imported]
+    if done:
+        await collection.bulk_write([UpdateOne({"_id": doc_id}, {"$unset": {"embedding": ""}}) for doc_id in done], ordered=False)
+    totals["imported"] += len(imported)
+    totals["outdated"] += len(outdated)
+    totals["kept"] += len(current) - len(imported)
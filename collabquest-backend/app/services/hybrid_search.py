@@ -0,0 +1,34 @@
+from app.services.text_index import team_text_index, name_matches
+from app.services.ann_index import team_index
+from app.services.embedding_service import embed_text
+
+# --- CONFIGURATION ---
+RRF_K = 60 # standard reciprocal rank fusion damping
+# Vector-only hits must be at least this similar to count as relevant;
+# keyword and name hits always count (they contain the query's text).
+MIN_VECTOR_SCORE = 0.5
+
+def reciprocal_rank_fusion(rankings: list[list[str]], k: int = RRF_K) -> list[tuple[str, float]]:
+    """Fuses ranked id lists: score(d) = sum over lists of 1 / (k + rank)"""
+    fused: dict = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda x: x[1], reverse=True)
+
+async def search_teams(query: str, k: int, vector_ranking: list[str] | None = None) -> list[tuple[str, float]]:
+    """
+    Hybrid project retrieval: BM25 over name/description/skills and name substring
+    matches (partial words like "maze sol") fused with semantic rank.
+    vector_ranking lets a caller supply its own semantic ids (e.g. Chroma results);
+    by default the in-process team ANN index is queried.
+    Returns [(team id, fused score)] best first.
+    """
+    keyword = [doc_id for doc_id, _ in team_text_index.search(query, k)]
+    names = name_matches(query, k)
+    if vector_ranking is None:
+        vector_ranking = []
+        if team_index.ready:
+            hits = team_index.search(await embed_text(query), k)
+            vector_ranking = [doc_id for doc_id, score in hits if score >= MIN_VECTOR_SCORE]
+    return reciprocal_rank_fusion([names, keyword, vector_ranking])[:k]
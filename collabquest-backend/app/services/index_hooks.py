@@ -0,0 +1,53 @@
+# Single place the mutation paths report User/Team changes to.
+# Every in-process index that mirrors Mongo data is kept fresh from here,
+# (and cached scores dropped) so routes only have to remember one call per write.
+from app.models import User, Team, UserMatchView
+from app.services.ann_index import user_index, team_index
+from app.services.embedding_store import user_vectors, team_vectors
+from app.services.text_index import team_text_index, team_tokens, team_names
+from app.services.directory_index import user_directory
+from app.services.score_cache import score_cache
+from app.services.deck_service import queue_refresh, queue_card_update
+from app.services import recommendation_service
+
+def user_snapshot(user: User) -> dict:
+    """The fields the indexes read; compare before/after a save to skip no-op refreshes"""
+    return user.model_dump(include=set(UserMatchView.model_fields) - {"id"})
+
+def user_changed(user: User):
+    """Call after a User document (profile, skills, embedding) has been saved"""
+    user_index.upsert(str(user.id))
+    user_directory.upsert(user)
+    score_cache.invalidate(str(user.id))
+    queue_refresh({"owner_id": str(user.id)})
+    queue_card_update("users", str(user.id))
+    recommendation_service.queue_upsert("user", user)
+
+def team_changed(team: Team):
+    """Call after a Team document (details, skills, embedding) has been saved"""
+    team_index.upsert(str(team.id))
+    team_text_index.upsert(str(team.id), team_tokens(team))
+    team_names.upsert(str(team.id), team.name)
+    score_cache.invalidate(str(team.id))
+    queue_refresh({"project_id": str(team.id)})
+    queue_card_update("projects", str(team.id))
+    recommendation_service.queue_upsert("team", team)
+
+def user_removed(user_id: str):
+    user_index.remove(user_id)
+    user_vectors.remove(user_id)
+    user_directory.remove(user_id)
+    score_cache.invalidate(user_id)
+    queue_refresh({"owner_id": user_id})
+    queue_card_update("users", user_id)
+    recommendation_service.queue_delete("user", user_id)
+
+def team_removed(team_id: str):
+    team_index.remove(team_id)
+    team_vectors.remove(team_id)
+    team_text_index.remove(team_id)
+    team_names.remove(team_id)
+    score_cache.invalidate(team_id)
+    queue_refresh({"project_id": team_id})
+    queue_card_update("projects", team_id)
+    recommendation_service.queue_delete("team", team_id)
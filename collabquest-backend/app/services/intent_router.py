@@ -0,0 +1,57 @@
+import asyncio
+import numpy as np
+from app.services.embedding_service import embed_text, embed_texts
+from app.services.matching_service import normalized_matrix
+
+class IntentRouter:
+    """
+    Labelled example sentences compiled once into a unit-normalized (N, D) matrix
+    with a parallel label array. Routing a message is one embedding, one
+    matrix-vector product and a top-k vote instead of N model calls.
+    """
+
+    def __init__(self, examples: dict, default_threshold: float, thresholds: dict | None = None, top_k: int = 1):
+        self.examples = examples
+        self.default_threshold = default_threshold
+        self.thresholds = thresholds or {}
+        self.top_k = top_k
+        self.matrix = None
+        self.labels = None
+        self._lock = asyncio.Lock()
+
+    async def compile(self):
+        async with self._lock:
+            if self.matrix is not None: return
+            labelled = [(intent, example) for intent, examples in self.examples.items() for example in examples]
+            vectors = await embed_texts([example for _, example in labelled])
+            self.labels = np.array([intent for intent, _ in labelled])
+            self.matrix = normalized_matrix(vectors)
+
+    async def scores(self, text: str) -> np.ndarray:
+        """Cosine similarity (0-1) of the text against every example"""
+        if self.matrix is None:
+            await self.compile()
+        query = normalized_matrix([await embed_text(text)])[0]
+        if query.shape[0] != self.matrix.shape[1]:
+            return np.zeros(len(self.labels), dtype=np.float32)
+        return self.matrix @ query
+
+    async def route(self, text: str) -> tuple[str | None, float]:
+        """
+        The top-k nearest examples vote for their intent (weighted by similarity).
+        The winner is returned only if its best example clears that intent's threshold.
+        """
+        sims = await self.scores(text)
+        if len(sims) == 0: return None, 0.0
+
+        k = min(self.top_k, len(sims))
+        top = np.argpartition(-sims, k - 1)[:k]
+        votes = {}
+        for i in top:
+            votes[self.labels[i]] = votes.get(self.labels[i], 0.0) + float(sims[i])
+        intent = max(votes, key=votes.get)
+
+        confidence = float(sims[self.labels == intent].max())
+        if confidence > self.thresholds.get(intent, self.default_threshold):
+            return str(intent), confidence
+        return None, confidence
@@ -0,0 +1,137 @@
+import time
+from datetime import datetime
+import numpy as np
+from bson import ObjectId
+from pymongo import UpdateOne
+from app.models import User, Team, NeighborList, TeamCard, UserCard
+from app.services.projections import card_dict
+from app.services.embedding_store import user_vectors, team_vectors
+
+# --- CONFIGURATION ---
+K = 20
+BLOCK_BYTES = 64 * 1024 * 1024 # scratch for one (rows x N) float32 similarity block
+WRITE_CHUNK = 1000
+
+KINDS = {"team": (Team, TeamCard, team_vectors), "user": (User, UserCard, user_vectors)}
+knn_status: dict = {}
+
+# The graph is an offline batch job (see build_knn.py). Neighbour lists live in
+# their own collection so reading "similar" is one indexed lookup, and a run only
+# recomputes rows whose embedding changed (plus rows that pointed at one of them);
+# every other row just merges in the changed documents' scores.
+
+def _block_rows(n: int) -> int:
+    return max(1, BLOCK_BYTES // (4 * max(n, 1)))
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Column indices of the k best scores per row, best first"""
+    k = min(k, scores.shape[1])
+    if k == 0: return np.zeros((scores.shape[0], 0), dtype=np.int64)
+    part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    order = np.argsort(-np.take_along_axis(scores, part, axis=1), axis=1)
+    return np.take_along_axis(part, order, axis=1)
+
+def full_rows(matrix: np.ndarray, rows: np.ndarray, k: int = K) -> dict:
+    """Exact top-k neighbours of the given rows against every row, one bounded block at a time"""
+    result = {}
+    step = _block_rows(len(matrix))
+    for start in range(0, len(rows), step):
+        block = rows[start:start + step]
+        scores = matrix[block] @ matrix.T
+        scores[np.arange(len(block)), block] = -np.inf # never your own neighbour
+        best = _top_k(scores, k)
+        for i, row in enumerate(block):
+            cols = best[i][np.isfinite(scores[i, best[i]])]
+            result[int(row)] = list(zip(cols.tolist(), scores[i, cols].tolist()))
+    return result
+
+def merge_changed(matrix: np.ndarray, rows: np.ndarray, changed: np.ndarray, current: dict, k: int = K) -> dict:
+    """
+    For rows whose own vector and neighbours are unchanged: only the changed rows can
+    enter their lists, so score rows x changed and merge where one beats the k-th score.
+    current maps row -> [(col, score)] best first. Returns only the rows that changed.
+    """
+    updated = {}
+    if not len(changed) or not len(rows): return updated
+    step = _block_rows(len(changed))
+    for start in range(0, len(rows), step):
+        block = rows[start:start + step]
+        scores = matrix[block] @ matrix[changed].T
+        kth = np.array([current[r][-1][1] if len(current[r]) >= k else -np.inf for r in block.tolist()])
+        for i in np.nonzero(scores.max(axis=1) > kth)[0]:
+            row = int(block[i])
+            merged = current[row] + list(zip(changed.tolist(), scores[i].tolist()))
+            merged.sort(key=lambda x: x[1], reverse=True)
+            updated[row] = merged[:k]
+    return updated
+
+async def build_knn_graph(kind: str, force: bool = False) -> dict:
+    """Refreshes the neighbour lists of one collection ("team" or "user")"""
+    start = time.perf_counter()
+    _, _, store = KINDS[kind]
+    # Unit vectors straight from the memory-mapped store (no copy unless rows were removed)
+    ids, hashes, matrix = store.snapshot()
+    row_of = {doc_id: row for row, doc_id in enumerate(ids)}
+
+    collection = NeighborList.get_pymongo_collection()
+    stored = {d["doc_id"]: d for d in await collection.find({"kind": kind}, {"doc_id": 1, "neighbors": 1, "embedding_hash": 1}).to_list(None)}
+    removed = [doc_id for doc_id in stored if doc_id not in row_of]
+    changed = {row for row, doc_id in enumerate(ids)
+               if force or hashes[row] is None or doc_id not in stored or stored[doc_id].get("embedding_hash") != hashes[row]}
+    dirty_ids = set(removed) | {ids[row] for row in changed}
+
+    # Rows that pointed at a changed/removed document may need neighbours beyond their stored list
+    current = {}
+    for doc_id, d in stored.items():
+        row = row_of.get(doc_id)
+        if row is None or row in changed: continue
+        if any(n["id"] in dirty_ids or n["id"] not in row_of for n in d["neighbors"]): changed.add(row)
+        else: current[row] = [(row_of[n["id"]], n["score"]) for n in d["neighbors"]]
+    full = np.array(sorted(changed), dtype=np.int64)
+    clean = np.array(sorted(current), dtype=np.int64)
+    changed_vectors = np.array(sorted(row_of[i] for i in dirty_ids if i in row_of), dtype=np.int64)
+
+    updates = full_rows(matrix, full) if len(full) else {}
+    updates.update(merge_changed(matrix, clean, changed_vectors, current))
+
+    now = datetime.now()
+    ops = [UpdateOne(
+        {"kind": kind, "doc_id": ids[row]},
+        {"$set": {
+            "neighbors": [{"id": ids[col], "score": round(score, 4)} for col, score in neighbours],
+            "embedding_hash": hashes[row], "updated_at": now,
+        }},
+        upsert=True,
+    ) for row, neighbours in updates.items()]
+    for i in range(0, len(ops), WRITE_CHUNK):
+        await collection.bulk_write(ops[i:i + WRITE_CHUNK], ordered=False)
+    if removed:
+        await collection.delete_many({"kind": kind, "doc_id": {"$in": removed}})
+
+    knn_status[kind] = {
+        "documents": len(ids), "recomputed": len(full), "merged": len(updates) - len(full),
+        "removed": len(removed), "seconds": round(time.perf_counter() - start, 1), "built_at": now.isoformat(),
+    }
+    print(f"🕸️ kNN graph ({kind}): {len(ids)} docs, {len(full)} rows recomputed, {len(updates) - len(full)} merged")
+    return knn_status[kind]
+
+# --- READ PATH ---
+async def similar_cards(kind: str, doc_id: str, limit: int, fields: str | None = None, query: dict | None = None) -> list:
+    """Cards of a document's precomputed neighbours, most similar first; `query` filters which neighbours are served"""
+    model, card, _ = KINDS[kind]
+    entry = await NeighborList.find_one({"kind": kind, "doc_id": doc_id})
+    if not entry: return []
+    neighbours = entry.neighbors[:limit]
+    in_ids = {"_id": {"$in": [ObjectId(n.id) for n in neighbours]}}
+    docs = await model.find({"$and": [query, in_ids]} if query else in_ids).project(card).to_list()
+    by_id = {str(d.id): d for d in docs}
+    results = []
+    for n in neighbours:
+        doc = by_id.get(n.id)
+        if not doc: continue
+        item = card_dict(doc, card, fields)
+        item["id"] = n.id
+        item["_id"] = n.id
+        item["similarity"] = round(n.score * 100, 0)
+        results.append(item)
+    return results
@@ -0,0 +1,75 @@
+import asyncio
+from bson import ObjectId
+from app.models import User, Team
+
+class DocumentLoader:
+    """
+    DataLoader-style batcher for one collection.
+    Every load() issued during the same event-loop tick is collected and resolved
+    by a single `_id $in` query; results are memoized for the rest of the request.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.cache: dict = {}
+        self.pending: list = []
+        self.tasks: set = set() # in-flight dispatches, referenced until done so they can't be collected
+        self.round_trips = 0
+
+    def load(self, doc_id) -> asyncio.Future:
+        key = str(doc_id)
+        if key in self.cache:
+            return self.cache[key]
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.cache[key] = future
+        self.pending.append(key)
+        if len(self.pending) == 1:
+            loop.call_soon(self._start_dispatch)
+        return future
+
+    def _start_dispatch(self):
+        task = asyncio.ensure_future(self._dispatch())
+        self.tasks.add(task)
+        task.add_done_callback(self._dispatch_done)
+
+    def _dispatch_done(self, task: asyncio.Task):
+        self.tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            print(f"❌ {self.model.__name__} loader dispatch failed: {task.exception()}")
+
+    async def load_many(self, ids) -> list:
+        """Same order as ids; missing documents come back as None"""
+        return list(await asyncio.gather(*[self.load(i) for i in ids]))
+
+    def prime(self, doc):
+        """Seeds the cache with a document the request already holds"""
+        if doc is None or str(doc.id) in self.cache: return
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(doc)
+        self.cache[str(doc.id)] = future
+
+    async def _dispatch(self):
+        keys, self.pending = self.pending, []
+        valid = [ObjectId(k) for k in keys if ObjectId.is_valid(k)]
+        try:
+            docs = await self.model.find({"_id": {"$in": valid}}).to_list() if valid else []
+            self.round_trips += 1
+        except Exception as e:
+            for k in keys:
+                future = self.cache.pop(k)
+                if not future.done(): future.set_exception(e)
+            return
+        found = {str(d.id): d for d in docs}
+        for k in keys:
+            future = self.cache[k]
+            if not future.done(): future.set_result(found.get(k))
+
+class RequestLoaders:
+    def __init__(self):
+        self.users = DocumentLoader(User)
+        self.teams = DocumentLoader(Team)
+
+def get_loaders() -> RequestLoaders:
+    """FastAPI dependency: one fresh set of loaders per request"""
+    return RequestLoaders()
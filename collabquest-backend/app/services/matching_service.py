@@ -1,100 +1,164 @@
 from app.models import User, Team
 from typing import List
-from app.services.vector_store import generate_embedding, calculate_similarity
-
-# --- HELPERS ---
-def calculate_time_overlap(user_avail: list, team_avail_flat: list) -> float:
-    total_overlap_minutes = 0
-    def to_mins(t_str):
-        if not t_str: return 0
-        try:
-            h, m = map(int, t_str.split(':'))
-            return h * 60 + m
-        except: return 0
-    team_schedule = {day: [] for day in ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]}
-    for entry in team_avail_flat:
-        if entry.enabled:
-            for slot in entry.slots:
-                team_schedule[entry.day].append((to_mins(slot.start), to_mins(slot.end)))
-    for user_day in user_avail:
-        if user_day.enabled and user_day.day in team_schedule:
-            for u_slot in user_day.slots:
-                u_start, u_end = to_mins(u_slot.start), to_mins(u_slot.end)
-                for t_start, t_end in team_schedule[user_day.day]:
-                    overlap_start = max(u_start, t_start)
-                    overlap_end = min(u_end, t_end)
-                    if overlap_start < overlap_end:
-                        total_overlap_minutes += (overlap_end - overlap_start)
-    hours = total_overlap_minutes / 60
-    return min(100.0, (hours / 10) * 100)
+import numpy as np
+from app.services.score_cache import score_cache
+from app.services.embedding_store import user_vectors, team_vectors
+from app.services import reduced_embeddings
+from app.services.availability import (
+    get_bits, bitset_matrix, minutes_to_score,
+    batch_overlap_scores, weighted_overlap_scores, profile_matrix, unpack_profile, SLOT_MINUTES
+)
+
+# Share of the final score given to collaborative filtering when both sides have latent factors
+CF_WEIGHT = 0.15
+
+# --- VECTORIZED HELPERS ---
+
+def normalized_matrix(vectors: list) -> np.ndarray:
+    """Stacks embeddings into one (N, D) float32 matrix with unit-length rows.
+    Missing or malformed vectors become zero rows, so they score 0 like calculate_similarity."""
+    dim = max((len(v) for v in vectors if v), default=0)
+    matrix = np.zeros((len(vectors), dim), dtype=np.float32)
+    for i, v in enumerate(vectors):
+        if v and len(v) == dim:
+            matrix[i] = v
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return matrix
+
+def semantic_scores(query: list[float], vectors: list) -> np.ndarray:
+    """Cosine similarity (0-100) of one embedding against N embeddings in a single product"""
+    matrix = normalized_matrix([query] + list(vectors))
+    if matrix.shape[1] == 0:
+        return np.zeros(len(vectors), dtype=np.float32)
+    return (matrix[1:] @ matrix[0]) * 100
+
+def doc_semantic_scores(query, docs: list, store) -> np.ndarray:
+    """
+    Cosine similarity (0-100) of a stored unit vector against documents, gathered from
+    the embedding store in one product (documents without a vector score 0).
+    In reduced-embedding mode documents carrying a current int8 code are scored on it
+    and only the best RERANK_TOP, together with any uncoded ones, are re-scored exactly.
+    """
+    return _doc_semantic(query, docs, store)[0]
+
+def _doc_semantic(query, docs: list, store) -> tuple[np.ndarray, np.ndarray]:
+    """doc_semantic_scores plus a mask of the scores that are exact (not read off an int8 code)"""
+    scores = np.zeros(len(docs), dtype=np.float32)
+    is_exact = np.ones(len(docs), dtype=bool)
+    if query is None or not docs or len(query) != store.dim: return scores, is_exact
+    reducer = reduced_embeddings.reducer
+    if reducer is None:
+        return (store.take([d.id for d in docs]) @ query) * 100, is_exact
+
+    coded = [i for i, d in enumerate(docs) if reducer.has_code(d)]
+    exact = [i for i, d in enumerate(docs) if not reducer.has_code(d)]
+    if coded:
+        approx = reducer.scores(query, reducer.unpack([docs[i].embedding_int8 for i in coded])) * 100
+        scores[coded] = approx
+        is_exact[coded] = False
+        best = np.argsort(-approx)[:reduced_embeddings.RERANK_TOP]
+        exact += [coded[i] for i in best]
+    if exact:
+        scores[exact] = (store.take([docs[i].id for i in exact]) @ query) * 100
+        is_exact[exact] = True
+    return scores, is_exact
+
+def has_schedules(teams: list, profiles: np.ndarray) -> np.ndarray:
+    """
+    Which teams are scored on availability: those where a member saved a schedule,
+    even one with every day off (no overlap). Teams without any get full marks.
+    Teams saved before availability_members existed fall back to their profile.
+    """
+    return np.array([
+        profile.any() if getattr(t, "availability_members", None) is None else t.availability_members > 0
+        for t, profile in zip(teams, profiles)
+    ], dtype=bool)
+
+def blend_collaborative(final: np.ndarray, query: list, vectors: list) -> np.ndarray:
+    """
+    Mixes in the implicit-feedback signal (cosine of ALS latent factors, 0-100)
+    for user-team pairs where both sides have factors; cold-start pairs keep the content score.
+    """
+    if not query: return final
+    has_factors = np.array([len(v) == len(query) for v in vectors])
+    if not has_factors.any(): return final
+    collaborative = np.clip(semantic_scores(query, vectors), 0, 100)
+    return np.where(has_factors, final * (1 - CF_WEIGHT) + collaborative * CF_WEIGHT, final)
+
+# --- SCORE CACHE ---
+
+def _cached_scores(kind: str, subject, others: list, compute, symmetric: bool = False) -> List[float]:
+    """
+    Serves (subject, other) scores from score_cache and computes only the misses, in one batch.
+    compute returns (scores, exact mask); only exact scores are cached, since one read off an
+    int8 code depends on the reducer and on which other documents made the re-rank cut.
+    """
+    if not others: return []
+    keys = []
+    for other in others:
+        a, b = subject, other
+        if symmetric and str(b.id) < str(a.id): a, b = b, a
+        keys.append(score_cache.key(kind, a, b))
+    scores = score_cache.get_many(keys)
+    missing = [i for i, score in enumerate(scores) if score is None]
+    if missing:
+        fresh, is_exact = compute([others[i] for i in missing])
+        score_cache.put_many([keys[i] for i, ok in zip(missing, is_exact) if ok], [f for f, ok in zip(fresh, is_exact) if ok])
+        for i, score in zip(missing, fresh):
+            scores[i] = score
+    return scores
 
 # --- SCORING FUNCTIONS ---
 
-async def calculate_match_score(user: User, team: Team, team_members: List[User]) -> float:
+def _match_scores(user: User, teams: List[Team]) -> tuple[List[float], np.ndarray]:
     # 1. SEMANTIC MATCH (70%)
-    if not user.embedding:
-        skills_str = ' '.join([s.name for s in user.skills])
-        # Contextualize user data
-        user_text = f"Developer with skills: {skills_str}. Interests: {' '.join(user.interests)}. About: {user.about}"
-        user.embedding = generate_embedding(user_text)
-        await user.save()
-        
-    if not team.embedding:
-        # Prioritize Active Skills in embedding with explicit labels
-        skills_text = ' '.join(team.active_needed_skills) if team.active_needed_skills else ' '.join(team.needed_skills)
-        # We explicitly add "Open Roles" and "Looking for" to weight these terms heavily in the semantic search
-        team_text = f"Project: {team.name}. Description: {team.description}. Looking for teammates with skills: {skills_text}. Open Roles: {skills_text}"
-        team.embedding = generate_embedding(team_text)
-        await team.save()
-
-    semantic_score = calculate_similarity(user.embedding, team.embedding) * 100
-    
-    # 2. AVAILABILITY (30%)
-    team_avail_flat = []
-    for member in team_members:
-        if member.availability:
-            team_avail_flat.extend(member.availability)
-    
-    if not team_avail_flat:
-        avail_score = 100 
+    semantic, is_exact = _doc_semantic(user_vectors.get(user.id), teams, team_vectors)
+
+    # 2. AVAILABILITY (30%) - teams with no member availability get full marks
+    profiles = profile_matrix([t.availability_profile for t in teams])
+    avail = weighted_overlap_scores(get_bits(user), profiles)
+    avail = np.where(has_schedules(teams, profiles), avail, 100.0)
+
+    final = (semantic * 0.70) + (avail * 0.30)
+    final = blend_collaborative(final, user.cf_vector, [t.cf_vector for t in teams])
+    return np.round(final, 0).tolist(), is_exact
+
+def _candidate_scores(candidates: List[User], team: Team) -> tuple[List[float], np.ndarray]:
+    semantic, is_exact = _doc_semantic(team_vectors.get(team.id), candidates, user_vectors)
+
+    team_counts = unpack_profile(team.availability_profile)
+    if not has_schedules([team], team_counts[None, :])[0]:
+        avail = np.full(len(candidates), 100.0)
     else:
-        avail_score = calculate_time_overlap(user.availability, team_avail_flat)
-
-    final_score = (semantic_score * 0.70) + (avail_score * 0.30)
-    return round(final_score, 0)
-
-def calculate_project_match(user: User, project: Team) -> float:
-    if not user.embedding:
-        user_text = f"{' '.join([s.name for s in user.skills])} {' '.join(user.interests)} {user.about}"
-        user.embedding = generate_embedding(user_text)
-        
-    if not project.embedding:
-        skills_text = ' '.join(project.active_needed_skills) if project.active_needed_skills else ' '.join(project.needed_skills)
-        project_text = f"Project: {project.name}. Description: {project.description}. Looking for teammates with skills: {skills_text}. Open Roles: {skills_text}"
-        project.embedding = generate_embedding(project_text)
-        
-    semantic_score = calculate_similarity(user.embedding, project.embedding) * 100
-    return round(semantic_score, 0)
+        candidate_slots = np.unpackbits(bitset_matrix([get_bits(c) for c in candidates]), axis=1)
+        avail = minutes_to_score((candidate_slots @ team_counts.astype(np.float64)) * SLOT_MINUTES)
+
+    final = (semantic * 0.70) + (avail * 0.30)
+    final = blend_collaborative(final, team.cf_vector, [c.cf_vector for c in candidates])
+    return np.round(final, 0).tolist(), is_exact
+
+def _compatibility_scores(user: User, candidates: List[User]) -> tuple[List[float], np.ndarray]:
+    semantic, is_exact = _doc_semantic(user_vectors.get(user.id), candidates, user_vectors)
+    avail = batch_overlap_scores(get_bits(user), [get_bits(c) for c in candidates])
+
+    # No collaborative blend: the factors are trained on user-team interactions only,
+    # so two users' factors are not comparable the way a user's and a team's are
+    final = (semantic * 0.70) + (avail * 0.30)
+    return np.round(final, 0).tolist(), is_exact
+
+async def calculate_match_scores(user: User, teams: List[Team]) -> List[float]:
+    """Scores one user against N teams using their materialized availability profiles"""
+    return _cached_scores("user-team", user, teams, lambda miss: _match_scores(user, miss))
+
+async def calculate_candidate_scores(candidates: List[User], team: Team) -> List[float]:
+    """Scores N candidate users against one team (the leader's recruiting view)"""
+    return _cached_scores("team-user", team, candidates, lambda miss: _candidate_scores(miss, team))
+
+async def calculate_user_compatibilities(user: User, candidates: List[User]) -> List[float]:
+    """Scores one user against N other users"""
+    return _cached_scores("user-user", user, candidates, lambda miss: _compatibility_scores(user, miss), symmetric=True)
 
 async def calculate_user_compatibility(user_a: User, user_b: User) -> float:
-    # Ensure embeddings exist
-    if not user_a.embedding:
-        skills_str_a = ' '.join([s.name for s in user_a.skills])
-        user_a.embedding = generate_embedding(f"Developer with skills: {skills_str_a}. Interests: {' '.join(user_a.interests)}.")
-        await user_a.save()
-
-    if not user_b.embedding:
-        skills_str_b = ' '.join([s.name for s in user_b.skills])
-        user_b.embedding = generate_embedding(f"Developer with skills: {skills_str_b}. Interests: {' '.join(user_b.interests)}.")
-        await user_b.save()
-    
-    # 1. Semantic Match (70%)
-    semantic_score = calculate_similarity(user_a.embedding, user_b.embedding) * 100
-    
-    # 2. Availability Overlap (30%)
-    avail_score = calculate_time_overlap(user_a.availability, user_b.availability)
-    
-    # Weighted Sum
-    final_score = (semantic_score * 0.70) + (avail_score * 0.30)
-    
-    return round(final_score, 0)
\ No newline at end of file
+    scores = await calculate_user_compatibilities(user_a, [user_b])
+    return scores[0]
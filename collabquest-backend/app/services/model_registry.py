@@ -0,0 +1,37 @@
+import asyncio
+import threading
+import time
+
+# --- CONFIGURATION ---
+# Every embedding in the app (Mongo vectors, Chroma, intent router) comes from this model.
+MODEL_NAME = 'all-MiniLM-L6-v2'
+
+# One instance per model name per process, loaded on first use (or by warm_up_models)
+_models: dict = {}
+_load_seconds: dict = {}
+_lock = threading.Lock()
+
+def get_model(name: str = MODEL_NAME):
+    """Shared SentenceTransformer; the first caller pays the ~80MB load, everyone else reuses it"""
+    model = _models.get(name)
+    if model is not None: return model
+    with _lock:
+        if name not in _models:
+            # Imported here so importing the app doesn't pull in torch
+            from sentence_transformers import SentenceTransformer
+            print(f"🧠 Loading Embedding Model ({name})...")
+            start = time.perf_counter()
+            _models[name] = SentenceTransformer(name)
+            _load_seconds[name] = round(time.perf_counter() - start, 2)
+            print(f"✅ Embedding Model Loaded in {_load_seconds[name]}s")
+    return _models[name]
+
+async def warm_up_models():
+    """Startup hook: loads the model off the event loop before the first request needs it"""
+    await asyncio.to_thread(get_model)
+
+def get_model_metrics() -> dict:
+    return {
+        name: {"loaded": name in _models, "load_seconds": _load_seconds.get(name)}
+        for name in {MODEL_NAME, *_models}
+    }
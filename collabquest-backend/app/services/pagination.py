@@ -0,0 +1,53 @@
+import base64
+import heapq
+from typing import Optional
+from bson import ObjectId
+from fastapi import HTTPException
+
+# --- CONFIGURATION ---
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+# Ranked lists are ordered by (score desc, id asc). A cursor is the (score, id)
+# of the last item returned, so the next page is "everything ranked after it";
+# it stays valid while documents are added or removed between requests.
+
+def encode_cursor(score: float, doc_id: str) -> str:
+    return base64.urlsafe_b64encode(f"{score!r}|{doc_id}".encode()).decode()
+
+def decode_cursor(cursor: Optional[str]) -> Optional[tuple]:
+    if not cursor: return None
+    try:
+        score, doc_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+        return float(score), doc_id
+    except Exception:
+        raise HTTPException(400, detail="Invalid cursor")
+
+def top_k_page(scored: list[tuple[str, float]], limit: int, cursor: Optional[str] = None) -> tuple[list, Optional[str]]:
+    """
+    One page of (id, score) pairs, best first, after `cursor`.
+    Uses a bounded heap (O(n log k)) instead of sorting every candidate.
+    Returns (page, next cursor or None when this is the last page).
+    """
+    after = decode_cursor(cursor)
+    keyed = ((-score, doc_id) for doc_id, score in scored)
+    if after:
+        bound = (-after[0], after[1])
+        keyed = (k for k in keyed if k > bound)
+    best = heapq.nsmallest(limit + 1, keyed)
+    page = [(doc_id, -neg) for neg, doc_id in best[:limit]]
+    next_cursor = encode_cursor(page[-1][1], page[-1][0]) if len(best) > limit else None
+    return page, next_cursor
+
+async def score_shortlist(model, query: dict, ids: list, view, score) -> tuple[dict, list]:
+    """
+    Loads the shortlisted documents that still match `query` and scores them in one
+    batch. The shortlist is bounded (ANN_CANDIDATES), so a page costs the same however
+    large the collection is, and paging deeper is mostly score_cache reads.
+    score: async (docs) -> scores. Returns ({id: doc}, [(id, score)]).
+    """
+    object_ids = [ObjectId(i) for i in ids if ObjectId.is_valid(i)]
+    if not object_ids: return {}, []
+    docs = await model.find({"$and": [query, {"_id": {"$in": object_ids}}]}).project(view).to_list()
+    scores = await score(docs) if docs else []
+    return {str(d.id): d for d in docs}, [(str(d.id), value) for d, value in zip(docs, scores)]
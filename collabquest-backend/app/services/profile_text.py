@@ -0,0 +1,77 @@
+import asyncio
+import hashlib
+from beanie import PydanticObjectId
+from app.services.model_registry import MODEL_NAME
+from app.services.embedding_service import embed_texts
+from app.services.reduced_embeddings import reduced_fields
+from app.services.embedding_store import store_for
+
+# The one place User/Team embedding text is built. Vectors live in embedding_store;
+# the Mongo document carries the hash of the text the vector was built from (also
+# the store row's version) and the model that encoded it, so a save only reaches
+# the model when the relevant content (or the model) changed.
+
+# --- CANONICAL TEXT ---
+def user_embedding_text(user) -> str:
+    skills = ' '.join(s.name if hasattr(s, "name") else str(s) for s in user.skills)
+    parts = [f"Developer with skills: {skills}.", f"Interests: {' '.join(user.interests)}.", f"About: {user.about or ''}"]
+    education = ' '.join(f"{e.course} at {e.institute}" for e in getattr(user, "education", []) if e.is_visible)
+    if education: parts.append(f"| Education: {education}.")
+    achievements = ' '.join(a.title for a in getattr(user, "achievements", []))
+    if achievements: parts.append(f"| Achievements: {achievements}.")
+    return ' '.join(parts)
+
+def team_embedding_text(team) -> str:
+    # Active roles win over the original wishlist; they are repeated to weight them in the vector
+    skills = ' '.join(team.active_needed_skills) if team.active_needed_skills else ' '.join(team.needed_skills)
+    return f"Project: {team.name}. Description: {team.description}. Looking for teammates with skills: {skills}. Open Roles: {skills}"
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+# --- REFRESH ---
+def is_stale(doc, text: str) -> bool:
+    return (
+        store_for(doc).version(doc.id) != doc.embedding_hash
+        or doc.embedding_hash != content_hash(text)
+        or doc.embedding_model != MODEL_NAME
+    )
+
+async def refresh_embeddings(docs: list, build) -> list:
+    """
+    Re-embeds only the documents whose canonical text or model changed (in one batch).
+    Writes the vectors to the store, updates embedding_hash/embedding_model in place
+    and returns the documents that changed; saving them is up to the caller.
+    """
+    texts = [build(d) for d in docs]
+    stale = [(d, t) for d, t in zip(docs, texts) if is_stale(d, t)]
+    if not stale: return []
+    vectors = await embed_texts([t for _, t in stale])
+    writes: dict = {}
+    for (doc, text), vector in zip(stale, vectors):
+        # Store rows are keyed by id, so a document embedded before its insert gets its id now
+        if doc.id is None: doc.id = PydanticObjectId()
+        doc.embedding_hash = content_hash(text)
+        doc.embedding_model = MODEL_NAME
+        writes.setdefault(store_for(doc), []).append((doc.id, vector, doc.embedding_hash))
+        # Compact code travels with the vector; stale codes are dropped when the mode is off
+        codes = reduced_fields(doc, vector)
+        doc.embedding_int8 = codes.get("embedding_int8")
+        doc.reduced_version = codes.get("reduced_version")
+    # One store transaction per batch; its SQLite commit, file growth and flush run off the loop
+    for store, items in writes.items():
+        await asyncio.to_thread(store.put_many, items)
+    return [d for d, _ in stale]
+
+async def refresh_user_embedding(user) -> bool:
+    return bool(await refresh_embeddings([user], user_embedding_text))
+
+async def refresh_team_embedding(team) -> bool:
+    return bool(await refresh_embeddings([team], team_embedding_text))
+
+def embedding_fields(doc) -> dict:
+    """$set payload for persisting a refreshed embedding's version without a full save"""
+    return {
+        "embedding_hash": doc.embedding_hash, "embedding_model": doc.embedding_model,
+        "embedding_int8": doc.embedding_int8, "reduced_version": doc.reduced_version,
+    }
@@ -0,0 +1,28 @@
+from functools import lru_cache
+from typing import Optional
+from fastapi import HTTPException
+from pydantic import BaseModel, create_model
+
+def parse_fields(fields: Optional[str]) -> tuple:
+    """`?fields=name,members` -> ("members", "name")"""
+    if not fields: return ()
+    return tuple(sorted({f.strip() for f in fields.split(",") if f.strip()}))
+
+@lru_cache(maxsize=128)
+def _narrow(model: type[BaseModel], wanted: tuple) -> type[BaseModel]:
+    unknown = set(wanted) - set(model.model_fields)
+    if unknown:
+        raise HTTPException(400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    keep = {name: (f.annotation, f) for name, f in model.model_fields.items() if name == "id" or name in wanted}
+    return create_model(f"{model.__name__}Fields", __config__=model.model_config, **keep)
+
+def sparse_model(model: type[BaseModel], fields: Optional[str]) -> type[BaseModel]:
+    """Sparse fieldset: narrows a projection model to the requested fields (id is always kept)"""
+    wanted = parse_fields(fields)
+    return _narrow(model, wanted) if wanted else model
+
+def card_dict(doc, model: type[BaseModel], fields: Optional[str] = None) -> dict:
+    """JSON-ready dict of a loaded document/view, limited to a card model's fields"""
+    card = sparse_model(model, fields)
+    include = set(card.model_fields)
+    return doc.model_dump(include=include, mode="json", by_alias=True)
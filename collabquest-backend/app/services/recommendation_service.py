@@ -1,15 +1,31 @@
 import os
+import asyncio
+from datetime import datetime
 import chromadb
 from langchain_chroma import Chroma
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_core.documents import Document
-from app.models import User, Team
+from langchain_core.embeddings import Embeddings
+from app.models import User, Team, TeamMatchView, UserMatchView
+from app.services.vector_store import generate_embedding, generate_embeddings
+from app.services.profile_text import user_embedding_text, team_embedding_text, content_hash, is_stale
+from app.services.embedding_store import stores
 
 # --- CONFIGURATION ---
 CHROMA_PATH = os.path.join(os.getcwd(), "chroma_db_matching")
-EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+COLLECTION_NAME = "sc_portfolio"
+UPSERT_BATCH = 500
 
-embedding_function = HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL)
+class SharedEmbeddings(Embeddings):
+    """
+    LangChain adapter over the shared model in model_registry (and the embedding cache),
+    so Chroma does not load a second copy of MiniLM through HuggingFaceEmbeddings.
+    """
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return generate_embeddings(texts)
+
+    def embed_query(self, text: str) -> list[float]:
+        return generate_embedding(text)
+
+embedding_function = SharedEmbeddings()
 
 _global_client = None
 
@@ -23,87 +39,202 @@ def get_chroma_client():
         _global_client = chromadb.PersistentClient(path=CHROMA_PATH)
     return _global_client
 
+def get_collection():
+    return get_chroma_client().get_or_create_collection(COLLECTION_NAME)
+
+# Readiness of the background sync (see /system/metrics)
+chroma_status = {"ready": False, "running": False, "upserted": 0, "deleted": 0, "unchanged": 0, "pending": 0, "last_synced_at": None}
+_sync_lock = asyncio.Lock()
+
+def _user_page_content(user) -> str:
+    return f"Developer: {user.username}. {user_embedding_text(user)}"
+
+# kind -> (text the stored embedding is built from, page content stored in Chroma)
+CHROMA_KINDS = {
+    "team": (team_embedding_text, team_embedding_text),
+    "user": (user_embedding_text, _user_page_content),
+}
+
+def _chroma_entry(kind: str, doc) -> tuple | None:
+    """
+    (Chroma id, (content hash, vector, page content, metadata)) for one User/Team, or None
+    while the store has no current vector for it (the backfill embeds it and calls the hook).
+    """
+    build, page_content = CHROMA_KINDS[kind]
+    vector = stores[kind].get(doc.id)
+    if vector is None or is_stale(doc, build(doc)): return None
+    text = page_content(doc)
+    return f"{kind}:{doc.id}", (
+        content_hash(f"{text}\x00{doc.embedding_model}"),
+        vector.tolist(),
+        text,
+        {"type": kind, "id": str(doc.id), "name": getattr(doc, "name", None) or getattr(doc, "username", "")},
+    )
+
+def _upsert_entries(collection, entries: dict, ids: list):
+    now = datetime.now().isoformat()
+    for start in range(0, len(ids), UPSERT_BATCH):
+        batch = ids[start:start + UPSERT_BATCH]
+        collection.upsert(
+            ids=batch,
+            embeddings=[entries[i][1] for i in batch],
+            documents=[entries[i][2] for i in batch],
+            metadatas=[{**entries[i][3], "content_hash": entries[i][0], "updated_at": now} for i in batch],
+        )
+
+def _apply_changes(entries: dict, pending: set) -> dict:
+    """
+    Upserts only new/changed documents and deletes the ones gone from Mongo (blocking, run in a thread).
+    pending: ids still waiting for a vector; their current Chroma entry is kept.
+    """
+    collection = get_collection()
+    existing = collection.get(include=["metadatas"])
+    stored = {i: (m or {}).get("content_hash") for i, m in zip(existing["ids"], existing["metadatas"])}
+
+    changed = [i for i, entry in entries.items() if stored.get(i) != entry[0]]
+    removed = [i for i in stored if i not in entries and i not in pending]
+    _upsert_entries(collection, entries, changed)
+    if removed:
+        collection.delete(ids=removed)
+    return {"upserted": len(changed), "deleted": len(removed), "unchanged": len(entries) - len(changed)}
+
 async def sync_data_to_chroma():
     """
-    Reads ALL Users and Teams from MongoDB and saves them into ChromaDB.
+    Incrementally mirrors Users and Teams from MongoDB into ChromaDB.
+    Each Chroma entry carries the hash of its content; only new or changed profiles are
+    upserted and deleted ones are removed. Vectors are only ever read from the embedding
+    store: profiles without a current one are skipped until the backfill embeds them.
     Uses the SINGLETON client to avoid WinError 32 (File Locking).
     """
-    print("🔄 Syncing MongoDB to Vector Database...")
-    
-    docs_to_save = []
-
-    # 1. PROCESS TEAMS
-    teams = await Team.find_all().to_list()
-    for team in teams:
-        content = f"Project: {team.name}. Description: {team.description}. Looking for Skills: {', '.join(team.needed_skills)}."
-        doc = Document(
-            page_content=content,
-            metadata={"type": "team", "id": str(team.id), "name": team.name}
-        )
-        docs_to_save.append(doc)
-
-    # 2. PROCESS USERS
-    users = await User.find_all().to_list()
-    for user in users:
-        skill_names = [s.name if hasattr(s, 'name') else str(s) for s in user.skills]
-        content = f"Developer: {user.username}. Bio: {user.about}. Skills: {', '.join(skill_names)}."
-        doc = Document(
-            page_content=content,
-            metadata={"type": "user", "id": str(user.id), "name": user.username}
-        )
-        docs_to_save.append(doc)
-
-    # 3. SAVE TO CHROMA (The Fix)
-    if docs_to_save:
-        # 👇 USE THE SHARED CLIENT (Fixes WinError 32)
-        client = get_chroma_client()
-        
-        # Clean specific collection instead of deleting the whole folder
+    async with _sync_lock:
+        chroma_status["running"] = True
+        print("🔄 Syncing MongoDB to Vector Database...")
         try:
-            client.delete_collection("sc_portfolio") 
-        except Exception:
-            pass # Collection might not exist yet, which is fine
-            
-        # Initialize LangChain wrapper using the SHARED client
-        db = Chroma(
-            client=client,
-            collection_name="sc_portfolio",
+            teams = await Team.find_all().project(TeamMatchView).to_list()
+            users = await User.find_all().project(UserMatchView).to_list()
+
+            entries, pending = {}, set()
+            for kind, docs in (("team", teams), ("user", users)):
+                for doc in docs:
+                    entry = _chroma_entry(kind, doc)
+                    if entry is None: pending.add(f"{kind}:{doc.id}")
+                    else: entries[entry[0]] = entry[1]
+
+            result = await asyncio.to_thread(_apply_changes, entries, pending)
+            result["pending"] = len(pending)
+            chroma_status.update(result, ready=True, last_synced_at=datetime.now().isoformat())
+            print(f"✅ Synced AI Matcher: {result['upserted']} upserted, {result['deleted']} deleted, {result['unchanged']} unchanged.")
+        except Exception as e:
+            print(f"❌ Chroma sync failed: {e}")
+        finally:
+            chroma_status["running"] = False
+
+# --- WRITE-THROUGH ---
+# index_hooks pushes every User/Team save or delete here, so search_vectors stays fresh
+# between boots. The queue is bounded; if it ever overflows, one incremental sync
+# catches up instead of silently losing writes.
+WRITE_QUEUE_SIZE = 1000
+WRITE_RETRIES = 3
+
+_write_queue: asyncio.Queue | None = None
+_writer_task: asyncio.Task | None = None
+_resync_needed = False
+writer_stats = {"queued": 0, "written": 0, "retried": 0, "failed": 0, "dropped": 0, "deferred": 0}
+
+def _ensure_writer() -> asyncio.Queue:
+    global _write_queue, _writer_task
+    if _writer_task is None or _writer_task.done():
+        _write_queue = asyncio.Queue(maxsize=WRITE_QUEUE_SIZE)
+        _writer_task = asyncio.create_task(_writer(_write_queue))
+    return _write_queue
+
+def _enqueue(op: tuple):
+    global _resync_needed
+    try:
+        _ensure_writer().put_nowait(op)
+        writer_stats["queued"] += 1
+    except asyncio.QueueFull:
+        writer_stats["dropped"] += 1
+        _resync_needed = True
+    except RuntimeError:
+        pass # no running loop (scripts); the next sync picks the change up
+
+def queue_upsert(kind: str, doc):
+    """Snapshots the document now; the Chroma write happens in the background"""
+    entry = _chroma_entry(kind, doc)
+    if entry is None:
+        # No current vector yet: the backfill embeds it and reports the change again
+        writer_stats["deferred"] += 1
+        return
+    _enqueue(("upsert", *entry))
+
+def queue_delete(kind: str, doc_id: str):
+    _enqueue(("delete", f"{kind}:{doc_id}", None))
+
+async def _write(op: str, chroma_id: str, entry):
+    if op == "delete":
+        await asyncio.to_thread(get_collection().delete, ids=[chroma_id])
+        return
+    await asyncio.to_thread(_upsert_entries, get_collection(), {chroma_id: entry}, [chroma_id])
+
+async def _writer(queue: asyncio.Queue):
+    global _resync_needed
+    while True:
+        op = await queue.get()
+        for attempt in range(1, WRITE_RETRIES + 1):
+            try:
+                await _write(*op)
+                writer_stats["written"] += 1
+                break
+            except Exception as e:
+                if attempt == WRITE_RETRIES:
+                    writer_stats["failed"] += 1
+                    _resync_needed = True
+                    print(f"❌ Chroma write failed for {op[1]}: {e}")
+                else:
+                    writer_stats["retried"] += 1
+                    await asyncio.sleep(0.5 * 2 ** attempt)
+
+        if queue.empty() and _resync_needed:
+            _resync_needed = False
+            await sync_data_to_chroma()
+
+_vector_store = None
+
+def get_vector_store():
+    """
+    One LangChain wrapper over the shared client/collection, built on first use.
+    We point to the same "sc_portfolio" collection used in sync_data_to_chroma.
+    """
+    global _vector_store
+    if _vector_store is None:
+        _vector_store = Chroma(
+            client=get_chroma_client(),
+            collection_name=COLLECTION_NAME,
             embedding_function=embedding_function
         )
-        
-        # Add the new documents
-        db.add_documents(docs_to_save)
-        
-        print(f"✅ Synced {len(docs_to_save)} profiles to the AI Matcher.")
-    else:
-        print("⚠️ No data to sync.")
+    return _vector_store
+
 # 🔥 FIX: Removed 'async' to allow usage with asyncio.to_thread
 
-def search_vectors(query: str, filter_type: str = None):
+def search_vectors(query: str, filter_type: str = None, k: int = 5, offset: int = 0, min_score: float = 0.0) -> list[dict]:
     """
-    Searches ChromaDB for matches using the shared client.
-    filter_type: "team" (find projects) or "user" (find developers)
+    Searches ChromaDB, best match first.
+    filter_type: "team" (find projects) or "user" (find developers), applied inside Chroma
+    so all k results are of the requested type.
+    Returns [{"id", "type", "name", "score", "content"}] with score = relevance (0-1).
     """
-    # 👇 USE THE SHARED CLIENT (Fixes WinError 32)
-    client = get_chroma_client()
-    
-    # Initialize LangChain wrapper using the SHARED client
-    # We point to the same "sc_portfolio" collection used in sync_data_to_chroma
-    db = Chroma(
-        client=client,
-        collection_name="sc_portfolio",
-        embedding_function=embedding_function
-    )
-    
-    # Search for top 5 matches
-    results = db.similarity_search(query, k=5)
-    
+    where = {"type": filter_type} if filter_type else None
+    results = get_vector_store().similarity_search_with_relevance_scores(query, k=k + offset, filter=where)
+
     matches = []
-    for doc in results:
-        # Apply filter (if I only want Teams, ignore Users)
-        if filter_type and doc.metadata.get("type") != filter_type:
-            continue
-            
-        matches.append(doc.page_content)
-        
-    return matches
\ No newline at end of file
+    for doc, score in results[offset:]:
+        if score < min_score: continue
+        matches.append({
+            "id": doc.metadata.get("id"),
+            "type": doc.metadata.get("type"),
+            "name": doc.metadata.get("name"),
+            "score": round(float(score), 4),
+            "content": doc.page_content,
+        })
+    return matches
@@ -0,0 +1,149 @@
+import os
+import time
+import base64
+import hashlib
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# --- CONFIGURATION ---
+# Optional mode: REDUCED_EMBEDDINGS=true plus a projection fitted by reduce_embeddings.py.
+# Each User/Team document then also carries its embedding as REDUCED_DIM packed int8 codes
+# (96 bytes instead of 384 floats); matching and ANN scan the codes and re-score only the
+# best candidates on the full vector from embedding_store.
+REDUCED_MODE = os.getenv("REDUCED_EMBEDDINGS", "false").lower() == "true"
+REDUCED_DIM = int(os.getenv("REDUCED_DIM", "96"))
+PROJECTION_PATH = os.getenv("EMBEDDING_PROJECTION_PATH", "embedding_projection.npz")
+FIT_SAMPLE = 50000
+RERANK_FACTOR = 4 # compact candidates re-scored exactly per wanted result
+RERANK_TOP = 100  # matching: how many of the best compact scores are re-scored exactly
+
+class Reducer:
+    """
+    Uncentered PCA (top right singular vectors of the unit embeddings, which best
+    preserve their dot products) followed by per-dimension symmetric int8 quantization.
+    """
+
+    def __init__(self, components: np.ndarray, scales: np.ndarray):
+        self.components = components.astype(np.float32) # (D, d)
+        self.scales = scales.astype(np.float32)         # (d,)
+        self.dim = self.components.shape[1]
+        self.version = hashlib.sha256(self.components.tobytes() + self.scales.tobytes()).hexdigest()[:12]
+
+    @classmethod
+    def fit(cls, matrix: np.ndarray, dim: int = REDUCED_DIM) -> "Reducer":
+        unit = _normalize_rows(matrix)
+        if len(unit) > FIT_SAMPLE:
+            unit = unit[np.random.default_rng(0).choice(len(unit), FIT_SAMPLE, replace=False)]
+        _, vectors = np.linalg.eigh(unit.T @ unit)
+        components = vectors[:, ::-1][:, :dim]
+        projected = unit @ components
+        scales = np.maximum(np.quantile(np.abs(projected), 0.999, axis=0), 1e-6) / 127
+        return cls(components, scales)
+
+    # --- CODES ---
+    def encode(self, matrix: np.ndarray) -> np.ndarray:
+        """(N, D) embeddings -> (N, d) int8 codes"""
+        projected = _normalize_rows(matrix) @ self.components
+        return np.clip(np.rint(projected / self.scales), -127, 127).astype(np.int8)
+
+    def pack_code(self, code: np.ndarray) -> str:
+        """Packed int8 code, base64 so it survives JSON responses of full documents"""
+        return base64.b64encode(code.tobytes()).decode()
+
+    def pack(self, embedding: list) -> str:
+        return self.pack_code(self.encode(np.asarray([embedding], dtype=np.float32))[0])
+
+    def unpack(self, packed: list) -> np.ndarray:
+        raw = b"".join(base64.b64decode(p) for p in packed)
+        return np.frombuffer(raw, dtype=np.int8).reshape(len(packed), self.dim)
+
+    def code_version(self, embedding_hash: str | None) -> str:
+        """Codes are valid for one projection and one embedding (stale codes are ignored)"""
+        return f"{self.version}:{embedding_hash}"
+
+    def has_code(self, doc) -> bool:
+        return bool(getattr(doc, "embedding_int8", None)) and getattr(doc, "reduced_version", None) == self.code_version(doc.embedding_hash)
+
+    # --- SCORING ---
+    def query(self, vector) -> np.ndarray:
+        """Projects a query so that codes @ query ~= cosine(query, original)"""
+        q = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(q)
+        if norm > 0: q = q / norm
+        return (q @ self.components) * self.scales
+
+    def scores(self, vector, codes: np.ndarray) -> np.ndarray:
+        return codes.astype(np.float32) @ self.query(vector)
+
+    # --- PERSISTENCE ---
+    def save(self, path: str = PROJECTION_PATH):
+        np.savez(path, components=self.components, scales=self.scales)
+
+    @classmethod
+    def load(cls, path: str = PROJECTION_PATH) -> "Reducer":
+        data = np.load(path)
+        return cls(data["components"], data["scales"])
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+
+reducer: Reducer | None = None
+
+def load_reducer():
+    """Startup hook: enables the compact path when configured and a projection exists"""
+    global reducer
+    if not REDUCED_MODE: return
+    if not os.path.exists(PROJECTION_PATH):
+        print(f"⚠️ REDUCED_EMBEDDINGS is on but {PROJECTION_PATH} is missing; run reduce_embeddings.py")
+        return
+    reducer = Reducer.load(PROJECTION_PATH)
+    print(f"✅ Reduced embeddings: {reducer.components.shape[0]} -> {reducer.dim} dims (int8), projection {reducer.version}")
+
+def reduced_active() -> bool:
+    return reducer is not None
+
+def reduced_fields(doc, vector) -> dict:
+    """$set payload for a document's compact code (empty when the mode is off)"""
+    if reducer is None or vector is None or not len(vector): return {}
+    return {"embedding_int8": reducer.pack(vector), "reduced_version": reducer.code_version(doc.embedding_hash)}
+
+# --- BENCHMARK ---
+def recall_benchmark(model: Reducer, corpus: np.ndarray, queries: np.ndarray, k: int = 10, rerank_factor: int = RERANK_FACTOR) -> dict:
+    """
+    Recall@k of compact search against exact full-precision search over the same corpus,
+    with and without the exact re-rank of the k * rerank_factor best compact candidates.
+    """
+    full = _normalize_rows(corpus)
+    codes = model.encode(corpus)
+    k = min(k, len(corpus))
+    shortlist_size = min(len(corpus), k * rerank_factor)
+    recall_compact, recall_rerank, errors = [], [], []
+    full_time = compact_time = 0.0
+    for q in queries:
+        start = time.perf_counter()
+        exact = full @ (q / max(np.linalg.norm(q), 1e-12))
+        truth = set(np.argpartition(-exact, k - 1)[:k].tolist())
+        full_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        approx = model.scores(q, codes)
+        shortlist = np.argpartition(-approx, shortlist_size - 1)[:shortlist_size]
+        reranked = shortlist[np.argsort(-(full[shortlist] @ (q / max(np.linalg.norm(q), 1e-12))))[:k]]
+        compact_time += time.perf_counter() - start
+
+        recall_compact.append(len(truth & set(np.argpartition(-approx, k - 1)[:k].tolist())) / k)
+        recall_rerank.append(len(truth & set(reranked.tolist())) / k)
+        errors.append(float(np.mean(np.abs(approx - exact))))
+    return {
+        "corpus": len(corpus), "queries": len(queries), "k": k, "dims": f"{corpus.shape[1]} -> {model.dim} (int8)",
+        "bytes_per_vector": {"full_float32": corpus.shape[1] * 4, "compact_int8": model.dim},
+        "recall_at_k_compact": round(float(np.mean(recall_compact)), 4),
+        "recall_at_k_reranked": round(float(np.mean(recall_rerank)), 4),
+        "mean_abs_cosine_error": round(float(np.mean(errors)), 4),
+        "ms_per_query_full": round(full_time / len(queries) * 1000, 3),
+        "ms_per_query_compact": round(compact_time / len(queries) * 1000, 3),
+    }
@@ -0,0 +1,86 @@
+from collections import OrderedDict
+from app.services.availability import get_bits
+
+# --- CONFIGURATION ---
+MAX_ENTRIES = 100000
+
+def doc_version(doc) -> int:
+    """
+    Changes whenever anything a match score depends on changes: the embedding
+    (profile text / skills / model), the availability (own schedule, or the
+    team's member profile, which also moves on membership changes) or the
+    collaborative latent factors.
+    """
+    if hasattr(doc, "availability_profile"): availability = (doc.availability_profile, getattr(doc, "availability_members", None))
+    else: availability = get_bits(doc)
+    return hash((
+        getattr(doc, "embedding_hash", None), getattr(doc, "embedding_model", None),
+        availability, tuple(getattr(doc, "cf_vector", None) or ()),
+    ))
+
+class ScoreCache:
+    """
+    Bounded LRU of pair scores keyed by (kind, id + version of both sides).
+    A profile/availability/membership change yields a new version, so stale
+    scores are never served; index_hooks also drops them eagerly.
+    """
+
+    def __init__(self, max_entries: int = MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.entries: OrderedDict = OrderedDict()
+        self.by_doc: dict = {}   # doc id -> keys that mention it
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    def key(self, kind: str, a, b) -> tuple:
+        return (kind, str(a.id), doc_version(a), str(b.id), doc_version(b))
+
+    def get_many(self, keys: list) -> list:
+        results = []
+        for key in keys:
+            score = self.entries.get(key)
+            if score is None:
+                self.stats["misses"] += 1
+            else:
+                self.entries.move_to_end(key)
+                self.stats["hits"] += 1
+            results.append(score)
+        return results
+
+    def put_many(self, keys: list, scores: list):
+        for key, score in zip(keys, scores):
+            self.entries[key] = score
+            self.entries.move_to_end(key)
+            for doc_id in (key[1], key[3]):
+                self.by_doc.setdefault(doc_id, set()).add(key)
+        while len(self.entries) > self.max_entries:
+            old_key, _ = self.entries.popitem(last=False)
+            self._forget(old_key)
+            self.stats["evictions"] += 1
+
+    def _forget(self, key: tuple):
+        for doc_id in (key[1], key[3]):
+            keys = self.by_doc.get(doc_id)
+            if keys is None: continue
+            keys.discard(key)
+            if not keys: del self.by_doc[doc_id]
+
+    def invalidate(self, doc_id: str):
+        """Drops every cached score involving this User/Team"""
+        for key in self.by_doc.pop(doc_id, set()):
+            if self.entries.pop(key, None) is not None:
+                self.stats["invalidations"] += 1
+            other = key[3] if key[1] == doc_id else key[1]
+            keys = self.by_doc.get(other)
+            if keys is not None:
+                keys.discard(key)
+                if not keys: del self.by_doc[other]
+
+    def get_metrics(self) -> dict:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "entries": len(self.entries),
+            "hit_rate": round(self.stats["hits"] / lookups, 4) if lookups else 0,
+        }
+
+score_cache = ScoreCache()
@@ -0,0 +1,26 @@
+from app.models import User, Team
+
+# skill_tags / interest_tags are lowercased, de-duplicated copies of the display
+# values, kept so matching filters run as indexed Mongo predicates ($in on a
+# multikey index) instead of case-folding every document in Python.
+
+def _lowered(field: str, key: str = None) -> dict:
+    """Aggregation expression: lowercase every element (or element.key) of an array field"""
+    value = f"$$v.{key}" if key else "$$v"
+    return {"$map": {"input": {"$ifNull": [f"${field}", []]}, "as": "v", "in": {"$toLower": value}}}
+
+async def backfill_tags():
+    """Fills the tag arrays of documents saved before they existed (one update per collection)"""
+    teams = await Team.get_pymongo_collection().update_many(
+        {"skill_tags": {"$exists": False}},
+        [{"$set": {"skill_tags": {"$setUnion": [_lowered("needed_skills"), _lowered("active_needed_skills")]}}}]
+    )
+    users = await User.get_pymongo_collection().update_many(
+        {"$or": [{"skill_tags": {"$exists": False}}, {"interest_tags": {"$exists": False}}]},
+        [{"$set": {
+            "skill_tags": {"$setUnion": [_lowered("skills", "name")]},
+            "interest_tags": {"$setUnion": [_lowered("interests")]},
+        }}]
+    )
+    if teams.modified_count or users.modified_count:
+        print(f"🏷️ Backfilled search tags for {teams.modified_count} teams and {users.modified_count} users")
@@ -0,0 +1,59 @@
+from typing import List
+from bson import ObjectId
+from app.models import User, Team
+from app.services.availability import get_bits, profile_from_bits, profile_add, profile_remove
+
+# Keeps Team.availability_profile (per-slot count of free members) and
+# Team.availability_members (members who saved a schedule) in step with membership
+# and schedule changes, so matching never has to load member documents.
+# These helpers only mutate the team; callers save it alongside their own changes.
+
+def has_schedule(user) -> int:
+    """1 when the user saved a schedule, even one with every day off (matching scores those as no overlap)"""
+    return 1 if user.availability else 0
+
+async def rebuild_team_availability(team: Team):
+    """Recomputes the profile from scratch (legacy teams / repair)"""
+    ids = [ObjectId(m) for m in team.members if ObjectId.is_valid(m)]
+    members = await User.find({"_id": {"$in": ids}}).to_list() if ids else []
+    team.availability_profile = profile_from_bits([get_bits(m) for m in members])
+    team.availability_members = sum(has_schedule(m) for m in members)
+
+def _is_legacy(team: Team) -> bool:
+    return team.availability_profile is None or team.availability_members is None
+
+async def member_joined(team: Team, user: User):
+    if _is_legacy(team):
+        await rebuild_team_availability(team)
+    else:
+        team.availability_profile = profile_add(team.availability_profile, get_bits(user))
+        team.availability_members += has_schedule(user)
+
+async def member_left(team: Team, user: User):
+    if _is_legacy(team):
+        await rebuild_team_availability(team)
+    elif user:
+        team.availability_profile = profile_remove(team.availability_profile, get_bits(user))
+        team.availability_members = max(0, team.availability_members - has_schedule(user))
+
+async def member_schedule_changed(user: User, old_bits: str, had_schedule: int):
+    """Swaps a member's old schedule for the new one in every team they belong to"""
+    new_bits = get_bits(user)
+    if old_bits == new_bits and had_schedule == has_schedule(user): return
+    teams = await Team.find(Team.members == str(user.id)).to_list()
+    for team in teams:
+        if _is_legacy(team):
+            await rebuild_team_availability(team)
+        else:
+            team.availability_profile = profile_add(profile_remove(team.availability_profile, old_bits), new_bits)
+            team.availability_members = max(0, team.availability_members - had_schedule + has_schedule(user))
+        await team.save()
+
+async def backfill_team_availability():
+    """Builds the profile (and member count) for teams created before they existed"""
+    teams: List[Team] = await Team.find({"$or": [{"availability_profile": None}, {"availability_members": None}]}).to_list()
+    for team in teams:
+        await rebuild_team_availability(team)
+        await team.save()
+    if teams:
+        print(f"🗓️ Built availability profiles for {len(teams)} teams")
@@ -0,0 +1,105 @@
+import heapq
+import math
+import re
+import time
+from collections import Counter
+from app.models import Team, TeamCard
+from app.services.directory_index import NgramIndex
+
+# --- CONFIGURATION ---
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Skills are what people search for ("Solidity NFT"), so they count more than prose
+SKILL_WEIGHT = 3
+NAME_WEIGHT = 2
+
+# Keeps tech terms intact: c++, c#, node.js, next.js, ui/ux
+TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#./]*")
+
+def tokenize(text: str) -> list[str]:
+    return [t.rstrip("./") for t in TOKEN_RE.findall((text or "").lower()) if t.rstrip("./")]
+
+class BM25Index:
+    """
+    In-process inverted index with Okapi BM25 scoring, updated document by document.
+    A query only touches the postings of its own terms, never the whole collection.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.postings: dict = {}     # term -> {doc id: term frequency}
+        self.doc_terms: dict = {}    # doc id -> Counter of its terms
+        self.doc_lengths: dict = {}
+        self.total_length = 0
+        self.ready = False
+
+    def __len__(self):
+        return len(self.doc_terms)
+
+    def build(self, items: list):
+        """items: [(doc id, tokens)]"""
+        self.postings, self.doc_terms, self.doc_lengths, self.total_length = {}, {}, {}, 0
+        for doc_id, tokens in items:
+            self.upsert(doc_id, tokens)
+        self.ready = True
+
+    def upsert(self, doc_id: str, tokens: list[str]):
+        self.remove(doc_id)
+        terms = Counter(tokens)
+        self.doc_terms[doc_id] = terms
+        self.doc_lengths[doc_id] = len(tokens)
+        self.total_length += len(tokens)
+        for term, tf in terms.items():
+            self.postings.setdefault(term, {})[doc_id] = tf
+
+    def remove(self, doc_id: str):
+        terms = self.doc_terms.pop(doc_id, None)
+        if terms is None: return
+        self.total_length -= self.doc_lengths.pop(doc_id)
+        for term in terms:
+            docs = self.postings.get(term)
+            if docs is None: continue
+            docs.pop(doc_id, None)
+            if not docs: del self.postings[term]
+
+    def search(self, query: str, k: int) -> list:
+        """[(doc id, bm25 score)] best first; only documents sharing a term with the query"""
+        n = len(self.doc_terms)
+        if n == 0: return []
+        avg_length = self.total_length / n
+        scores: dict = {}
+        for term in set(tokenize(query)):
+            docs = self.postings.get(term)
+            if not docs: continue
+            idf = math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            for doc_id, tf in docs.items():
+                norm = tf + BM25_K1 * (1 - BM25_B + BM25_B * self.doc_lengths[doc_id] / avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (BM25_K1 + 1) / norm
+        return sorted(scores.items(), key=lambda x: x[1], reverse=True)[:k]
+
+team_text_index = BM25Index("teams")
+# Team names, for the substring matching ?search= always did ("maze sol"), served from n-gram postings
+team_names = NgramIndex()
+
+def name_matches(query: str, k: int) -> list[str]:
+    """Ids of teams whose name contains the query, prefix matches and shorter names first"""
+    needle = (query or "").lower().strip()
+    if not needle: return []
+    hits = []
+    for doc_id in team_names.search(needle):
+        name = team_names.get(doc_id)[0]
+        hits.append((name.find(needle) != 0, len(name), doc_id))
+    return [doc_id for _, _, doc_id in heapq.nsmallest(k, hits)]
+
+def team_tokens(team) -> list[str]:
+    skills = tokenize(' '.join(team.needed_skills + team.active_needed_skills))
+    return tokenize(team.name) * NAME_WEIGHT + tokenize(team.description) + skills * SKILL_WEIGHT
+
+async def build_text_index():
+    start = time.perf_counter()
+    teams = await Team.find_all().project(TeamCard).to_list()
+    team_text_index.build([(str(t.id), team_tokens(t)) for t in teams])
+    team_names.clear()
+    for t in teams:
+        team_names.upsert(str(t.id), t.name)
+    print(f"✅ Keyword index ready ({len(team_text_index)} teams) in {time.perf_counter() - start:.2f}s")
@@ -1,20 +1,41 @@
-from sentence_transformers import SentenceTransformer
 import numpy as np
+from app.services.embedding_cache import EmbeddingCache
+from app.services.model_registry import get_model, MODEL_NAME
 
-# Load model once (Singleton pattern)
-# This will download ~80MB on the first run automatically
-print("🧠 Loading Embedding Model...")
-model = SentenceTransformer('all-MiniLM-L6-v2')
-print("✅ Embedding Model Loaded")
+# The model itself lives in model_registry (shared, loaded lazily)
+EMBEDDING_DIM = 384
+
+# Repeated text (intent examples, anchors, project names) never reaches the model twice
+embedding_cache = EmbeddingCache(MODEL_NAME)
 
 def generate_embedding(text: str) -> list[float]:
     """Converts text into a 384-dimensional vector"""
     if not text or not text.strip():
-        return [0.0] * 384
+        return [0.0] * EMBEDDING_DIM
     
+    cached = embedding_cache.get(text)
+    if cached is not None:
+        return cached
+
     # Generate embedding
-    embedding = model.encode(text)
-    return embedding.tolist()
+    embedding = get_model().encode(text).tolist()
+    embedding_cache.put(text, embedding)
+    return embedding
+
+def generate_embeddings(texts: list[str]) -> list[list[float]]:
+    """Sync batch version of generate_embedding: cached texts skip the model, the rest share one call"""
+    results = embedding_cache.get_many(texts)
+    missing = [i for i, v in enumerate(results) if v is None and texts[i] and texts[i].strip()]
+    if missing:
+        vectors = encode_batch([texts[i] for i in missing])
+        embedding_cache.put_many([texts[i] for i in missing], vectors)
+        for i, vector in zip(missing, vectors):
+            results[i] = vector
+    return [v if v is not None else [0.0] * EMBEDDING_DIM for v in results]
+
+def encode_batch(texts: list[str]) -> list[list[float]]:
+    """Encodes many texts in one model call (used by the async embedding service)"""
+    return get_model().encode(texts, batch_size=len(texts)).tolist()
 
 def calculate_similarity(vec1: list[float], vec2: list[float]) -> float:
     """Calculates Cosine Similarity between two vectors (0 to 1)"""
@@ -0,0 +1,78 @@
+import asyncio
+import time
+from datetime import datetime
+from fastapi import HTTPException
+from app.services.team_availability import backfill_team_availability
+from app.services.tags import backfill_tags
+from app.services.embedding_store import import_inline_embeddings
+from app.services.reduced_embeddings import load_reducer
+from app.services.ann_index import build_ann_indexes
+from app.services.text_index import build_text_index
+from app.services.directory_index import build_directory_index
+from app.services.model_registry import warm_up_models
+from app.services.chatbot_services import compile_intent_routers
+from app.services.recommendation_service import sync_data_to_chroma
+from app.services.embedding_backfill import start_embedding_backfill
+
+# Startup work that scans collections or loads models runs here, off the boot path,
+# so the API accepts requests as soon as Mongo is connected. Until an index reports
+# ready its read paths fall back (full scans, plain Mongo queries); "ready" flips once
+# every step has finished. Matching cannot fall back on its data, though: before the
+# tag backfill skill_tags filters miss legacy documents, and before the inline import
+# every semantic score is 0. Those steps run first and /matches waits for them
+# (require_match_data).
+MATCH_DATA_STEPS = {"team_availability", "tags", "inline_embeddings"}
+STEPS = [
+    ("team_availability", backfill_team_availability),
+    ("tags", backfill_tags),
+    ("inline_embeddings", import_inline_embeddings),
+    ("reducer", load_reducer),
+    ("ann_indexes", build_ann_indexes),
+    ("text_index", build_text_index),
+    ("directory_index", build_directory_index),
+    ("models", warm_up_models),
+    ("intent_routers", compile_intent_routers),
+]
+
+warmup_status = {"ready": False, "match_data_ready": False, "running": False, "current": None, "step_seconds": {}, "failed": {}, "finished_at": None}
+_warmup_task: asyncio.Task | None = None
+_chroma_task: asyncio.Task | None = None
+
+async def _run():
+    global _chroma_task
+    warmup_status["running"] = True
+    try:
+        for name, step in STEPS:
+            warmup_status["current"] = name
+            start = time.perf_counter()
+            try:
+                result = step()
+                if asyncio.iscoroutine(result): await result
+            except Exception as e:
+                # One failed step must not keep the rest (or the backfill) from starting
+                warmup_status["failed"][name] = str(e)
+                print(f"❌ Startup step '{name}' failed: {e}")
+            warmup_status["step_seconds"][name] = round(time.perf_counter() - start, 2)
+            if MATCH_DATA_STEPS <= warmup_status["step_seconds"].keys():
+                warmup_status["match_data_ready"] = True
+
+        # Both read the vector store, so they start after the inline vectors are imported
+        start_embedding_backfill()
+        _chroma_task = asyncio.create_task(sync_data_to_chroma()) # incremental; see chroma_status
+        warmup_status["ready"] = True
+        warmup_status["finished_at"] = datetime.now().isoformat()
+        print("✅ Indexes and models ready")
+    finally:
+        warmup_status["running"] = False
+        warmup_status["current"] = None
+
+def start_warmup():
+    """Startup hook: launches the warm-up (one per process)"""
+    global _warmup_task
+    if _warmup_task is None or _warmup_task.done():
+        _warmup_task = asyncio.create_task(_run())
+
+def require_match_data():
+    """Route dependency: 503 until the backfills the matching queries read have run"""
+    if not warmup_status["match_data_ready"]:
+        raise HTTPException(503, detail="Matching is starting up, try again shortly", headers={"Retry-After": "5"})
@@ -0,0 +1,27 @@
+import asyncio
+import os
+import sys
+
+# Force UTF-8 encoding for stdout (Windows fix)
+if sys.stdout.encoding != 'utf-8':
+    sys.stdout.reconfigure(encoding='utf-8')
+from app.database import init_db
+from app.services.knn_graph import build_knn_graph
+
+# Windows Fix
+if os.name == "nt":
+    asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+
+# Nearest-neighbour graph behind /teams/{id}/similar and /users/{id}/similar:
+#   python build_knn.py          -> only rows whose embedding (or neighbours) changed
+#   python build_knn.py --force  -> every row
+async def build():
+    force = "--force" in sys.argv
+    print("🔌 Connecting to Database...")
+    await init_db()
+    await build_knn_graph("team", force)
+    await build_knn_graph("user", force)
+    print("✨ Done.")
+
+if __name__ == "__main__":
+    asyncio.run(build())
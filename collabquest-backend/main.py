@@ -6,10 +6,10 @@ from fastapi.staticfiles import StaticFiles
 from app.database import init_db
 
 from dotenv import load_dotenv
-from app.routes import auth_routes, user_routes, team_routes, match_routes, notification_routes, communication_routes, chat_routes, skill_routes, chatbot_routes
+from app.routes import auth_routes, user_routes, team_routes, match_routes, notification_routes, communication_routes, chat_routes, skill_routes, chatbot_routes, system_routes
 
-# 1. NEW IMPORT: Bring in the sync function
-from app.services.recommendation_service import sync_data_to_chroma
+from app.services.warmup import start_warmup
+from app.services.deck_service import start_deck_worker
 
 load_dotenv()
 
@@ -28,6 +28,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 os.makedirs("uploads", exist_ok=True)
@@ -36,9 +37,12 @@ app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
 @app.on_event("startup")
 async def start_db():
     await init_db()
-    # 2. NEW: Sync the Vector DB immediately on startup
-    await sync_data_to_chroma()
-    print("✅ Database Connected & Vector Search Ready")
+    # 1. Backfills, index builds and model loading run in the background (see warmup_status);
+    #    the Chroma sync and the embedding backfill start once the vector store is imported
+    start_warmup()
+    # 2. Keep precomputed swipe decks fresh as swipes, blocks and profiles change
+    start_deck_worker()
+    print("✅ Database Connected (indexes warming up in the background)")
 
 # --- REGISTER ROUTES ---
 app.include_router(auth_routes.router, prefix="/auth", tags=["Authentication"])
@@ -50,6 +54,7 @@ app.include_router(communication_routes.router, prefix="/communication", tags=["
 app.include_router(chat_routes.router, prefix="/chat", tags=["Chat"])
 app.include_router(skill_routes.router, prefix="/skills", tags=["Skills"])
 app.include_router(chatbot_routes.router, prefix="/chat/ai", tags=["Chatbot"])
+app.include_router(system_routes.router, prefix="/system", tags=["System"])
 
 # (Removed the old /rag-chat endpoint because /chat/ai handles everything now)
 
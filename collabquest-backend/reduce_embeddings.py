@@ -0,0 +1,68 @@
+import asyncio
+import os
+import sys
+import numpy as np
+from bson import ObjectId
+from pymongo import UpdateOne
+
+# Force UTF-8 encoding for stdout (Windows fix)
+if sys.stdout.encoding != 'utf-8':
+    sys.stdout.reconfigure(encoding='utf-8')
+from app.database import init_db
+from app.models import User, Team
+from app.services.reduced_embeddings import Reducer, recall_benchmark, PROJECTION_PATH, REDUCED_DIM
+from app.services.embedding_store import user_vectors, team_vectors
+
+# Windows Fix
+if os.name == "nt":
+    asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+
+# Reduced-embedding mode (REDUCED_EMBEDDINGS=true):
+#   python reduce_embeddings.py              -> fit the projection, store int8 codes, print the benchmark
+#   python reduce_embeddings.py --benchmark  -> only report recall of the current projection
+# Restart the API afterwards so it loads the new projection.
+CHUNK_SIZE = 1000
+BENCHMARK_QUERIES = 500
+
+async def store_codes(model, reducer: Reducer, ids: list, hashes: list, matrix: np.ndarray):
+    collection = model.get_pymongo_collection()
+    for start in range(0, len(ids), CHUNK_SIZE):
+        codes = reducer.encode(matrix[start:start + CHUNK_SIZE])
+        ops = [UpdateOne({"_id": ObjectId(doc_id)}, {"$set": {
+            "embedding_int8": reducer.pack_code(code), "reduced_version": reducer.code_version(doc_hash)
+        }}) for doc_id, doc_hash, code in zip(ids[start:start + CHUNK_SIZE], hashes[start:start + CHUNK_SIZE], codes)]
+        await collection.bulk_write(ops, ordered=False)
+        print(f"   {min(start + CHUNK_SIZE, len(ids))}/{len(ids)} {model.__name__} codes written")
+
+def report(name: str, result: dict):
+    print(f"📏 {name}:")
+    for key, value in result.items():
+        print(f"   {key}: {value}")
+
+async def main():
+    benchmark_only = "--benchmark" in sys.argv
+    print("🔌 Connecting to Database...")
+    await init_db()
+    user_ids, user_hashes, users = user_vectors.snapshot()
+    team_ids, team_hashes, teams = team_vectors.snapshot()
+    if not len(users) or not len(teams):
+        print("⚠️ Need user and team embeddings first (see reembed.py)")
+        return
+
+    if benchmark_only:
+        reducer = Reducer.load(PROJECTION_PATH)
+    else:
+        print(f"🧮 Fitting {REDUCED_DIM}-dim projection on {len(users) + len(teams)} embeddings...")
+        reducer = Reducer.fit(np.vstack([users, teams]))
+        reducer.save(PROJECTION_PATH)
+        await store_codes(User, reducer, user_ids, user_hashes, users)
+        await store_codes(Team, reducer, team_ids, team_hashes, teams)
+
+    rng = np.random.default_rng(0)
+    queries = users[rng.choice(len(users), min(BENCHMARK_QUERIES, len(users)), replace=False)]
+    report("Users -> Teams (Find Team)", recall_benchmark(reducer, teams, queries))
+    report("Users -> Users (Find Teammates)", recall_benchmark(reducer, users, queries))
+    print(f"✨ Done. Projection {reducer.version} saved to {PROJECTION_PATH}.")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,53 @@
+import asyncio
+import os
+import sys
+
+# Force UTF-8 encoding for stdout (Windows fix)
+if sys.stdout.encoding != 'utf-8':
+    sys.stdout.reconfigure(encoding='utf-8')
+from pymongo import UpdateOne
+from app.database import init_db
+from app.models import User, Team
+from app.services.profile_text import refresh_embeddings, user_embedding_text, team_embedding_text, embedding_fields
+from app.services.model_registry import MODEL_NAME
+
+# Windows Fix
+if os.name == "nt":
+    asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+
+# Bulk re-embedding after a model or text-template change:
+#   python reembed.py          -> only documents whose hash/model is stale
+#   python reembed.py --force  -> every document
+CHUNK_SIZE = 256
+
+async def migrate(model, build, force: bool):
+    total = await model.find_all().count()
+    changed = 0
+    for skip in range(0, total, CHUNK_SIZE):
+        docs = await model.find_all().sort("_id").skip(skip).limit(CHUNK_SIZE).to_list()
+        if force:
+            for d in docs: d.embedding_hash = None
+        stale = await refresh_embeddings(docs, build)
+        if stale:
+            await model.get_pymongo_collection().bulk_write(
+                [UpdateOne({"_id": d.id}, {"$set": embedding_fields(d)}) for d in stale], ordered=False
+            )
+        changed += len(stale)
+        print(f"   {min(skip + CHUNK_SIZE, total)}/{total} checked, {changed} re-embedded")
+    return changed
+
+async def reembed():
+    force = "--force" in sys.argv
+    print("🔌 Connecting to Database...")
+    await init_db()
+
+    print(f"🧠 Re-embedding Users with {MODEL_NAME}...")
+    users = await migrate(User, user_embedding_text, force)
+
+    print(f"🧠 Re-embedding Teams with {MODEL_NAME}...")
+    teams = await migrate(Team, team_embedding_text, force)
+
+    print(f"✨ Done: {users} users and {teams} teams re-embedded.")
+
+if __name__ == "__main__":
+    asyncio.run(reembed())
@@ -244,7 +244,7 @@ async def seed():
                     "leetcode": {"solved": 200, "rank": 15000}
                 },
                 connections=[], # To be filled later if needed
-                embedding=[] # Initialize empty, will be generated if they login/update
+                # No embedding yet: the backfill worker generates it into the vector store
             )
             
             # Upsert
@@ -292,7 +292,6 @@ async def seed():
                 target_completion_date=datetime.now() + timedelta(days=random.randint(30, 90)),
                 status="planning",
                 target_members=random.randint(3, 6),
-                embedding=[],
             )
             
             existing = await Team.find_one(Team.name == title)
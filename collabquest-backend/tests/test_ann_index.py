@@ -0,0 +1,118 @@
+import asyncio
+import numpy as np
+import pytest
+from bson import ObjectId
+from app.services import ann_index as ann
+from app.services.ann_index import IVFIndex, filtered_search, shortlist, ANN_CANDIDATES
+from app.services.embedding_store import EmbeddingStore
+
+class FakeCollection:
+    """Answers filtered_search's id-only $in query; `eligible` stands in for the Mongo filter"""
+
+    def __init__(self, eligible: set):
+        self.eligible = eligible
+        self.queries = []
+
+    def find(self, query, projection):
+        ids = query["$and"][1]["_id"]["$in"]
+        self.queries.append(len(ids))
+        docs = [{"_id": i} for i in ids if str(i) in self.eligible]
+        class Cursor:
+            async def to_list(self, length): return docs
+        return Cursor()
+
+@pytest.fixture
+def index(tmp_path):
+    rng = np.random.default_rng(3)
+    store = EmbeddingStore("teams", directory=str(tmp_path))
+    ids = [str(ObjectId()) for _ in range(200)]
+    store.put_many([(doc_id, rng.standard_normal(8), None) for doc_id in ids])
+    index = IVFIndex("teams", store)
+    index.build()
+    return index, ids, store.get(ids[0])
+
+def test_over_fetches_until_k_neighbours_pass_the_filter(index):
+    index, ids, query = index
+    ranked = [doc_id for doc_id, _ in index.search(query, len(ids))]
+    eligible = set(ranked[::10]) # only every tenth neighbour passes
+    collection = FakeCollection(eligible)
+
+    shortlist = asyncio.run(filtered_search(index, query, 5, collection, {}))
+    assert shortlist == ranked[::10][:5]
+    assert len(collection.queries) > 1
+
+def test_excluded_ids_never_reach_the_filter(index):
+    index, ids, query = index
+    ranked = [doc_id for doc_id, _ in index.search(query, len(ids))]
+    collection = FakeCollection(set(ids))
+    shortlist = asyncio.run(filtered_search(index, query, 3, collection, {}, exclude=set(ranked[:3])))
+    assert shortlist == ranked[3:6]
+    assert collection.queries == [3]
+
+def test_stops_when_the_index_runs_out(index):
+    index, ids, query = index
+    collection = FakeCollection({ids[5]})
+    assert asyncio.run(filtered_search(index, query, 10, collection, {})) == [ids[5]]
+
+class NewestCollection:
+    """Answers shortlist's fallback: eligible ids, newest first, with the limit it was given"""
+
+    def __init__(self, ids: list):
+        self.ids = ids
+        self.limit = None
+
+    def find(self, query, projection):
+        collection = self
+        class Cursor:
+            def sort(self, key, direction): return self
+            def limit(self, n):
+                collection.limit = n
+                return self
+            async def to_list(self, length): return [{"_id": i} for i in sorted(collection.ids, reverse=True)[:collection.limit]]
+        return Cursor()
+
+def test_shortlist_without_an_index_takes_the_newest_eligible_documents(tmp_path):
+    index = IVFIndex("teams", EmbeddingStore("teams", directory=str(tmp_path)))
+    ids = [ObjectId() for _ in range(ANN_CANDIDATES + 20)]
+    collection = NewestCollection(ids)
+    result = asyncio.run(shortlist(index, np.ones(8), collection, {}))
+    assert collection.limit == ANN_CANDIDATES
+    assert result == [str(i) for i in sorted(ids, reverse=True)[:ANN_CANDIDATES]]
+
+def test_retrain_on_growth_runs_off_the_loop_and_keeps_later_writes(tmp_path, monkeypatch):
+    monkeypatch.setattr(ann, "BRUTE_FORCE_LIMIT", 50)
+    rng = np.random.default_rng(5)
+    store = EmbeddingStore("teams", directory=str(tmp_path))
+    index = IVFIndex("teams", store)
+    index.build()
+    ids = [str(ObjectId()) for _ in range(80)]
+    store.put_many([(doc_id, rng.standard_normal(8), None) for doc_id in ids])
+
+    async def grow():
+        for doc_id in ids[:60]: index.upsert(doc_id)
+        task = index._retrain_task
+        assert task is not None and index.centroids is None # the save returned before k-means ran
+        await asyncio.sleep(0)                             # k-means is now running in its thread
+        for doc_id in ids[60:]: index.upsert(doc_id)
+        assert index._touched
+        index.remove(ids[0])
+        await task
+
+    asyncio.run(grow())
+    assert index.centroids is not None
+    assert sorted(index.row_list) == sorted(index.rows.values())
+    assert sum(len(rows) for rows in index.lists) == len(ids) - 1
+
+def test_falls_back_to_an_exact_scan_when_the_probed_clusters_run_dry(index, monkeypatch):
+    index, ids, query = index
+    monkeypatch.setattr(ann, "BRUTE_FORCE_LIMIT", 50)
+    monkeypatch.setattr(ann, "NPROBE", 2)
+    index._train()
+    assert index.probes
+    probed = {doc_id for doc_id, _ in index.search(query, len(ids))}
+    exact = [doc_id for doc_id, _ in index.search(query, len(ids), exact=True)]
+    eligible = [doc_id for doc_id in exact if doc_id not in probed] # only teams outside the probed clusters pass
+    assert len(eligible) >= 5
+
+    collection = FakeCollection(set(eligible))
+    assert asyncio.run(filtered_search(index, query, 5, collection, {})) == eligible[:5]
@@ -0,0 +1,77 @@
+from types import SimpleNamespace
+import numpy as np
+from app.services.availability import (
+    compile_availability, unpack, overlap_minutes, batch_overlap_scores, weighted_overlap_scores,
+    minutes_to_score, profile_from_bits, profile_add, profile_remove, profile_matrix, unpack_profile,
+    EMPTY_BITS, SLOTS_PER_DAY, TOTAL_SLOTS,
+)
+
+def week(*days):
+    """days: (day name, [(start, end), ...]) pairs -> hex bitset"""
+    return compile_availability([
+        SimpleNamespace(day=day, enabled=True, slots=[SimpleNamespace(start=s, end=e) for s, e in slots])
+        for day, slots in days
+    ])
+
+def test_slots_are_set_per_quarter_hour():
+    bits = unpack(week(("Tuesday", [("09:00", "10:00")])))
+    assert bits.shape == (TOTAL_SLOTS,)
+    start = SLOTS_PER_DAY + 9 * 4
+    assert bits.sum() == 4
+    assert bits[start:start + 4].all()
+
+def test_partial_quarters_round_outwards():
+    assert unpack(week(("Monday", [("09:10", "09:20")]))).sum() == 2 # 09:00-09:15 and 09:15-09:30
+    assert unpack(week(("Monday", [("09:10", "09:35")]))).sum() == 3
+
+def test_disabled_days_and_bad_times_are_ignored():
+    disabled = compile_availability([SimpleNamespace(day="Monday", enabled=False, slots=[SimpleNamespace(start="09:00", end="17:00")])])
+    assert disabled == EMPTY_BITS
+    assert week(("Someday", [("09:00", "10:00")])) == EMPTY_BITS
+    assert week(("Monday", [("10:00", "09:00")])) == EMPTY_BITS
+    assert week(("Monday", [("oops", "09:00")])) == week(("Monday", [("00:00", "09:00")]))
+
+def test_overlap_is_and_plus_popcount():
+    a = week(("Monday", [("09:00", "11:00")]), ("Friday", [("18:00", "19:00")]))
+    b = week(("Monday", [("10:00", "12:00")]), ("Friday", [("18:30", "20:00")]))
+    assert overlap_minutes(a, b) == 60 + 30
+    assert overlap_minutes(a, EMPTY_BITS) == 0
+    assert overlap_minutes(None, b) == 0
+
+def test_batch_scores_match_pairwise_overlap():
+    me = week(("Monday", [("08:00", "20:00")]), ("Saturday", [("10:00", "14:00")]))
+    others = [
+        week(("Monday", [("09:00", "10:00")])),
+        week(("Saturday", [("00:00", "23:59")])),
+        week(("Monday", [("00:00", "23:59")]), ("Saturday", [("00:00", "23:59")])),
+        EMPTY_BITS,
+    ]
+    scores = batch_overlap_scores(me, others)
+    assert np.allclose(scores, [minutes_to_score(overlap_minutes(me, o)) for o in others])
+    assert np.allclose(scores, [10.0, 40.0, 100.0, 0.0])
+    assert len(batch_overlap_scores(me, [])) == 0
+
+def test_score_caps_at_ten_shared_hours():
+    assert minutes_to_score(300) == 50.0
+    assert minutes_to_score(600) == 100.0
+    assert minutes_to_score(6000) == 100.0
+
+def test_team_profile_counts_each_free_member():
+    alice = week(("Wednesday", [("10:00", "11:00")]))
+    bob = week(("Wednesday", [("10:30", "12:00")]))
+    profile = profile_from_bits([alice, bob])
+    counts = unpack_profile(profile)
+    assert counts.max() == 2
+    assert int(counts.sum()) == unpack(alice).sum() + unpack(bob).sum()
+
+    me = week(("Wednesday", [("10:00", "12:00")]))
+    # 4 slots with alice + 6 with bob = 10 member-slots = 150 minutes
+    assert np.allclose(weighted_overlap_scores(me, profile_matrix([profile])), [minutes_to_score(150)])
+
+def test_profile_add_and_remove_are_inverse():
+    alice = week(("Sunday", [("20:00", "22:00")]))
+    bob = week(("Sunday", [("21:00", "23:00")]))
+    profile = profile_from_bits([alice])
+    assert profile_add(profile, bob) == profile_from_bits([alice, bob])
+    assert profile_remove(profile_add(profile, bob), bob) == profile
+    assert not unpack_profile(profile_remove(profile, alice)).any()
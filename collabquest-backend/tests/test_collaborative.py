@@ -0,0 +1,41 @@
+import numpy as np
+from app.services.collaborative import _Interactions, interaction_matrices, factorize
+from app.services.matching_service import blend_collaborative
+
+def two_communities() -> _Interactions:
+    """12 users and 8 teams in two communities; each user likes every team of their own community"""
+    data = _Interactions()
+    for u in range(12):
+        for t in range(8):
+            if u % 2 == t % 2: data.add(f"u{u}", f"t{t}", 1.0, True)
+    data.add("u0", "t1", 1.0, False) # a left swipe is seen, but is no preference
+    return data
+
+def test_interacted_teams_outrank_the_rest():
+    data = two_communities()
+    by_user, by_team = interaction_matrices(data)
+    users, teams = factorize(by_user, by_team, len(data.user_ids), len(data.team_ids), factors=8)
+    scores = users @ teams.T
+    for user_id, u in data.user_ids.items():
+        liked = [data.team_ids[f"t{t}"] for t in range(8) if int(user_id[1:]) % 2 == t % 2]
+        others = [c for c in range(8) if c not in liked]
+        assert scores[u, liked].min() > scores[u, others].max()
+
+def test_duplicate_feedback_collapses_into_one_entry():
+    data = _Interactions()
+    data.add("u0", "t0", 1.0, False)
+    data.add("u0", "t0", 3.0, True)  # swiped left, later matched
+    (indptr, indices, conf, pref), _ = interaction_matrices(data)
+    assert list(indices) == [0]
+    assert conf.tolist() == [40.0] and pref.tolist() == [1.0]
+
+def test_blend_stays_within_range_and_spares_cold_start_pairs():
+    rng = np.random.default_rng(2)
+    final = rng.uniform(0, 100, 50)
+    query = rng.standard_normal(8).tolist()
+    vectors = [rng.standard_normal(8).tolist() if i % 3 else [] for i in range(50)]
+    blended = blend_collaborative(final, query, vectors)
+    assert blended.min() >= 0 and blended.max() <= 100
+    cold = np.array([not v for v in vectors])
+    assert np.array_equal(blended[cold], final[cold])
+    assert np.array_equal(blend_collaborative(final, [], vectors), final)
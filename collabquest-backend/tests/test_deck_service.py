@@ -0,0 +1,114 @@
+import asyncio
+from types import SimpleNamespace
+import pytest
+from bson import ObjectId
+from app.models import SwipeDeck
+from app.services import deck_service
+
+class FakeDecks:
+    """In-memory swipe_decks collection: the upsert, $pull and lookup deck_service issues"""
+
+    def __init__(self):
+        self.docs = []
+
+    def _matches(self, doc, query):
+        return all(doc.get(k) == v for k, v in query.items())
+
+    async def update_one(self, key, update, upsert=False):
+        doc = next((d for d in self.docs if self._matches(d, key)), None)
+        if doc is None:
+            doc = dict(key)
+            self.docs.append(doc)
+        doc.update(update["$set"])
+
+    async def update_many(self, query, update):
+        pulled = set(update["$pull"]["entries"]["id"]["$in"])
+        for doc in self.docs:
+            if self._matches(doc, query): doc["entries"] = [e for e in doc["entries"] if e["id"] not in pulled]
+
+class FakeFind:
+    def __init__(self, docs): self.docs = docs
+    def project(self, view): return self
+    async def to_list(self): return self.docs
+
+@pytest.fixture
+def decks(monkeypatch):
+    decks = FakeDecks()
+    monkeypatch.setattr(SwipeDeck, "get_pymongo_collection", classmethod(lambda cls: decks))
+    async def find_one(key):
+        doc = next((d for d in decks.docs if decks._matches(d, key)), None)
+        return SwipeDeck(**doc) if doc else None
+    monkeypatch.setattr(SwipeDeck, "find_one", find_one)
+    return decks
+
+@pytest.fixture
+def owner():
+    return SimpleNamespace(id=ObjectId())
+
+def ranked(n: int) -> list:
+    return [(f"t{i}", float(i % 97)) for i in range(n)]
+
+def test_build_stores_the_best_cards_first(decks, owner, monkeypatch):
+    async def rank(user): return ranked(deck_service.DECK_SIZE + 50)
+    monkeypatch.setattr(deck_service, "_rank_projects", rank)
+    deck = asyncio.run(deck_service.build_deck(owner, "projects"))
+
+    scores = [e.score for e in deck.entries]
+    assert len(scores) == deck_service.DECK_SIZE
+    assert scores == sorted(scores, reverse=True)
+    assert decks.docs[0]["owner_id"] == str(owner.id)
+    assert [e["id"] for e in decks.docs[0]["entries"]] == [e.id for e in deck.entries]
+
+def test_ranking_never_scores_swiped_or_hidden_teams(owner, monkeypatch):
+    swiped, own, fresh = str(ObjectId()), str(ObjectId()), str(ObjectId())
+    calls = {}
+    async def blocked(user_id): return {"blocked-user"}
+    async def swipes(user_id, kind, project_id): return {swiped}
+    async def hidden(user_id, blocked): return {own}
+    async def shortlist(index, query_vec, collection, query, exclude):
+        calls["exclude"] = exclude
+        return [fresh]
+    def find(query):
+        calls["query"] = query
+        return FakeFind([SimpleNamespace(id=ObjectId(fresh))])
+    async def scores(user, candidates): return [80.0] * len(candidates)
+    monkeypatch.setattr(deck_service, "blocked_ids", blocked)
+    monkeypatch.setattr(deck_service, "_swiped_ids", swipes)
+    monkeypatch.setattr(deck_service, "hidden_team_ids", hidden)
+    monkeypatch.setattr(deck_service, "shortlist", shortlist)
+    monkeypatch.setattr(deck_service.Team, "find", find)
+    monkeypatch.setattr(deck_service.Team, "get_pymongo_collection", classmethod(lambda cls: None))
+    monkeypatch.setattr(deck_service, "calculate_match_scores", scores)
+
+    assert asyncio.run(deck_service._rank_projects(owner)) == [(fresh, 80.0)]
+    assert calls["exclude"] == {swiped, own}
+    # Candidates are always the bounded shortlist, never every eligible team
+    assert calls["query"]["_id"]["$in"] == [ObjectId(fresh)]
+    assert calls["query"]["_id"]["$nin"] == [ObjectId(swiped)]
+    assert calls["query"]["leader_id"] == {"$nin": ["blocked-user"]}
+
+def test_swiped_card_leaves_the_deck(decks, owner, monkeypatch):
+    async def rank(user): return ranked(30)
+    monkeypatch.setattr(deck_service, "_rank_projects", rank)
+    page = asyncio.run(deck_service.get_deck_page(owner, "projects", limit=5))
+    top = page["entries"][0].id
+
+    asyncio.run(deck_service.record_swipe(str(owner.id), top, "project"))
+    page = asyncio.run(deck_service.get_deck_page(owner, "projects", limit=5))
+    assert top not in [e.id for e in page["entries"]]
+    assert deck_service.deck_stats["built_inline"] >= 1
+
+def test_cursor_pages_walk_the_deck_once(decks, owner, monkeypatch):
+    async def rank(user): return ranked(23)
+    monkeypatch.setattr(deck_service, "_rank_projects", rank)
+    seen, cursor = [], None
+    while True:
+        page = asyncio.run(deck_service.get_deck_page(owner, "projects", cursor=cursor, limit=10))
+        seen += [e.id for e in page["entries"]]
+        cursor = page["next_cursor"]
+        if cursor is None: break
+    assert len(seen) == len(set(seen)) == 23
+    assert page["remaining"] == 0
+    # A cursor the deck no longer holds (swiped since) restarts at the top
+    restart = asyncio.run(deck_service.get_deck_page(owner, "projects", cursor="gone", limit=3))
+    assert [e.id for e in restart["entries"]] == seen[:3]
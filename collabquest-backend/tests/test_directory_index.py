@@ -0,0 +1,46 @@
+from types import SimpleNamespace
+from app.services.directory_index import DirectoryIndex, NgramIndex
+
+def user(user_id, username, full_name=None, skills=()):
+    return SimpleNamespace(id=user_id, username=username, full_name=full_name, skills=[SimpleNamespace(name=s) for s in skills])
+
+def test_short_and_long_queries_match_anywhere_in_a_name():
+    index = NgramIndex()
+    index.upsert("a", "marathon")
+    index.upsert("b", "Anna", "Marsh")
+    assert index.search("r") == {"a", "b"}
+    assert index.search("AR") == {"a", "b"}
+    assert index.search("ath") == {"a"}
+    assert index.search("rathon") == {"a"}
+    assert index.search("  marsh ") == {"b"}
+    assert index.search("xyz") == set()
+    assert index.search("") == set()
+
+def test_matches_never_span_two_fields():
+    index = NgramIndex()
+    index.upsert("a", "ada", "lovelace")
+    assert index.search("ada") == {"a"}
+    assert index.search("a lo") == set()
+
+def test_upsert_replaces_and_remove_drops_postings():
+    index = NgramIndex()
+    index.upsert("a", "alice")
+    index.upsert("a", "bob")
+    assert index.search("ali") == set()
+    assert index.search("bob") == {"a"}
+    index.remove("a")
+    assert index.search("b") == set()
+    assert index.grams == {}
+
+def test_directory_search_orders_by_username_and_filters_skills():
+    directory = DirectoryIndex()
+    directory.build([
+        user("1", "zoe", "Zoe Park", ["React"]),
+        user("2", "parker", None, ["Python"]),
+        user("3", "amy", "Amy Spark", ["react native"]),
+    ])
+    assert directory.search("park") == ["3", "2", "1"]
+    assert directory.search("park", skill="react") == ["3", "1"]
+    assert directory.search("park", exclude={"3"}) == ["2", "1"]
+    assert directory.search() == ["3", "2", "1"]
+    assert directory.search("zoepark") == []
@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+from app.services.embedding_store import EmbeddingStore
+
+DIM = 8
+
+@pytest.fixture
+def store(tmp_path):
+    return EmbeddingStore("user", directory=str(tmp_path))
+
+def vec(*values):
+    v = np.zeros(DIM, dtype=np.float32)
+    v[:len(values)] = values
+    return v
+
+def test_put_stores_unit_vectors_and_versions(store):
+    assert store.put("a", vec(3, 4), "h1")
+    assert np.allclose(store.get("a"), vec(0.6, 0.8))
+    assert store.version("a") == "h1"
+    assert len(store) == 1
+
+def test_put_many_skips_empty_and_malformed_vectors(store):
+    written = store.put_many([("a", vec(1), "h"), ("b", [], "h"), ("c", None, "h"), ("d", vec(0, 1), "h")])
+    assert written == ["a", "d"]
+    assert store.put_many([("e", [1.0, 2.0], "h")]) == [] # wrong dimension
+    assert store.get("b") is None and store.get("e") is None
+
+def test_update_overwrites_the_row_in_place(store):
+    store.put_many([("a", vec(1), "h1"), ("b", vec(0, 1), "h1")])
+    row = store.row("a")
+    store.put("a", vec(0, 0, 1), "h2")
+    assert store.row("a") == row
+    assert np.allclose(store.get("a"), vec(0, 0, 1))
+    assert store.version("a") == "h2"
+
+def test_take_keeps_order_and_zero_fills_missing(store):
+    store.put_many([("a", vec(1), "h"), ("b", vec(0, 1), "h")])
+    out = store.take(["b", "missing", "a"])
+    assert out.shape == (3, DIM)
+    assert np.allclose(out, [vec(0, 1), vec(), vec(1)])
+
+def test_take_of_consecutive_rows_is_a_view(store):
+    store.put_many([(doc_id, vec(i + 1), "h") for i, doc_id in enumerate("abcd")])
+    assert np.shares_memory(store.take(["b", "c", "d"]), store.matrix)
+    assert not np.shares_memory(store.take(["c", "b"]), store.matrix)
+    assert np.allclose(store.take(["b", "c"]), [vec(1), vec(1)])
+
+def test_remove_drops_the_document(store):
+    store.put_many([("a", vec(1), "h"), ("b", vec(0, 1), "h")])
+    store.remove("a")
+    store.remove("never-stored") # no-op
+    assert store.get("a") is None
+    assert store.version("a") is None
+    assert np.allclose(store.take(["a"]), 0)
+    ids, versions, matrix = store.snapshot()
+    assert ids == ["b"] and versions == ["h"]
+    assert np.allclose(matrix, [vec(0, 1)])
+
+def test_removed_document_gets_a_new_row_when_stored_again(store):
+    store.put_many([("a", vec(1), "h"), ("b", vec(0, 1), "h")])
+    old_row = store.row("a")
+    store.remove("a")
+    store.put("a", vec(0, 0, 1), "h2")
+    assert store.row("a") != old_row
+    assert len(store) == 2
+
+def test_reopening_reads_what_was_written(tmp_path):
+    first = EmbeddingStore("team", directory=str(tmp_path))
+    first.put_many([(f"t{i}", vec(i + 1, 1), f"h{i}") for i in range(5)])
+    first.remove("t2")
+
+    second = EmbeddingStore("team", directory=str(tmp_path))
+    assert len(second) == 4
+    assert second.get("t2") is None
+    assert np.allclose(second.get("t4"), first.get("t4"))
+    assert second.version("t4") == "h4"
+
+def test_writes_from_another_handle_are_picked_up(tmp_path):
+    reader = EmbeddingStore("user", directory=str(tmp_path))
+    writer = EmbeddingStore("user", directory=str(tmp_path))
+    writer.put("a", vec(1), "h")
+    assert reader.get("a") is not None
+    writer.remove("a")
+    assert reader.get("a") is None
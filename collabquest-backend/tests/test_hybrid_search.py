@@ -0,0 +1,38 @@
+import pytest
+from app.services import text_index
+from app.services.directory_index import NgramIndex
+from app.services.hybrid_search import reciprocal_rank_fusion, RRF_K
+
+def test_scores_are_summed_reciprocal_ranks():
+    fused = dict(reciprocal_rank_fusion([["a", "b"], ["b", "c"]]))
+    assert fused["a"] == pytest.approx(1 / (RRF_K + 1))
+    assert fused["b"] == pytest.approx(1 / (RRF_K + 2) + 1 / (RRF_K + 1))
+    assert fused["c"] == pytest.approx(1 / (RRF_K + 2))
+
+def test_agreement_between_lists_beats_a_single_top_rank():
+    fused = reciprocal_rank_fusion([["solo", "shared"], ["other", "shared"], ["shared"]])
+    assert [doc_id for doc_id, _ in fused][0] == "shared"
+
+def test_result_is_ordered_best_first():
+    fused = reciprocal_rank_fusion([["a", "b", "c", "d"], ["d", "c"], []])
+    scores = [score for _, score in fused]
+    assert scores == sorted(scores, reverse=True)
+    assert [doc_id for doc_id, _ in fused] == ["d", "c", "a", "b"]
+
+def test_damping_flattens_rank_differences():
+    sharp = dict(reciprocal_rank_fusion([["a", "b"]], k=1))
+    flat = dict(reciprocal_rank_fusion([["a", "b"]], k=1000))
+    assert sharp["a"] / sharp["b"] > flat["a"] / flat["b"]
+
+def test_empty_input():
+    assert reciprocal_rank_fusion([]) == []
+    assert reciprocal_rank_fusion([[], []]) == []
+
+def test_name_matches_rank_prefixes_and_shorter_names_first(monkeypatch):
+    names = NgramIndex()
+    for doc_id, name in [("long", "The Maze Solver Project"), ("prefix", "Maze Sol"), ("mid", "A Maze Solver"), ("other", "Chess")]:
+        names.upsert(doc_id, name)
+    monkeypatch.setattr(text_index, "team_names", names)
+    assert text_index.name_matches("maze sol", 10) == ["prefix", "mid", "long"]
+    assert text_index.name_matches("MAZE", 2) == ["prefix", "mid"]
+    assert text_index.name_matches("  ", 10) == []
@@ -0,0 +1,138 @@
+import asyncio
+from types import SimpleNamespace
+import mongomock
+import numpy as np
+import pytest
+from bson import ObjectId
+from app.models import Team, User, NeighborList
+from app.routes import team_routes, user_routes
+from app.services import knn_graph
+from app.services.knn_graph import full_rows, merge_changed, build_knn_graph
+
+def unit_rows(rng, n: int, dim: int = 8) -> np.ndarray:
+    m = rng.standard_normal((n, dim)).astype(np.float32)
+    return m / np.linalg.norm(m, axis=1, keepdims=True)
+
+def exact_graph(matrix: np.ndarray, k: int) -> dict:
+    scores = matrix @ matrix.T
+    np.fill_diagonal(scores, -np.inf)
+    return {r: np.argsort(-scores[r])[:k].tolist() for r in range(len(matrix))}
+
+# --- GRAPH ---
+def test_full_rows_are_the_exact_top_k():
+    matrix = unit_rows(np.random.default_rng(1), 60)
+    rows = full_rows(matrix, np.arange(60), k=5)
+    assert {r: [c for c, _ in n] for r, n in rows.items()} == exact_graph(matrix, 5)
+
+def test_merging_changed_rows_matches_a_full_recompute():
+    rng = np.random.default_rng(2)
+    matrix = unit_rows(rng, 60)
+    current = full_rows(matrix, np.arange(60), k=5)
+    changed = np.array([7, 21])
+    matrix[changed] = unit_rows(rng, 2)
+    clean = np.array([r for r in range(60) if r not in changed and not {c for c, _ in current[r]} & set(changed.tolist())])
+    merged = {**{r: current[r] for r in clean.tolist()}, **merge_changed(matrix, clean, changed, current, k=5)}
+    expected = exact_graph(matrix, 5)
+    assert all([c for c, _ in merged[r]] == expected[r] for r in clean.tolist())
+
+class FakeNeighbors:
+    """In-memory neighbor_lists collection: the reads and writes build_knn_graph issues"""
+
+    def __init__(self):
+        self.docs = {}
+
+    def find(self, query, projection):
+        docs = [dict(d) for d in self.docs.values() if d["kind"] == query["kind"]]
+        class Cursor:
+            async def to_list(self, length): return docs
+        return Cursor()
+
+    async def bulk_write(self, ops, ordered=True):
+        for op in ops:
+            self.docs.setdefault(op._filter["doc_id"], dict(op._filter)).update(op._doc["$set"])
+
+    async def delete_many(self, query):
+        for doc_id in query["doc_id"]["$in"]: self.docs.pop(doc_id, None)
+
+def test_a_changed_document_gets_its_neighbours_recomputed(monkeypatch):
+    rng = np.random.default_rng(3)
+    ids = [str(ObjectId()) for _ in range(40)]
+    matrix, hashes = unit_rows(rng, 40), [f"v1-{i}" for i in range(40)]
+    store = SimpleNamespace(snapshot=lambda: (ids, list(hashes), matrix))
+    neighbours = FakeNeighbors()
+    monkeypatch.setitem(knn_graph.KINDS, "team", (Team, None, store))
+    monkeypatch.setattr(NeighborList, "get_pymongo_collection", classmethod(lambda cls: neighbours))
+
+    asyncio.run(build_knn_graph("team"))
+    assert len(neighbours.docs) == 40
+    matrix[12] = unit_rows(rng, 1)[0]
+    hashes[12] = "v2-12"
+    status = asyncio.run(build_knn_graph("team"))
+
+    assert neighbours.docs[ids[12]]["embedding_hash"] == "v2-12"
+    assert status["recomputed"] >= 1 and status["recomputed"] < 40
+    expected = exact_graph(matrix, knn_graph.K)
+    for row, doc_id in enumerate(ids):
+        assert [ids.index(n["id"]) for n in neighbours.docs[doc_id]["neighbors"]] == expected[row]
+
+# --- ENDPOINTS ---
+@pytest.fixture
+def mongo(monkeypatch):
+    """Teams, users and neighbour lists in mongomock, so the routes' filters really run"""
+    db = mongomock.MongoClient().db
+    def finder(collection):
+        def find(query):
+            docs = list(collection.find(query))
+            class Found:
+                def project(self, view):
+                    class Loaded:
+                        async def to_list(self): return [view.model_validate(d) for d in docs]
+                    return Loaded()
+            return Found()
+        return find
+    monkeypatch.setattr(Team, "find", finder(db.teams))
+    monkeypatch.setattr(User, "find", finder(db.users))
+    async def find_one(query):
+        doc = db.neighbors.find_one(query)
+        return SimpleNamespace(neighbors=[SimpleNamespace(**n) for n in doc["neighbors"]]) if doc else None
+    monkeypatch.setattr(NeighborList, "find_one", find_one)
+    return db
+
+def team(name: str, members: list, **extra) -> dict:
+    return {"_id": ObjectId(), "name": name, "description": "", "members": members, "leader_id": members[0], **extra}
+
+def test_similar_teams_only_serves_joinable_ones(mongo, monkeypatch):
+    me = SimpleNamespace(id=ObjectId())
+    source = team("source", ["a"])
+    teams = [
+        team("open", ["b"]),
+        team("full", ["c", "d", "e", "f"]),
+        team("closed", ["g"], is_looking_for_members=False),
+        team("done", ["h"], status="completed"),
+        team("mine", [str(me.id)]),
+        team("blocked leader", ["blocker"]),
+        team("also open", ["i", "j"]),
+    ]
+    mongo.teams.insert_many([source] + teams)
+    mongo.neighbors.insert_one({"kind": "team", "doc_id": str(source["_id"]),
+                                "neighbors": [{"id": str(t["_id"]), "score": 0.9 - i / 100} for i, t in enumerate(teams)]})
+    async def blocked(user_id): return {"blocker"}
+    monkeypatch.setattr(team_routes, "blocked_ids", blocked)
+
+    similar = asyncio.run(team_routes.get_similar_teams(str(source["_id"]), limit=10, fields=None, current_user=me))
+    assert [t["name"] for t in similar] == ["open", "also open"]
+    # Filtered-out neighbours do not shorten the page
+    assert [t["name"] for t in asyncio.run(team_routes.get_similar_teams(str(source["_id"]), limit=2, fields="name", current_user=me))] == ["open", "also open"]
+
+def test_similar_users_hides_the_caller_and_blocked_users(mongo, monkeypatch):
+    me = SimpleNamespace(id=ObjectId())
+    users = [{"_id": ObjectId(), "username": name} for name in ("ada", "bob", "cy")]
+    mongo.users.insert_many([{"_id": me.id, "username": "me"}] + users)
+    source = str(users[0]["_id"])
+    neighbours = [me.id, users[1]["_id"], users[2]["_id"]]
+    mongo.neighbors.insert_one({"kind": "user", "doc_id": source, "neighbors": [{"id": str(i), "score": 0.5} for i in neighbours]})
+    async def blocked(user_id): return {str(users[1]["_id"])}
+    monkeypatch.setattr(user_routes, "blocked_ids", blocked)
+
+    similar = asyncio.run(user_routes.get_similar_users(source, limit=10, fields=None, current_user=me))
+    assert [u["username"] for u in similar] == ["cy"]
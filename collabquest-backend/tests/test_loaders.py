@@ -0,0 +1,54 @@
+import asyncio
+from types import SimpleNamespace
+from bson import ObjectId
+from app.services.loaders import DocumentLoader
+
+class FakeModel:
+    """Answers the loader's `_id $in` query from a dict and counts the queries"""
+    __name__ = "FakeModel"
+
+    def __init__(self, docs: list):
+        self.docs = {d.id: d for d in docs}
+        self.queries = []
+
+    def find(self, query):
+        ids = query["_id"]["$in"]
+        self.queries.append(ids)
+        found = [self.docs[i] for i in reversed(ids) if i in self.docs] # Mongo does not keep $in order
+        class Cursor:
+            async def to_list(self): return found
+        return Cursor()
+
+def docs(n: int) -> list:
+    return [SimpleNamespace(id=ObjectId(), name=f"doc{i}") for i in range(n)]
+
+def test_load_many_keeps_input_order_and_maps_missing_ids_to_none():
+    stored = docs(3)
+    model = FakeModel(stored)
+    loader = DocumentLoader(model)
+    ids = [stored[2].id, ObjectId(), stored[0].id, "not-an-id", str(stored[1].id)]
+    result = asyncio.run(loader.load_many(ids))
+    assert [d.name if d else None for d in result] == ["doc2", None, "doc0", None, "doc1"]
+    assert len(model.queries) == 1 and len(model.queries[0]) == 4 # the malformed id never reaches Mongo
+
+def test_loads_in_one_tick_share_a_query_and_are_memoized():
+    stored = docs(4)
+    model = FakeModel(stored)
+    loader = DocumentLoader(model)
+    async def run():
+        first = await asyncio.gather(*[loader.load(d.id) for d in stored], loader.load(stored[0].id))
+        again = await loader.load_many([d.id for d in stored])
+        return first, again
+    first, again = asyncio.run(run())
+    assert first[:4] == again == stored and first[4] is stored[0]
+    assert len(model.queries) == 1 and loader.round_trips == 1
+
+def test_primed_documents_skip_the_query():
+    stored = docs(2)
+    model = FakeModel(stored)
+    loader = DocumentLoader(model)
+    async def run():
+        loader.prime(stored[0])
+        return await loader.load_many([stored[0].id, stored[1].id])
+    assert asyncio.run(run()) == stored
+    assert model.queries == [[stored[1].id]]
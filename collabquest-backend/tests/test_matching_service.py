@@ -0,0 +1,178 @@
+from types import SimpleNamespace
+import numpy as np
+import pytest
+from app.services import matching_service, reduced_embeddings
+from app.services.score_cache import ScoreCache
+from app.services.availability import get_bits, profile_from_bits
+from app.services.embedding_store import EmbeddingStore
+from app.services.vector_store import calculate_similarity
+
+DIM = 16
+DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+# --- BASELINE (per-pair formulas the batch scorers replaced) ---
+def to_mins(t_str):
+    h, m = map(int, t_str.split(':'))
+    return h * 60 + m
+
+def baseline_time_overlap(user_avail: list, team_avail_flat: list) -> float:
+    total_overlap_minutes = 0
+    team_schedule = {day: [] for day in DAYS}
+    for entry in team_avail_flat:
+        if entry.enabled:
+            for slot in entry.slots:
+                team_schedule[entry.day].append((to_mins(slot.start), to_mins(slot.end)))
+    for user_day in user_avail:
+        if user_day.enabled and user_day.day in team_schedule:
+            for u_slot in user_day.slots:
+                u_start, u_end = to_mins(u_slot.start), to_mins(u_slot.end)
+                for t_start, t_end in team_schedule[user_day.day]:
+                    overlap_start = max(u_start, t_start)
+                    overlap_end = min(u_end, t_end)
+                    if overlap_start < overlap_end:
+                        total_overlap_minutes += (overlap_end - overlap_start)
+    return min(100.0, (total_overlap_minutes / 60 / 10) * 100)
+
+def baseline_score(a_embedding, b_embedding, user_avail, other_avail_flat) -> float:
+    semantic_score = calculate_similarity(a_embedding, b_embedding) * 100
+    avail_score = baseline_time_overlap(user_avail, other_avail_flat) if other_avail_flat else 100
+    return round((semantic_score * 0.70) + (avail_score * 0.30), 0)
+
+# --- FIXTURES ---
+def random_week(rng) -> list:
+    """Non-overlapping, quarter-hour aligned slots (the bitset's resolution) on random days"""
+    def hhmm(minutes): return f"{minutes // 60:02d}:{minutes % 60:02d}"
+    week = []
+    for day in DAYS:
+        bounds = sorted(rng.choice(np.arange(0, 97), 2 * int(rng.integers(0, 3)), replace=False) * 15)
+        slots = [SimpleNamespace(start=hhmm(s), end=hhmm(e)) for s, e in zip(bounds[::2], bounds[1::2])]
+        week.append(SimpleNamespace(day=day, enabled=bool(rng.integers(0, 4)), slots=slots))
+    return week
+
+def person(doc_id, rng) -> SimpleNamespace:
+    return SimpleNamespace(
+        id=doc_id, availability=random_week(rng), availability_bits=None, cf_vector=[],
+        embedding=rng.standard_normal(DIM).tolist(), embedding_hash=None, embedding_int8=None, reduced_version=None,
+    )
+
+@pytest.fixture
+def world(tmp_path, monkeypatch):
+    """A user, 12 candidates and 8 teams (some without any member availability), embedded in temp stores"""
+    rng = np.random.default_rng(11)
+    users = [person(f"u{i}", rng) for i in range(13)]
+    teams = []
+    for i in range(8):
+        members = [users[j] for j in rng.choice(len(users), int(rng.integers(0, 4)), replace=False)]
+        if i % 3 == 0:
+            for m in members: m.availability = []
+        team = SimpleNamespace(
+            id=f"t{i}", members=members, cf_vector=[], embedding=rng.standard_normal(DIM).tolist(),
+            embedding_hash=None, embedding_int8=None, reduced_version=None,
+            availability_profile=profile_from_bits([get_bits(m) for m in members]),
+            availability_members=sum(1 for m in members if m.availability),
+        )
+        teams.append(team)
+
+    user_vectors = EmbeddingStore("users", directory=str(tmp_path))
+    team_vectors = EmbeddingStore("teams", directory=str(tmp_path))
+    user_vectors.put_many([(u.id, u.embedding, None) for u in users])
+    team_vectors.put_many([(t.id, t.embedding, None) for t in teams])
+    monkeypatch.setattr(matching_service, "user_vectors", user_vectors)
+    monkeypatch.setattr(matching_service, "team_vectors", team_vectors)
+    monkeypatch.setattr(reduced_embeddings, "reducer", None)
+    return users[0], users[1:], teams
+
+def flat_availability(team) -> list:
+    return [day for m in team.members for day in m.availability]
+
+# --- PARITY ---
+def test_match_scores_reproduce_the_per_pair_formula(world):
+    user, _, teams = world
+    scores, is_exact = matching_service._match_scores(user, teams)
+    expected = [baseline_score(user.embedding, t.embedding, user.availability, flat_availability(t)) for t in teams]
+    assert scores == expected
+    assert is_exact.all()
+
+def test_candidate_scores_reproduce_the_per_pair_formula(world):
+    _, candidates, teams = world
+    for team in teams:
+        scores, _ = matching_service._candidate_scores(candidates, team)
+        team_avail = flat_availability(team)
+        expected = [baseline_score(team.embedding, c.embedding, c.availability, team_avail) for c in candidates]
+        assert scores == expected
+
+def test_compatibility_scores_reproduce_the_per_pair_formula(world):
+    user, candidates, _ = world
+    scores, _ = matching_service._compatibility_scores(user, candidates)
+    expected = []
+    for c in candidates:
+        semantic_score = calculate_similarity(user.embedding, c.embedding) * 100
+        avail_score = baseline_time_overlap(user.availability, c.availability)
+        expected.append(round((semantic_score * 0.70) + (avail_score * 0.30), 0))
+    assert scores == expected
+
+def test_documents_without_a_vector_score_zero_semantically(world):
+    user, _, teams = world
+    for t in teams: t.availability_profile, t.availability_members = None, 0
+    user.id = "never-embedded"
+    scores, _ = matching_service._match_scores(user, teams)
+    assert scores == [30.0] * len(teams) # 0.7 * 0 + 0.3 * 100 (no member availability)
+
+def test_members_who_saved_every_day_off_have_no_overlap(world):
+    user, _, teams = world
+    team = teams[1]
+    assert team.members
+    for m in team.members: m.availability = [SimpleNamespace(day="Monday", enabled=False, slots=[])]
+    team.availability_profile = profile_from_bits([get_bits(m) for m in team.members])
+    team.availability_members = len(team.members)
+    expected = baseline_score(user.embedding, team.embedding, user.availability, flat_availability(team))
+    assert matching_service._match_scores(user, [team])[0] == [expected]
+    assert matching_service._candidate_scores([user], team)[0] == [expected]
+
+# --- SCORE CACHE ---
+@pytest.fixture
+def cache(monkeypatch):
+    cache = ScoreCache()
+    monkeypatch.setattr(matching_service, "score_cache", cache)
+    return cache
+
+def counting(scores_of, exact_of=lambda doc: True):
+    """compute() stand-in for _cached_scores that records which documents it was asked for"""
+    calls = []
+    def compute(docs):
+        calls.append([d.id for d in docs])
+        return [scores_of(d) for d in docs], np.array([exact_of(d) for d in docs], dtype=bool)
+    return compute, calls
+
+def test_cached_scores_are_dropped_when_either_side_changes(world, cache):
+    user, _, teams = world
+    compute, calls = counting(lambda t: 50.0)
+    matching_service._cached_scores("match", user, teams, compute)
+    assert matching_service._cached_scores("match", user, teams, compute) == [50.0] * len(teams)
+    assert len(calls) == 1
+
+    teams[2].embedding_hash = "edited"                     # the team's profile text changed
+    matching_service._cached_scores("match", user, teams, compute)
+    assert calls[-1] == [teams[2].id]
+
+    user.availability = [SimpleNamespace(day="Friday", enabled=True, slots=[SimpleNamespace(start="09:00", end="17:00")])]
+    matching_service._cached_scores("match", user, teams, compute)
+    assert calls[-1] == [t.id for t in teams]              # the user's schedule changed: every pair is stale
+
+def test_invalidate_drops_every_pair_of_a_document(world, cache):
+    user, _, teams = world
+    compute, calls = counting(lambda t: 50.0)
+    matching_service._cached_scores("match", user, teams, compute)
+    cache.invalidate(teams[0].id)
+    matching_service._cached_scores("match", user, teams, compute)
+    assert calls[-1] == [teams[0].id]
+    assert cache.get_metrics()["invalidations"] == 1
+
+def test_approximate_scores_are_never_cached(world, cache):
+    user, _, teams = world
+    coded = {teams[1].id, teams[4].id}                     # scored off an int8 code
+    compute, calls = counting(lambda t: 40.0, lambda t: t.id not in coded)
+    matching_service._cached_scores("match", user, teams, compute)
+    assert len(cache.entries) == len(teams) - len(coded)
+    matching_service._cached_scores("match", user, teams, compute)
+    assert sorted(calls[-1]) == sorted(coded)
@@ -0,0 +1,34 @@
+import pytest
+from fastapi import HTTPException
+from app.services.pagination import encode_cursor, decode_cursor, top_k_page
+
+def test_cursor_round_trip():
+    for score, doc_id in [(87.0, "65f1c0ffee"), (0.1 + 0.2, "a|b"), (-3.5, "")]:
+        assert decode_cursor(encode_cursor(score, doc_id)) == (score, doc_id)
+
+def test_missing_cursor_decodes_to_none():
+    assert decode_cursor(None) is None
+    assert decode_cursor("") is None
+
+def test_invalid_cursor_is_a_400():
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor("not a cursor")
+    assert exc.value.status_code == 400
+
+def test_pages_cover_the_ranking_once_in_order():
+    scored = [("d", 50.0), ("a", 90.0), ("c", 50.0), ("b", 90.0), ("e", 10.0)]
+    expected = [("a", 90.0), ("b", 90.0), ("c", 50.0), ("d", 50.0), ("e", 10.0)]
+
+    seen, cursor = [], None
+    while True:
+        page, cursor = top_k_page(scored, 2, cursor)
+        seen += page
+        if cursor is None: break
+    assert seen == expected
+
+def test_cursor_survives_removal_of_the_last_seen_item():
+    scored = [("a", 90.0), ("b", 80.0), ("c", 70.0)]
+    page, cursor = top_k_page(scored, 1)
+    assert page == [("a", 90.0)]
+    page, _ = top_k_page([("b", 80.0), ("c", 70.0)], 1, cursor)
+    assert page == [("b", 80.0)]
@@ -0,0 +1,81 @@
+from types import SimpleNamespace
+import numpy as np
+import pytest
+from app.services import matching_service, reduced_embeddings
+from app.services.embedding_store import EmbeddingStore
+from app.services.reduced_embeddings import Reducer
+from app.services.score_cache import ScoreCache
+
+DIM = 16
+RERANK = 3
+
+@pytest.fixture
+def corpus(tmp_path, monkeypatch):
+    """20 stored team vectors, all but the last two carrying a current int8 code"""
+    rng = np.random.default_rng(7)
+    vectors = rng.standard_normal((20, DIM)).astype(np.float32)
+    store = EmbeddingStore("team", directory=str(tmp_path))
+    store.put_many([(f"t{i}", v, f"h{i}") for i, v in enumerate(vectors)])
+
+    reducer = Reducer.fit(vectors, dim=4) # lossy on purpose: code scores differ from exact ones
+    monkeypatch.setattr(reduced_embeddings, "reducer", reducer)
+    monkeypatch.setattr(reduced_embeddings, "RERANK_TOP", RERANK)
+
+    docs = []
+    for i, v in enumerate(vectors):
+        doc = SimpleNamespace(id=f"t{i}", embedding_hash=f"h{i}", embedding_int8=None, reduced_version=None)
+        if i < 18:
+            doc.embedding_int8 = reducer.pack(v.tolist())
+            doc.reduced_version = reducer.code_version(doc.embedding_hash)
+        docs.append(doc)
+    query = store.get("t0") + 0.5 * store.get("t1")
+    return store, reducer, docs, query / np.linalg.norm(query)
+
+def test_exact_mode_scores_every_document_from_the_store(corpus, monkeypatch):
+    store, _, docs, query = corpus
+    monkeypatch.setattr(reduced_embeddings, "reducer", None)
+    scores = matching_service.doc_semantic_scores(query, docs, store)
+    assert np.allclose(scores, store.take([d.id for d in docs]) @ query * 100, atol=1e-4)
+
+def test_reduced_mode_reranks_the_best_codes_exactly(corpus):
+    store, reducer, docs, query = corpus
+    exact = store.take([d.id for d in docs]) @ query * 100
+    scores, is_exact = matching_service._doc_semantic(query, docs, store)
+
+    coded = list(range(18))
+    approx = reducer.scores(query, reducer.unpack([docs[i].embedding_int8 for i in coded])) * 100
+    reranked = set(np.argsort(-approx)[:RERANK].tolist())
+
+    assert is_exact.tolist() == [i in reranked or i >= 18 for i in range(20)]
+    assert np.allclose(scores[is_exact], exact[is_exact], atol=1e-4)
+    rest = [i for i in coded if i not in reranked]
+    assert np.allclose(scores[rest], approx[rest], atol=1e-4)
+    assert not np.allclose(scores[rest], exact[rest], atol=1e-4)
+
+def test_stale_codes_are_scored_exactly(corpus):
+    store, _, docs, query = corpus
+    for doc in docs: doc.embedding_hash = "changed"
+    scores, is_exact = matching_service._doc_semantic(query, docs, store)
+    assert is_exact.all()
+    assert np.allclose(scores, store.take([d.id for d in docs]) @ query * 100, atol=1e-4)
+
+def test_doc_semantic_scores_keeps_the_same_ranking_at_the_top(corpus):
+    store, _, docs, query = corpus
+    exact = store.take([d.id for d in docs]) @ query * 100
+    scores = matching_service.doc_semantic_scores(query, docs, store)
+    assert int(np.argmax(scores)) == int(np.argmax(exact)) == 0
+
+def test_only_exact_scores_are_cached(monkeypatch):
+    cache = ScoreCache()
+    monkeypatch.setattr(matching_service, "score_cache", cache)
+    subject = SimpleNamespace(id="u", availability_bits=None, availability=[])
+    others = [SimpleNamespace(id=f"t{i}", availability_profile=None) for i in range(3)]
+
+    calls = []
+    def compute(miss):
+        calls.append([o.id for o in miss])
+        return [50.0] * len(miss), np.array([o.id != "t1" for o in miss])
+
+    assert matching_service._cached_scores("user-team", subject, others, compute) == [50.0] * 3
+    assert matching_service._cached_scores("user-team", subject, others, compute) == [50.0] * 3
+    assert calls == [["t0", "t1", "t2"], ["t1"]]
@@ -0,0 +1,27 @@
+import asyncio
+import os
+import sys
+
+# Force UTF-8 encoding for stdout (Windows fix)
+if sys.stdout.encoding != 'utf-8':
+    sys.stdout.reconfigure(encoding='utf-8')
+from app.database import init_db
+from app.services.collaborative import train_collaborative_model
+
+# Windows Fix
+if os.name == "nt":
+    asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+
+# Offline collaborative-filtering job (run from cron, e.g. nightly):
+#   python train_cf.py
+# Builds the sparse user x project feedback matrix from Swipe + Match, factorizes it
+# with implicit ALS and stores cf_vector on Users and Teams for the matching blend.
+
+async def train():
+    print("🔌 Connecting to Database...")
+    await init_db()
+    await train_collaborative_model()
+    print("✨ Done.")
+
+if __name__ == "__main__":
+    asyncio.run(train())
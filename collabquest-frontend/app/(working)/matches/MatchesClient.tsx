@@ -34,6 +34,8 @@ export default function MatchesClient() {
     const [candidates, setCandidates] = useState<any[]>([]);
     const [loading, setLoading] = useState(true);
     const [currentIndex, setCurrentIndex] = useState(0);
+    const [nextCursor, setNextCursor] = useState<string | null>(null);
+    const [loadingMore, setLoadingMore] = useState(false);
 
     const x = useMotionValue(0);
     const rotate = useTransform(x, [-200, 200], [-25, 25]);
@@ -59,21 +61,40 @@ export default function MatchesClient() {
         return () => window.removeEventListener("keydown", handleKeyDown);
     }, []);
 
-    const fetchMatches = async (token: string) => {
+    const fetchMatches = async (token: string, cursor?: string) => {
         try {
-            let endpoint = mode === "users" ? "/matches/users" : "/matches/projects";
-            if (mode === "users" && projectId) endpoint += `?project_id=${projectId}`;
+            // The swipe stack reads the precomputed deck (swiped cards are already gone from it)
+            const endpoint = mode === "users" ? "/matches/deck/users" : "/matches/deck/projects";
+            const params = new URLSearchParams();
+            if (mode === "users" && projectId) params.append("project_id", projectId);
+            if (cursor) params.append("cursor", cursor);
 
-            const res = await api.get(endpoint);
-            const validMatches = res.data.filter((c: any) => c.match_score > 0);
-            setCandidates(validMatches);
+            const res = await api.get(params.toString() ? `${endpoint}?${params.toString()}` : endpoint);
+            const validMatches = res.data.items.filter((c: any) => c.match_score > 0);
+            // A cursor the deck no longer holds restarts at its top, so skip cards already stacked
+            setCandidates(prev => {
+                if (!cursor) return validMatches;
+                const seen = new Set(prev.map(getSafeId));
+                return [...prev, ...validMatches.filter((c: any) => !seen.has(getSafeId(c)))];
+            });
+            setNextCursor(res.data.next_cursor || null);
         } catch (err) {
             console.error("Match fetch failed", err);
         } finally {
             setLoading(false);
+            setLoadingMore(false);
         }
     };
 
+    // Fetch the next page before the stack runs out
+    useEffect(() => {
+        if (!nextCursor || loadingMore || candidates.length - currentIndex > 5) return;
+        const token = Cookies.get("token");
+        if (!token) return;
+        setLoadingMore(true);
+        fetchMatches(token, nextCursor);
+    }, [currentIndex, candidates.length, nextCursor, loadingMore]);
+
     const getSafeId = (item: any) => {
         if (typeof item.id === 'string') return item.id;
         if (typeof item._id === 'string') return item._id;